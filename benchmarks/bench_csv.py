@@ -0,0 +1,165 @@
+"""Benchmark of the CSV backends of `SchwabParser` on synthetic Schwab exports.
+
+Loads each export (transactions, realized, positions) with every available
+backend, each in its own process so that peak memory is not shared, and
+records time, rows/s, peak RSS and the memory of the parsed frame. The
+frames of all backends are checked to hold the same values. Results are
+written as JSON.
+
+    uv run python benchmarks/bench_csv.py --rows 1000000
+    uv run python benchmarks/bench_csv.py --backend pandas --backend arrow
+"""
+from __future__ import annotations
+import argparse
+import json
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import pandas as pd
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "src"))
+
+from common.csv_backend import BACKENDS, get_backend  # noqa: E402
+from common.schwab import SchwabParser  # noqa: E402
+from synthetic import generate  # noqa: E402
+from bench_pipeline import _git_commit  # noqa: E402
+
+KINDS = ("transactions", "realized", "positions")
+
+
+def _peak_rss_bytes() -> int:
+    # VmHWM es del proceso actual; ru_maxrss de Linux hereda el pico del padre tras fork
+    try:
+        for line in Path("/proc/self/status").read_text().splitlines():
+            if line.startswith("VmHWM:"):
+                return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    # ru_maxrss: KiB en Linux, bytes en macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def measure(kind: str, backend: str, path: str, repeat: int) -> dict:
+    """Times one backend on one export (run in a fresh process by `run`)."""
+    load = getattr(SchwabParser, f"load_{kind}")
+    baseline_rss = _peak_rss_bytes()
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        df = load(path, backend=backend)
+        times.append(time.perf_counter() - start)
+    peak_rss = _peak_rss_bytes()
+    return {
+        "rows": len(df),
+        "seconds_median": statistics.median(times),
+        "seconds_min": min(times),
+        "rows_per_s": len(df) / statistics.median(times),
+        "peak_rss_bytes": peak_rss,
+        "peak_rss_delta_bytes": peak_rss - baseline_rss,
+        "frame_bytes": int(df.memory_usage(deep=True).sum()),
+    }
+
+
+def _comparable(df: pd.DataFrame) -> pd.DataFrame:
+    """Frame with Arrow-backed strings as object columns (NaN for blanks)."""
+    df = df.copy()
+    for col in df.columns:
+        if isinstance(df[col].dtype, pd.StringDtype):
+            df[col] = df[col].astype(object).where(df[col].notna(), float("nan"))
+    return df
+
+
+def check_equivalent(kind: str, backends: list[str], path: str) -> None:
+    """Raises AssertionError if any backend's frame differs from the first one's."""
+    load = getattr(SchwabParser, f"load_{kind}")
+    expected = _comparable(load(path, backend=backends[0]))
+    for backend in backends[1:]:
+        pd.testing.assert_frame_equal(
+            expected, _comparable(load(path, backend=backend)), check_dtype=False
+        )
+
+
+def run(rows: int, year: int, repeat: int, backends: list[str], work_dir: Path) -> dict:
+    files = generate(work_dir / "data", rows, year)
+    results = {}
+    for kind in KINDS:
+        path = str(files[kind])
+        check_equivalent(kind, backends, path)
+        for backend in backends:
+            out = subprocess.run(
+                [sys.executable, __file__, "--worker", kind, backend, path, str(repeat)],
+                capture_output=True,
+                text=True,
+                check=True,
+            )
+            timing = json.loads(out.stdout)
+            results[f"{kind}.{backend}"] = timing
+            print(
+                f"{kind:13s} {backend:7s} {timing['seconds_median']:9.4f} s  "
+                f"{timing['rows_per_s']:14,.0f} rows/s  "
+                f"pico {timing['peak_rss_bytes'] / 2**20:8.1f} MiB  "
+                f"frame {timing['frame_bytes'] / 2**20:8.1f} MiB"
+            )
+
+    return {
+        "commit": _git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "rows": rows,
+        "year": year,
+        "repeat": repeat,
+        "backends": backends,
+        "results": results,
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--year", type=int, default=2025)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument(
+        "--backend",
+        action="append",
+        choices=sorted(BACKENDS),
+        help="Backend a medir (repetible; por defecto, todos los disponibles).",
+    )
+    parser.add_argument("--out", type=Path, default=ROOT / "benchmarks" / "results")
+    parser.add_argument("--worker", nargs=4, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        kind, backend, path, repeat = args.worker
+        print(json.dumps(measure(kind, backend, path, int(repeat))))
+        return 0
+
+    backends = args.backend or []
+    if not backends:
+        for name in BACKENDS:
+            try:
+                get_backend(name)
+                backends.append(name)
+            except ValueError as e:
+                print(f"{name} omitido: {e}", file=sys.stderr)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        result = run(args.rows, args.year, args.repeat, backends, Path(tmp))
+
+    args.out.mkdir(parents=True, exist_ok=True)
+    out_path = args.out / f"csv-{result['commit']}-{args.rows}.json"
+    out_path.write_text(json.dumps(result, indent=2), encoding="utf-8")
+    print(out_path)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,195 @@
+"""Benchmark of the report pipeline on synthetic Schwab exports.
+
+Covers parsing, the as-of FX join, `process_dividends`,
+`process_realized_gains` and `generate_report_720` with a stub FX table and
+a local metadata provider (no network). Results are written as JSON; with
+`--compare` the run fails if a stage got slower than `--max-regression`.
+
+    uv run python benchmarks/bench_pipeline.py --rows 1000000
+    uv run python benchmarks/bench_pipeline.py --compare benchmarks/results/<previous>.json
+"""
+from __future__ import annotations
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date
+from pathlib import Path
+from typing import Callable
+
+import numpy as np
+import pandas as pd
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "src"))
+
+from common.enrichment import StaticProvider  # noqa: E402
+from common.fx import RateTable  # noqa: E402
+from common.processor import TaxReportEngine  # noqa: E402
+from common.schwab import SchwabParser  # noqa: E402
+from synthetic import generate  # noqa: E402
+
+
+def stub_rate_table(start: date, end: date) -> RateTable:
+    """Deterministic business-day fixings around 1.10 USD per EUR."""
+    days = pd.bdate_range(start, end)
+    rates = 1.10 + 0.05 * np.sin(np.arange(len(days)) / 40)
+    return RateTable(days.to_numpy(dtype="datetime64[D]"), rates.round(4))
+
+
+def _git_commit() -> str:
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=ROOT,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        return out.stdout.strip()
+    except Exception:
+        return "unknown"
+
+
+def timeit(fn: Callable[[], object], repeat: int) -> dict:
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return {"seconds_median": statistics.median(times), "seconds_min": min(times)}
+
+
+def run(rows: int, year: int, repeat: int, work_dir: Path) -> dict:
+    files = generate(work_dir / "data", rows, year)
+    rates = stub_rate_table(date(year - 1, 12, 1), date(year, 12, 31))
+    positions = SchwabParser.load_positions(str(files["positions"]))
+    provider = StaticProvider(
+        {
+            t: {
+                "ISIN": f"US{i:010d}",
+                "Domicilio Fiscal": "Synthetic St 1",
+                "Poblacion": "Synthetic",
+                "Pais Dom Fiscal": "US",
+            }
+            for i, t in enumerate(positions["Ticker"].astype(str))
+        }
+    )
+
+    def engine() -> TaxReportEngine:
+        return TaxReportEngine(
+            year=year, out_dir=work_dir / "out", rates=rates, metadata_provider=provider
+        )
+
+    tx = SchwabParser.load_transactions(str(files["transactions"]))
+    dates = tx["date"]
+
+    stages = {
+        "parse_transactions": (
+            lambda: SchwabParser.load_transactions(str(files["transactions"])),
+            rows,
+        ),
+        "parse_realized": (
+            lambda: SchwabParser.load_realized(str(files["realized"])),
+            max(rows // 10, 1),
+        ),
+        "parse_positions": (
+            lambda: SchwabParser.load_positions(str(files["positions"])),
+            len(positions),
+        ),
+        "fx_asof": (lambda: rates.asof(dates), rows),
+        "process_dividends": (
+            lambda: engine().process_dividends(str(files["transactions"])),
+            rows,
+        ),
+        "process_realized_gains": (
+            lambda: engine().process_realized_gains(str(files["realized"])),
+            max(rows // 10, 1),
+        ),
+        "generate_report_720": (
+            lambda: engine().generate_report_720(str(files["positions"])),
+            len(positions),
+        ),
+    }
+
+    results = {}
+    for name, (fn, n) in stages.items():
+        timing = timeit(fn, repeat)
+        timing["rows"] = n
+        timing["rows_per_s"] = n / timing["seconds_median"]
+        results[name] = timing
+        print(
+            f"{name:24s} {timing['seconds_median']:9.4f} s  "
+            f"{timing['rows_per_s']:14,.0f} rows/s"
+        )
+
+    return {
+        "commit": _git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "rows": rows,
+        "year": year,
+        "repeat": repeat,
+        "results": results,
+    }
+
+
+def compare(current: dict, baseline: dict, max_regression: float) -> list[str]:
+    """Stages whose median time grew more than `max_regression` times."""
+    slower = []
+    for name, timing in current["results"].items():
+        before = baseline["results"].get(name)
+        if not before:
+            continue
+        ratio = timing["seconds_median"] / before["seconds_median"]
+        print(f"{name:24s} x{ratio:5.2f} vs {baseline['commit']}")
+        if ratio > max_regression:
+            slower.append(name)
+    return slower
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--year", type=int, default=2025)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--out", type=Path, default=ROOT / "benchmarks" / "results")
+    parser.add_argument("--compare", type=Path, default=None)
+    parser.add_argument("--max-regression", type=float, default=1.25)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        work_dir = Path(tmp)
+        # Cachés (FX, metadata) aisladas en el directorio temporal
+        cwd = os.getcwd()
+        os.chdir(work_dir)
+        try:
+            result = run(args.rows, args.year, args.repeat, work_dir)
+        finally:
+            os.chdir(cwd)
+
+    args.out.mkdir(parents=True, exist_ok=True)
+    out_path = args.out / f"pipeline-{result['commit']}-{args.rows}.json"
+    out_path.write_text(json.dumps(result, indent=2), encoding="utf-8")
+    print(out_path)
+
+    if args.compare:
+        baseline = json.loads(args.compare.read_text(encoding="utf-8"))
+        slower = compare(result, baseline, args.max_regression)
+        if slower:
+            print(
+                f"FAIL: más lento que {args.compare.name}: {', '.join(slower)}",
+                file=sys.stderr,
+            )
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,133 @@
+"""Startup benchmark for the `dec-renta` CLI.
+
+Fails (exit code 1) when `dec-renta --help` or the import of the CLI take
+longer than their thresholds, or when either pulls in a heavy dependency
+(pandas, numpy, requests, yfinance). `tests/test_startup.py` runs the
+dependency check (not the timings) with the test suite.
+
+    uv run python benchmarks/bench_startup.py --threshold-ms 100 --help-threshold-ms 300
+"""
+from __future__ import annotations
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+SRC = Path(__file__).resolve().parents[1] / "src"
+HEAVY_MODULES = ["pandas", "numpy", "requests", "yfinance"]
+
+# Mide solo el import del CLI (sin el arranque del intérprete, que depende de la máquina)
+IMPORT_PROBE = f"""
+import json, sys, time
+t = time.perf_counter()
+import dec_renta.__main__
+elapsed = time.perf_counter() - t
+heavy = [m for m in {HEAVY_MODULES!r} if m in sys.modules]
+print(json.dumps({{"import_s": elapsed, "heavy": heavy}}))
+"""
+
+# `dec-renta --help` tal cual (python -m dec_renta), y al final los módulos que ha cargado
+HELP_PROBE = f"""
+import contextlib, io, json, runpy, sys
+sys.argv = ["dec-renta", "--help"]
+with contextlib.redirect_stdout(io.StringIO()):
+    try:
+        runpy.run_module("dec_renta", run_name="__main__", alter_sys=True)
+    except SystemExit as e:
+        if e.code:
+            raise
+heavy = [m for m in {HEAVY_MODULES!r} if m in sys.modules]
+print(json.dumps({{"heavy": heavy}}))
+"""
+
+
+def _env() -> dict[str, str]:
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [str(SRC), env.get("PYTHONPATH")]))
+    return env
+
+
+def measure(runs: int) -> dict:
+    env = _env()
+    imports, helps, heavy = [], [], set()
+    for _ in range(runs):
+        out = subprocess.run(
+            [sys.executable, "-c", IMPORT_PROBE],
+            env=env,
+            check=True,
+            capture_output=True,
+            text=True,
+        )
+        probe = json.loads(out.stdout)
+        imports.append(probe["import_s"])
+        heavy.update(probe["heavy"])
+
+        start = time.perf_counter()
+        out = subprocess.run(
+            [sys.executable, "-c", HELP_PROBE],
+            env=env,
+            check=True,
+            capture_output=True,
+            text=True,
+        )
+        helps.append(time.perf_counter() - start)
+        heavy.update(json.loads(out.stdout)["heavy"])
+
+    return {
+        "runs": runs,
+        "import_ms_median": statistics.median(imports) * 1000,
+        "help_ms_median": statistics.median(helps) * 1000,
+        "heavy_modules": sorted(heavy),
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=7)
+    parser.add_argument(
+        "--threshold-ms",
+        type=float,
+        default=100.0,
+        help="Máximo (mediana) del import del CLI en milisegundos.",
+    )
+    parser.add_argument(
+        "--help-threshold-ms",
+        type=float,
+        default=300.0,
+        help="Máximo (mediana) de `dec-renta --help` en milisegundos, con el arranque del intérprete.",
+    )
+    args = parser.parse_args()
+
+    result = measure(args.runs)
+    print(json.dumps(result, indent=2))
+
+    failed = False
+    if result["import_ms_median"] > args.threshold_ms:
+        print(
+            f"FAIL: import del CLI {result['import_ms_median']:.1f} ms "
+            f"> {args.threshold_ms:.1f} ms",
+            file=sys.stderr,
+        )
+        failed = True
+    if result["help_ms_median"] > args.help_threshold_ms:
+        print(
+            f"FAIL: dec-renta --help {result['help_ms_median']:.1f} ms "
+            f"> {args.help_threshold_ms:.1f} ms",
+            file=sys.stderr,
+        )
+        failed = True
+    if result["heavy_modules"]:
+        print(
+            f"FAIL: el arranque del CLI importa {', '.join(result['heavy_modules'])}",
+            file=sys.stderr,
+        )
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,224 @@
+"""Synthetic Schwab exports (Transactions, GainLoss_Realized_Details, Positions).
+
+The files follow the layouts `SchwabParser` expects, including the title rows
+skipped with `skiprows`, and are written in chunks so 10M-row files fit in
+bounded memory.
+
+    uv run python benchmarks/synthetic.py --rows 1000000 --year 2025 --out-dir /tmp/schwab
+"""
+from __future__ import annotations
+import argparse
+import csv
+from datetime import date
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+SYMBOLS = [
+    "AAPL", "MSFT", "AMD", "ASML", "KO", "PEP", "JNJ", "PG", "VOO", "VTI",
+    "NVDA", "GOOG", "AMZN", "META", "TSM", "XOM", "CVX", "T", "VZ", "O",
+]
+# (acción, peso, signo del importe)
+ACTIONS = [
+    ("Qualified Dividend", 0.30, 1),
+    ("Cash Dividend", 0.10, 1),
+    ("Non-Qualified Div", 0.03, 1),
+    ("NRA Tax Adj", 0.20, -1),
+    ("Foreign Tax Paid", 0.02, -1),
+    ("Buy", 0.15, -1),
+    ("Sell", 0.10, 1),
+    ("Reinvest Shares", 0.05, -1),
+    ("Credit Interest", 0.05, 1),
+]
+CHUNK_ROWS = 1_000_000
+
+
+def money(values: np.ndarray) -> pd.Series:
+    """Formats amounts as Schwab does: `$1,234.56` / `-$1,234.56`."""
+    s = pd.Series(np.abs(values)).map("${:,.2f}".format)
+    return s.where(values >= 0, "-" + s)
+
+
+def dates(rng: np.random.Generator, n: int, years: list[int]) -> pd.Series:
+    start = pd.Timestamp(date(min(years), 1, 1))
+    span = (pd.Timestamp(date(max(years), 12, 31)) - start).days + 1
+    days = start + pd.to_timedelta(rng.integers(0, span, n), unit="D")
+    return pd.Series(days.strftime("%m/%d/%Y"))
+
+
+def _write_chunks(path: Path, header: list[str], title_rows: list[str], chunks) -> Path:
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        for title in title_rows:
+            f.write(title + "\n")
+        csv.writer(f, quoting=csv.QUOTE_ALL).writerow(header)
+        for chunk in chunks:
+            chunk.to_csv(f, header=False, index=False, quoting=csv.QUOTE_ALL)
+    return path
+
+
+def write_transactions(
+    path: Path, rows: int, years: list[int], seed: int = 0
+) -> Path:
+    rng = np.random.default_rng(seed)
+    names = [a[0] for a in ACTIONS]
+    weights = np.array([a[1] for a in ACTIONS])
+    signs = np.array([a[2] for a in ACTIONS])
+
+    def chunks():
+        for start in range(0, rows, CHUNK_ROWS):
+            n = min(CHUNK_ROWS, rows - start)
+            action = rng.choice(len(ACTIONS), n, p=weights / weights.sum())
+            trade = np.isin(action, [names.index("Buy"), names.index("Sell")])
+            qty = np.where(trade, rng.integers(1, 200, n), 0)
+            price = rng.uniform(5, 900, n).round(2)
+            amount = np.where(trade, qty * price, rng.uniform(0.5, 2500, n)).round(2)
+            yield pd.DataFrame(
+                {
+                    "Date": dates(rng, n, years),
+                    "Action": np.array(names)[action],
+                    "Symbol": np.array(SYMBOLS)[rng.integers(0, len(SYMBOLS), n)],
+                    "Description": "SYNTHETIC SECURITY",
+                    "Quantity": pd.Series(qty).astype(str).where(trade, ""),
+                    "Price": money(price).where(trade, ""),
+                    "Fees & Comm": "",
+                    "Amount": money(amount * signs[action]),
+                }
+            )
+
+    header = [
+        "Date",
+        "Action",
+        "Symbol",
+        "Description",
+        "Quantity",
+        "Price",
+        "Fees & Comm",
+        "Amount",
+    ]
+    return _write_chunks(path, header, [], chunks())
+
+
+def write_realized(path: Path, rows: int, year: int, seed: int = 1) -> Path:
+    rng = np.random.default_rng(seed)
+
+    def chunks():
+        for start in range(0, rows, CHUNK_ROWS):
+            n = min(CHUNK_ROWS, rows - start)
+            qty = rng.integers(1, 100, n)
+            cost_ps = rng.uniform(5, 500, n).round(2)
+            proceeds_ps = (cost_ps * rng.uniform(0.6, 1.8, n)).round(2)
+            proceeds, cost = (qty * proceeds_ps).round(2), (qty * cost_ps).round(2)
+            gain = (proceeds - cost).round(2)
+            long_term = rng.random(n) < 0.6
+            yield pd.DataFrame(
+                {
+                    "Symbol": np.array(SYMBOLS)[rng.integers(0, len(SYMBOLS), n)],
+                    "Name": "SYNTHETIC SECURITY",
+                    "Closed Date": dates(rng, n, [year]),
+                    "Opened Date": dates(rng, n, [year - 3, year - 1]),
+                    "Quantity": qty,
+                    "Proceeds Per Share": money(proceeds_ps),
+                    "Cost Per Share": money(cost_ps),
+                    "Proceeds": money(proceeds),
+                    "Cost Basis (CB)": money(cost),
+                    "Gain/Loss ($)": money(gain),
+                    "Long Term Gain/Loss": money(np.where(long_term, gain, 0)),
+                    "Short Term Gain/Loss": money(np.where(long_term, 0, gain)),
+                    "Term": np.where(long_term, "Long Term", "Short Term"),
+                }
+            )
+
+    header = [
+        "Symbol",
+        "Name",
+        "Closed Date",
+        "Opened Date",
+        "Quantity",
+        "Proceeds Per Share",
+        "Cost Per Share",
+        "Proceeds",
+        "Cost Basis (CB)",
+        "Gain/Loss ($)",
+        "Long Term Gain/Loss",
+        "Short Term Gain/Loss",
+        "Term",
+    ]
+    title = f'"Realized Gain/Loss for Individual ...147 from 01/01/{year} to 12/31/{year}"'
+    return _write_chunks(path, header, [title], chunks())
+
+
+def write_positions(path: Path, rows: int, year: int, seed: int = 2) -> Path:
+    rng = np.random.default_rng(seed)
+    # Tickers sintéticos únicos de hasta 5 letras (como los reales)
+    letters = np.array(list("ABCDEFGHIJKLMNOPQRSTUVWXYZ"))
+    candidates = ["".join(rng.choice(letters, rng.integers(1, 6))) for _ in range(rows * 2)]
+    tickers = pd.unique(pd.Series(candidates))[:rows]
+    n = len(tickers)
+    qty = rng.integers(1, 2000, n)
+    price = rng.uniform(5, 900, n).round(2)
+    value = (qty * price).round(2)
+    cost = (value * rng.uniform(0.5, 1.5, n)).round(2)
+    cash = 12_345.67
+    body = pd.DataFrame(
+        {
+            "Symbol": tickers,
+            "Description": "SYNTHETIC SECURITY",
+            "Qty (Quantity)": qty,
+            "Price": money(price),
+            "Mkt Val (Market Value)": money(value),
+            "Cost Basis": money(cost),
+            "Security Type": "Equity",
+        }
+    )
+    totals = pd.DataFrame(
+        {
+            "Symbol": ["Cash & Cash Investments", "Account Total"],
+            "Description": ["--", "--"],
+            "Qty (Quantity)": ["--", "--"],
+            "Price": ["--", "--"],
+            "Mkt Val (Market Value)": money(np.array([cash, value.sum() + cash])),
+            "Cost Basis": ["--", money(np.array([cost.sum()]))[0]],
+            "Security Type": ["Cash and Money Market", "--"],
+        }
+    )
+    title = f'"Positions for account Individual ...147 as of 11:59 PM ET, 12/31/{year}"'
+    return _write_chunks(path, list(body.columns), [title, ""], [body, totals])
+
+
+def generate(
+    out_dir: Path, rows: int, year: int, positions: int = 200
+) -> dict[str, Path]:
+    """Writes the three exports with the default filename patterns of the CLI."""
+    out_dir.mkdir(parents=True, exist_ok=True)
+    return {
+        "transactions": write_transactions(
+            out_dir / f"Individual_XXX147_Transactions_{year}1231-000000.csv",
+            rows,
+            [year - 1, year],
+        ),
+        "realized": write_realized(
+            out_dir / f"XXXX3147_GainLoss_Realized_Details_{year}1231-000000.csv",
+            max(rows // 10, 1),
+            year,
+        ),
+        "positions": write_positions(
+            out_dir / f"Individual-Positions-{year}-12-31-000000.csv", positions, year
+        ),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--year", type=int, default=2025)
+    parser.add_argument("--positions", type=int, default=200)
+    parser.add_argument("--out-dir", type=Path, default=Path("data"))
+    args = parser.parse_args()
+    files = generate(args.out_dir, args.rows, args.year, args.positions)
+    for kind, path in files.items():
+        print(f"{kind}: {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+from __future__ import annotations
+from pathlib import Path
+import re
+
+import numpy as np
+import pandas as pd
+
+from common.profiling import count
+
+# Columna con la cuenta de cada fila al combinar exports de varias cuentas
+ACCOUNT_COLUMN = "account"
+# Número de cuenta enmascarado en el filename (`Individual_XXX147_...`, `XXXX3147_GainLoss_...`)
+_ACCOUNT_IN_NAME = re.compile(r"X{2,}(\d{3,})")
+# ... o en la fila de título del export (`Positions for account Individual ...147 as of ...`)
+_ACCOUNT_IN_TITLE = re.compile(r"\.\.\.X*(\d{3,})")
+# Schwab enmascara con 3 o 4 dígitos según el export: se comparan los 3 últimos
+ACCOUNT_DIGITS = 3
+
+
+def account_of(path: str | Path) -> str:
+    """Masked account of a Schwab export (its last digits), "" if it does not say.
+
+    Taken from the filename or, failing that, from the title row.
+    """
+    path = Path(path)
+    m = _ACCOUNT_IN_NAME.search(path.name)
+    if m is None:
+        with open(path, encoding="utf-8-sig", errors="replace") as f:
+            m = _ACCOUNT_IN_TITLE.search(f.readline())
+    return m.group(1)[-ACCOUNT_DIGITS:] if m else ""
+
+
+def row_hashes(df: pd.DataFrame) -> np.ndarray:
+    """uint64 hash of each row of `df` (every column, index excluded)."""
+    return pd.util.hash_pandas_object(df, index=False).to_numpy()
+
+
+def combine_exports(frames: list[tuple[str, pd.DataFrame]]) -> pd.DataFrame:
+    """Rows of several exports as one frame, tagged with their account.
+
+    Exports of one account often cover overlapping dates: a row found in
+    several of them is kept as many times as in the export that has it most
+    often, so repeated rows within an export (two equal buys on one day)
+    are all kept. Rows are compared by hash, account included. The removed
+    rows add to the `dedupe.removed_rows` profiling counter.
+    """
+    combined = pd.concat(
+        [df.assign(**{ACCOUNT_COLUMN: account}) for account, df in frames],
+        ignore_index=True,
+    )
+    hashes = row_hashes(combined)
+    export = np.repeat(np.arange(len(frames)), [len(df) for _, df in frames])
+    # n-ésima aparición de cada fila dentro de su export
+    occurrence = pd.Series(hashes).groupby([export, hashes]).cumcount().to_numpy()
+    keep = ~pd.DataFrame({"hash": hashes, "occurrence": occurrence}).duplicated().to_numpy()
+    count("dedupe.removed_rows", int((~keep).sum()))
+
+    combined = combined[keep].reset_index(drop=True)
+    combined[ACCOUNT_COLUMN] = combined[ACCOUNT_COLUMN].astype("category")
+    # Las categóricas de cada export (p.ej. la divisa) se unifican al concatenar
+    for col in set().union(*(df.select_dtypes("category").columns for _, df in frames)):
+        if col in combined.columns:
+            combined[col] = combined[col].astype("category")
+    return combined
@@ -0,0 +1,211 @@
+from __future__ import annotations
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass
+from datetime import date
+from pathlib import Path
+import time
+
+import pandas as pd
+
+from common.catalog import FileCatalog
+from common.fx import ECBExchangeService, RateTable
+from common.io import DataInputs, Inputs720, resolve_inputs, resolve_positions_inputs
+from common.processor import TaxReportEngine, security_positions
+from common.schwab import SchwabParser
+
+STATUS_COLUMNS = ["client", "form", "status", "year", "outputs", "error", "seconds"]
+
+
+@dataclass(frozen=True)
+class ClientJob:
+    name: str
+    data_dir: Path
+    out_dir: Path
+
+
+@dataclass(frozen=True)
+class ClientPlan:
+    job: ClientJob
+    inputs_100: DataInputs | None
+    inputs_720: Inputs720 | None
+    errors: dict[str, str]
+
+
+def discover_clients(root: Path, out_dir: Path) -> list[ClientJob]:
+    """Every sub-folder of `root` is a client data directory."""
+    return [
+        ClientJob(d.name, d, out_dir / d.name)
+        for d in sorted(root.iterdir())
+        if d.is_dir() and not d.name.startswith(".")
+    ]
+
+
+def read_manifest(manifest: Path, out_dir: Path) -> list[ClientJob]:
+    """Reads one client directory per line (relative to the manifest, `#` comments)."""
+    jobs = []
+    for line in manifest.read_text(encoding="utf-8").splitlines():
+        line = line.split("#", 1)[0].strip()
+        if not line:
+            continue
+        data_dir = Path(line)
+        if not data_dir.is_absolute():
+            data_dir = manifest.parent / data_dir
+        jobs.append(ClientJob(data_dir.name, data_dir, out_dir / data_dir.name))
+    return jobs
+
+
+def plan_client(
+    job: ClientJob,
+    year: int | None = None,
+    pattern_transactions: str = "Individual_*_Transactions_*.csv",
+    pattern_realized: str = "*_GainLoss_Realized_Details_*.csv",
+    pattern_positions: str = "Individual-Positions*.csv",
+    catalog: FileCatalog | None = None,
+) -> ClientPlan:
+    """Resolves the inputs of both forms; a form without inputs is skipped."""
+    errors = {}
+    inputs_100 = inputs_720 = None
+    try:
+        inputs_100 = resolve_inputs(
+            str(job.data_dir), pattern_transactions, pattern_realized, year, catalog
+        )
+    except (FileNotFoundError, ValueError) as e:
+        errors["modelo-100"] = str(e)
+    try:
+        inputs_720 = resolve_positions_inputs(
+            str(job.data_dir), pattern_positions, year, catalog
+        )
+    except (FileNotFoundError, ValueError) as e:
+        errors["modelo-720"] = str(e)
+    return ClientPlan(job, inputs_100, inputs_720, errors)
+
+
+# Estado de solo lectura compartido por cada worker (se pasa una vez al arrancarlo)
+_SHARED: dict = {}
+
+
+def _init_worker(rates: dict[int, RateTable], metadata: pd.DataFrame) -> None:
+    _SHARED["rates"] = rates
+    _SHARED["metadata"] = metadata
+
+
+def _status(plan: ClientPlan, form: str, status: str, **fields) -> dict:
+    row = dict.fromkeys(STATUS_COLUMNS, "")
+    row.update(client=plan.job.name, form=form, status=status, **fields)
+    return row
+
+
+def run_client(plan: ClientPlan) -> list[dict]:
+    """Runs the forms of a client; a failing form does not stop the others."""
+    rows = []
+    forms = [("modelo-100", plan.inputs_100), ("modelo-720", plan.inputs_720)]
+    for form, inputs in forms:
+        if inputs is None:
+            rows.append(_status(plan, form, "omitido", error=plan.errors.get(form, "")))
+            continue
+
+        start = time.perf_counter()
+        try:
+            engine = TaxReportEngine(
+                year=inputs.year,
+                out_dir=plan.job.out_dir,
+                rates=_SHARED["rates"].get(inputs.year),
+                metadata=_SHARED["metadata"],
+            )
+            if form == "modelo-100":
+                outputs = engine.generate_reports(
+                    inputs.transactions_csvs, inputs.realized_csvs
+                )
+            else:
+                outputs = engine.generate_report_720(inputs.positions_csvs)
+            rows.append(
+                _status(
+                    plan,
+                    form,
+                    "ok",
+                    year=inputs.year,
+                    outputs=";".join(outputs),
+                    seconds=round(time.perf_counter() - start, 3),
+                )
+            )
+        except Exception as e:
+            rows.append(
+                _status(
+                    plan,
+                    form,
+                    "error",
+                    year=inputs.year,
+                    error=f"{type(e).__name__}: {e}",
+                    seconds=round(time.perf_counter() - start, 3),
+                )
+            )
+    return rows
+
+
+def prepare_shared_state(
+    plans: list[ClientPlan], out_dir: Path, refresh_fx: bool = False
+) -> tuple[dict[int, RateTable], pd.DataFrame]:
+    """Loads FX for every year and enriches the metadata of every ticker once."""
+    years = {
+        inputs.year
+        for plan in plans
+        for inputs in (plan.inputs_100, plan.inputs_720)
+        if inputs is not None
+    }
+    fx_service = ECBExchangeService()
+    # Todos los años de una vez: se descargan en paralelo los que faltan
+    fx_service.ensure_ranges(
+        [(date(year, 1, 1), date(year, 12, 31)) for year in sorted(years)],
+        refresh=refresh_fx,
+    )
+    rates = {
+        year: fx_service.get_rate_table(date(year, 1, 1), date(year, 12, 31))
+        for year in sorted(years)
+    }
+
+    tickers = set()
+    for plan in plans:
+        if plan.inputs_720 is None:
+            continue
+        for path in plan.inputs_720.positions_csvs:
+            try:
+                positions = SchwabParser.load_positions(str(path))
+            except Exception:
+                # El error se reporta al procesar el cliente
+                continue
+            tickers.update(security_positions(positions)["Ticker"].astype(str))
+
+    engine = TaxReportEngine(year=max(years, default=date.today().year), out_dir=out_dir)
+    metadata = engine.ticker_metadata(sorted(tickers))
+
+    return rates, metadata
+
+
+def run_batch(
+    plans: list[ClientPlan],
+    out_dir: Path,
+    max_workers: int | None = None,
+    refresh_fx: bool = False,
+) -> tuple[Path, pd.DataFrame]:
+    """Processes the clients across a process pool and writes the status summary."""
+    rates, metadata = prepare_shared_state(plans, out_dir, refresh_fx)
+
+    rows = []
+    with ProcessPoolExecutor(
+        max_workers=max_workers, initializer=_init_worker, initargs=(rates, metadata)
+    ) as pool:
+        futures = {pool.submit(run_client, plan): plan for plan in plans}
+        for future in as_completed(futures):
+            plan = futures[future]
+            try:
+                rows.extend(future.result())
+            except Exception as e:
+                # El worker ha muerto (p.ej. memoria): se marca el cliente entero
+                rows.append(_status(plan, "*", "error", error=f"{type(e).__name__}: {e}"))
+
+    status = pd.DataFrame(rows, columns=STATUS_COLUMNS).sort_values(["client", "form"])
+    out_dir.mkdir(parents=True, exist_ok=True)
+    status_path = out_dir / "batch_status.csv"
+    status.to_csv(status_path, index=False)
+
+    return status_path, status
@@ -0,0 +1,229 @@
+from __future__ import annotations
+from dataclasses import dataclass
+from fnmatch import fnmatchcase
+from pathlib import Path
+import os
+import sqlite3
+import threading
+import time
+
+from common.accounts import account_of
+from common.io import infer_year_from_filename
+from common.parse_cache import file_digest
+from common.profiling import count
+
+# Tipo de export según el filename (más amplio que los patrones por defecto de io)
+EXPORT_KINDS = {
+    "transactions": "*_Transactions_*.csv",
+    "realized": "*_GainLoss_Realized_Details_*.csv",
+    "positions": "*-Positions*.csv",
+}
+# Un mtime de carpeta tan reciente puede no reflejar aún otro cambio en el mismo tick
+_RACY_NS = 2 * 10**9
+
+_COLUMNS = ("path", "size", "mtime_ns", "sha256", "year", "kind", "account")
+
+
+@dataclass(frozen=True)
+class CatalogEntry:
+    path: Path
+    size: int
+    mtime_ns: int
+    sha256: str
+    year: int | None
+    kind: str | None
+    account: str
+
+    @property
+    def name(self) -> str:
+        return self.path.name
+
+
+def export_kind(name: str) -> str | None:
+    """Kind of Schwab export (`EXPORT_KINDS`) a filename is, None if none."""
+    return next((k for k, p in EXPORT_KINDS.items() if fnmatchcase(name, p)), None)
+
+
+class FileCatalog:
+    """Persistent SQLite index of the files of data directories.
+
+    Each file keeps its size, mtime, SHA-256, the year in its name, its
+    export kind and its account. A directory is listed again only when its
+    mtime changed since the last scan (files added, removed or renamed), and
+    only new or changed files are hashed and classified again. Files
+    returned by a query are checked with `stat`, which catches in-place
+    edits. Files (re)indexed add to the `catalog.indexed` profiling counter.
+    """
+
+    def __init__(self, path: Path = Path(".cache/dec_renta/catalog.sqlite")):
+        self.path = path
+        self._conn: sqlite3.Connection | None = None
+        self._lock = threading.RLock()
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._create_schema()
+        return self._conn
+
+    def _create_schema(self) -> None:
+        with self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS files (path TEXT PRIMARY KEY, "
+                "dir TEXT NOT NULL, name TEXT NOT NULL, size INTEGER NOT NULL, "
+                "mtime_ns INTEGER NOT NULL, sha256 TEXT NOT NULL, year INTEGER, "
+                "kind TEXT, account TEXT NOT NULL DEFAULT '')"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS ix_files_dir_kind "
+                "ON files (dir, kind, year, account)"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS dirs "
+                "(dir TEXT PRIMARY KEY, mtime_ns INTEGER NOT NULL, scanned_ns INTEGER NOT NULL)"
+            )
+
+    def close(self) -> None:
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    @staticmethod
+    def _dir_key(data_dir: str | Path) -> str:
+        return str(Path(data_dir).resolve())
+
+    def _index(self, path: Path, st: os.stat_result) -> tuple:
+        """Catalog row of `path` (hashes it and reads its title row if needed)."""
+        try:
+            year = infer_year_from_filename(path)
+        except ValueError:
+            year = None
+        kind = export_kind(path.name)
+        account = account_of(path) if kind is not None else ""
+        count("catalog.indexed")
+        return (
+            str(path),
+            str(path.parent),
+            path.name,
+            st.st_size,
+            st.st_mtime_ns,
+            file_digest(path),
+            year,
+            kind,
+            account,
+        )
+
+    def _upsert(self, rows: list[tuple]) -> None:
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO files "
+                "(path, dir, name, size, mtime_ns, sha256, year, kind, account) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+
+    def refresh(self, data_dir: str | Path) -> None:
+        """Brings the entries of `data_dir` up to date, listing it only if it changed."""
+        key = self._dir_key(data_dir)
+        dir_mtime = os.stat(key).st_mtime_ns
+        with self._lock:
+            known = self.conn.execute(
+                "SELECT mtime_ns, scanned_ns FROM dirs WHERE dir = ?", (key,)
+            ).fetchone()
+            if known is not None and known[0] == dir_mtime and known[1] - dir_mtime > _RACY_NS:
+                count("catalog.dir_hit")
+                return
+
+            count("catalog.dir_scan")
+            scanned_ns = time.time_ns()
+            with os.scandir(key) as it:
+                listed = {e.name: e.stat() for e in it if e.is_file()}
+            stored = {
+                name: (size, mtime_ns)
+                for name, size, mtime_ns in self.conn.execute(
+                    "SELECT name, size, mtime_ns FROM files WHERE dir = ?", (key,)
+                )
+            }
+            rows = [
+                self._index(Path(key) / name, st)
+                for name, st in sorted(listed.items())
+                if stored.get(name) != (st.st_size, st.st_mtime_ns)
+            ]
+            gone = [(str(Path(key) / name),) for name in stored.keys() - listed.keys()]
+            self._upsert(rows)
+            with self.conn:
+                self.conn.executemany("DELETE FROM files WHERE path = ?", gone)
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO dirs (dir, mtime_ns, scanned_ns) VALUES (?, ?, ?)",
+                    (key, dir_mtime, scanned_ns),
+                )
+
+    def _verified(self, entries: list[CatalogEntry]) -> list[CatalogEntry]:
+        """`entries` whose file still exists, re-indexed if edited in place."""
+        out, stale, gone = [], [], []
+        for entry in entries:
+            try:
+                st = os.stat(entry.path)
+            except FileNotFoundError:
+                gone.append((str(entry.path),))
+                continue
+            if (st.st_size, st.st_mtime_ns) == (entry.size, entry.mtime_ns):
+                out.append(entry)
+            else:
+                row = self._index(entry.path, st)
+                stale.append(row)
+                out.append(_entry((row[0], *row[3:])))
+        if stale or gone:
+            with self._lock:
+                self._upsert(stale)
+                with self.conn:
+                    self.conn.executemany("DELETE FROM files WHERE path = ?", gone)
+        return out
+
+    def entries(
+        self,
+        data_dir: str | Path,
+        pattern: str = "*",
+        kind: str | None = None,
+        year: int | None = None,
+        account: str | None = None,
+    ) -> list[CatalogEntry]:
+        """Files of `data_dir` matching `pattern` (and `kind`, `year`, `account`), by name."""
+        self.refresh(data_dir)
+        where, params = ["dir = ?"], [self._dir_key(data_dir)]
+        for column, value in (("kind", kind), ("year", year), ("account", account)):
+            if value is not None:
+                where.append(f"{column} = ?")
+                params.append(value)
+        with self._lock:
+            rows = self.conn.execute(
+                f"SELECT {', '.join(_COLUMNS)} FROM files "
+                f"WHERE {' AND '.join(where)} ORDER BY name",
+                params,
+            ).fetchall()
+        return self._verified(
+            [_entry(row) for row in rows if fnmatchcase(Path(row[0]).name, pattern)]
+        )
+
+    def glob(self, data_dir: str | Path, pattern: str) -> list[Path]:
+        """Like `Path(data_dir).glob(pattern)` for the files directly in `data_dir`."""
+        return [Path(data_dir) / entry.name for entry in self.entries(data_dir, pattern)]
+
+    def latest(
+        self,
+        data_dir: str | Path,
+        kind: str,
+        year: int | None = None,
+        account: str | None = None,
+    ) -> CatalogEntry | None:
+        """Newest export of `kind` (by name, which carries its timestamp), if any."""
+        entries = self.entries(data_dir, kind=kind, year=year, account=account)
+        return entries[-1] if entries else None
+
+
+def _entry(row: tuple) -> CatalogEntry:
+    path, size, mtime_ns, sha256, year, kind, account = row
+    return CatalogEntry(Path(path), size, mtime_ns, sha256, year, kind, account)
@@ -0,0 +1,82 @@
+from __future__ import annotations
+from dataclasses import dataclass
+from pathlib import Path
+import json
+
+import numpy as np
+import pandas as pd
+
+from common.locking import atomic_write_text
+
+
+def fingerprint(df: pd.DataFrame) -> int:
+    """Order-independent fingerprint of the rows of `df` (sum of row hashes)."""
+    hashes = pd.util.hash_pandas_object(df, index=False).to_numpy()
+    return int(hashes.sum(dtype=np.uint64))
+
+
+@dataclass(frozen=True)
+class Checkpoint:
+    """Sums (per symbol, or a `common.cube`) of every row dated on or before `cutoff`.
+
+    `rows` and `fingerprint` identify those rows, so a later export whose
+    rows up to `cutoff` differ (history rewritten) is detected.
+    """
+
+    year: int
+    version: str
+    cutoff: pd.Timestamp
+    rows: int
+    fingerprint: int
+    sums: pd.DataFrame
+
+    def matches(self, settled: pd.DataFrame, year: int, version: str) -> bool:
+        return (
+            self.year == year
+            and self.version == version
+            and self.rows == len(settled)
+            and self.fingerprint == fingerprint(settled)
+        )
+
+
+class CheckpointStore:
+    """JSON checkpoints of incremental runs, one file per aggregate and year."""
+
+    def __init__(self, path: Path):
+        self.path = path
+
+    def _file(self, name: str, year: int) -> Path:
+        return self.path / f"{name}_{year}.json"
+
+    def load(self, name: str, year: int) -> Checkpoint | None:
+        file = self._file(name, year)
+        if not file.exists():
+            return None
+        try:
+            raw = json.loads(file.read_text(encoding="utf-8"))
+            sums = pd.DataFrame(**raw["sums"]).set_index(raw.get("index", ["Symbol"]))
+            return Checkpoint(
+                year=raw["year"],
+                version=raw["version"],
+                cutoff=pd.Timestamp(raw["cutoff"]),
+                rows=raw["rows"],
+                fingerprint=raw["fingerprint"],
+                sums=sums,
+            )
+        except (KeyError, TypeError, ValueError):
+            # Checkpoint ilegible: se recalcula todo
+            return None
+
+    def save(self, name: str, checkpoint: Checkpoint) -> None:
+        self.path.mkdir(parents=True, exist_ok=True)
+        file = self._file(name, checkpoint.year)
+        raw = {
+            "year": checkpoint.year,
+            "version": checkpoint.version,
+            "cutoff": checkpoint.cutoff.isoformat(),
+            "rows": checkpoint.rows,
+            "fingerprint": checkpoint.fingerprint,
+            "index": list(checkpoint.sums.index.names),
+            "sums": checkpoint.sums.reset_index().to_dict(orient="split", index=False),
+        }
+        atomic_write_text(file, json.dumps(raw))
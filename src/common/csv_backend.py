@@ -0,0 +1,213 @@
+from __future__ import annotations
+from dataclasses import dataclass, field
+from pathlib import Path
+import csv
+import os
+
+import pandas as pd
+
+from common.money import Rounding, cents_from_values, from_cents, parse_cents
+from common.pandas_transform import (
+    remove_dollar_comma,
+    convert_to_numeric,
+    convert_to_datetime,
+    fill_na,
+    get_columns,
+)
+from common.profiling import count
+
+# Fechas de los exports de Schwab
+DATE_FORMAT = "%m/%d/%Y"
+# Importe ya limpio que el parser numérico lee exacto; el resto va al parser por dígitos
+_NUMBER = r"^[+-]?(\d+\.?\d*|\.\d+)([eE][+-]?\d+)?$"
+_INTEGER = r"^[+-]?\d+$"
+
+
+@dataclass(frozen=True)
+class CsvSchema:
+    """What a loader needs from a CSV export, converted at read time.
+
+    Columns are named after `rename` and whitespace stripping. `dates` maps
+    each `DATE_FORMAT` column to a new datetime column (NaT if unparseable);
+    `money` maps each amount column (`$1,234.56`) to a new Int64 cents column
+    and replaces the amount with its float value from the cents. `numbers`
+    (without `$` and `,`) become floats, NaN if not a number, and `strings`
+    have blanks as "".
+    """
+
+    skiprows: int = 0
+    rename: dict[str, str] = field(default_factory=dict)
+    dates: dict[str, str] = field(default_factory=dict)
+    money: dict[str, str] = field(default_factory=dict)
+    numbers: tuple[str, ...] = ()
+    strings: tuple[str, ...] = ()
+    rounding: Rounding = Rounding.HALF_UP
+
+
+def _raw_header(path: str | Path, skiprows: int = 0) -> list[str]:
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        rows = csv.reader(f)
+        for _ in range(skiprows):
+            next(rows, None)
+        # Como pandas, se saltan las líneas vacías antes de la cabecera
+        return next((row for row in rows if row), [])
+
+
+def read_header(path: str | Path, skiprows: int = 0, rename: dict | None = None) -> list[str]:
+    """Column names of the CSV at `path` (after `rename` and stripping), without parsing it."""
+    rename = rename or {}
+    return [rename.get(c, c).strip() for c in _raw_header(path, skiprows)]
+
+
+class PandasBackend:
+    """Single-threaded pandas C parser with object strings, cleaned column by column."""
+
+    name = "pandas"
+
+    def read(self, path: str | Path, schema: CsvSchema) -> pd.DataFrame:
+        df = pd.read_csv(path, skiprows=schema.skiprows)
+        if schema.rename:
+            df = df.rename(columns=schema.rename)
+        df.columns = get_columns(df)
+
+        for col, date_col in schema.dates.items():
+            df[date_col] = convert_to_datetime(df[[col]], DATE_FORMAT)[col]
+        for col, cents_col in schema.money.items():
+            df[cents_col] = parse_cents(df[col], schema.rounding)
+            df[col] = from_cents(df[cents_col])
+        for col in schema.numbers:
+            if col in df.columns and col not in schema.money:
+                df[col] = remove_dollar_comma(df[[col]])[col]
+                df[col] = convert_to_numeric(df[[col]])[col]
+        for col in schema.strings:
+            df[col] = fill_na(df[[col]])[col]
+        return df
+
+
+class ArrowBackend:
+    """Multithreaded Arrow CSV reader with Arrow-backed strings (`string[pyarrow]`).
+
+    The schema's columns are read as strings and converted with Arrow
+    compute kernels: dates with `strptime`, amounts and numbers by stripping
+    `$`/`,` and casting. Amounts that are not exact to the cent are parsed
+    again from the text like in the pandas backend, so both give the same
+    values. A file the Arrow reader rejects (e.g. rows with fewer fields
+    than the header) or missing columns of the schema is read with the
+    pandas backend instead (same frame or error), counted in the
+    `csv.fallback` profiling counter.
+    """
+
+    name = "arrow"
+
+    def __init__(self, block_size: int = 16 << 20):
+        self.block_size = block_size
+
+    def read(self, path: str | Path, schema: CsvSchema) -> pd.DataFrame:
+        import pyarrow as pa
+
+        header = _raw_header(path, schema.skiprows)
+        names = [schema.rename.get(c, c).strip() for c in header]
+        required = set(schema.dates) | set(schema.money) | set(schema.strings)
+        if required <= set(names):
+            try:
+                return self._read(path, schema, header, names)
+            except pa.ArrowInvalid:
+                pass
+        count("csv.fallback")
+        return PandasBackend().read(path, schema)
+
+    def _read(
+        self, path: str | Path, schema: CsvSchema, header: list[str], names: list[str]
+    ) -> pd.DataFrame:
+        import pyarrow as pa
+        import pyarrow.compute as pc
+        import pyarrow.csv as pacsv
+
+        typed = set(schema.dates) | set(schema.money) | set(schema.numbers) | set(schema.strings)
+        table = pacsv.read_csv(
+            path,
+            read_options=pacsv.ReadOptions(
+                skip_rows=schema.skiprows, use_threads=True, block_size=self.block_size
+            ),
+            convert_options=pacsv.ConvertOptions(
+                column_types={
+                    raw: pa.string() for raw, name in zip(header, names) if name in typed
+                },
+                strings_can_be_null=True,
+            ),
+        )
+        table = table.rename_columns(names)
+
+        for i, column in enumerate(table.columns):
+            # Columnas vacías: float NaN, como en pandas
+            if pa.types.is_null(column.type):
+                table = table.set_column(i, names[i], column.cast(pa.float64()))
+        for col in schema.numbers:
+            if col in names and col not in schema.money:
+                text = pc.replace_substring_regex(table[col], r"[$,]", "")
+                valid = pc.match_substring_regex(text, _NUMBER)
+                # Como pd.to_numeric: enteros si todos los valores lo son
+                if pc.all(pc.match_substring_regex(text, _INTEGER)).as_py() and not text.null_count:
+                    values = text.cast(pa.int64())
+                else:
+                    values = pc.if_else(valid, text, None).cast(pa.float64())
+                table = table.set_column(names.index(col), col, values)
+        for col in schema.strings:
+            table = table.set_column(names.index(col), col, pc.fill_null(table[col], ""))
+        dates = {
+            date_col: pc.strptime(table[col], format=DATE_FORMAT, unit="ns", error_is_null=True)
+            for col, date_col in schema.dates.items()
+        }
+        amounts = {}
+        for col in schema.money:
+            text = pc.replace_substring_regex(table[col], r"[$,\s]", "")
+            valid = pc.match_substring_regex(text, _NUMBER)
+            amounts[col] = (
+                pc.if_else(valid, text, None).cast(pa.float64()).to_numpy(zero_copy_only=False)
+            )
+
+        df = table.to_pandas(types_mapper=_pandas_dtype, split_blocks=True)
+        for date_col, values in dates.items():
+            df[date_col] = values.to_pandas()
+        for col, cents_col in schema.money.items():
+            df[cents_col] = cents_from_values(amounts[col], df[col], schema.rounding)
+            df[col] = from_cents(df[cents_col])
+        return df
+
+
+def _pandas_dtype(arrow_type) -> pd.api.extensions.ExtensionDtype | None:
+    import pyarrow as pa
+
+    if pa.types.is_string(arrow_type) or pa.types.is_large_string(arrow_type):
+        return pd.StringDtype("pyarrow")
+    return None
+
+
+BACKENDS = {"pandas": PandasBackend, "arrow": ArrowBackend}
+
+
+def get_backend(name: str | None = None) -> PandasBackend | ArrowBackend:
+    """CSV backend by name (`pandas`, `arrow` or `auto`; default `DEC_RENTA_CSV_BACKEND`).
+
+    `auto` uses Arrow when `pyarrow` is installed and pandas otherwise.
+    """
+    name = (name or os.environ.get("DEC_RENTA_CSV_BACKEND") or "auto").lower()
+    if name == "auto":
+        try:
+            import pyarrow  # noqa: F401
+
+            name = "arrow"
+        except ImportError:
+            name = "pandas"
+    if name not in BACKENDS:
+        raise ValueError(
+            f"Backend de CSV desconocido: {name} (opciones: auto, {', '.join(BACKENDS)})."
+        )
+    if name == "arrow":
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            raise ValueError(
+                "El backend de CSV 'arrow' requiere pyarrow (pip install 'dec-renta-schwab[arrow]')."
+            ) from None
+    return BACKENDS[name]()
@@ -0,0 +1,109 @@
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+
+from common.fx import DEFAULT_CURRENCY
+from model_100.utils.dictionary import DIVIDEND_ACTIONS, TAX_ACTIONS
+
+# Ejes del cubo, en el orden de su índice
+CUBE_DIMENSIONS = ["Symbol", "category", "month", "currency"]
+CUBE_MEASURES = ["amount_cents", "amount_eur_cents"]
+# Categoría de cada acción del export de transacciones que entra en el cubo
+ACTION_CATEGORIES = {
+    **{action: "dividend" for action in DIVIDEND_ACTIONS},
+    **{action: "tax" for action in TAX_ACTIONS},
+}
+# Columnas de salida de cada categoría
+CATEGORY_COLUMNS = {"dividend": "dividend_gross_cents", "tax": "foreign_tax_cents"}
+
+
+def empty_cube() -> pd.DataFrame:
+    return pd.DataFrame(
+        columns=CUBE_MEASURES,
+        index=pd.MultiIndex.from_tuples([], names=CUBE_DIMENSIONS),
+        dtype="int64",
+    )
+
+
+def _factorize(values) -> tuple[np.ndarray, pd.Index]:
+    """Sorted codes and levels of `values`; missing values are the last level."""
+    code, level = pd.factorize(values, sort=True)
+    code = code.astype(np.int64)
+    missing = code < 0
+    if missing.any():
+        code[missing] = len(level)
+        level = pd.Index(level).append(pd.Index([np.nan]))
+    return code, pd.Index(level)
+
+
+def build_cube(tx: pd.DataFrame) -> pd.DataFrame:
+    """Cent sums of the dividend and tax rows of `tx` by `CUBE_DIMENSIONS`.
+
+    `tx` has its EUR cents (`amount_eur_cents`) already converted. Each row
+    gets one integer cell key from its factorized dimensions and the cells
+    are summed in one sorted pass (exact int64); every breakdown of the
+    Modelo 100 is a slice of the cube. Cubes are additive (`add_sums`), so
+    chunks and checkpoints of a year combine into the cube of the whole year.
+    """
+    # Las acciones distintas son pocas: se clasifican una vez cada una
+    action, actions = pd.factorize(tx["Action"])
+    category_of = pd.Index(actions).map(ACTION_CATEGORIES)
+    keep = np.asarray(pd.notna(category_of))[action] & (action >= 0)
+    # Importe en blanco: no suma (como en las sumas de pandas, que omiten NA)
+    keep &= tx[CUBE_MEASURES].notna().all(axis=1).to_numpy()
+    if not keep.any():
+        return empty_cube()
+    rows = tx[keep]
+    currency = (
+        rows["currency"]
+        if "currency" in rows.columns
+        else pd.Series(DEFAULT_CURRENCY, index=rows.index)
+    )
+    levels, codes = [], []
+    for values in (
+        rows["Symbol"],
+        category_of.take(action[keep]),
+        rows["date"].dt.month,
+        currency,
+    ):
+        code, level = _factorize(values)
+        levels.append(level)
+        codes.append(code)
+
+    sizes = [len(level) for level in levels]
+    key = np.ravel_multi_index(codes, sizes)
+    order = np.argsort(key, kind="stable")
+    cells, starts = np.unique(key[order], return_index=True)
+    measures = rows[CUBE_MEASURES].to_numpy(np.int64)[order]
+    sums = np.add.reduceat(measures, starts, axis=0)
+
+    index = pd.MultiIndex.from_arrays(
+        [level.take(code) for level, code in zip(levels, np.unravel_index(cells, sizes))],
+        names=CUBE_DIMENSIONS,
+    )
+    return pd.DataFrame(sums, index=index, columns=CUBE_MEASURES)
+
+
+def dividend_sums(cube: pd.DataFrame, by: str | pd.Series = "Symbol") -> pd.DataFrame:
+    """Gross dividends, foreign taxes and net dividends in EUR cents, by `by`.
+
+    `by` is a dimension of the cube, or a series mapping the symbols to
+    another key (e.g. their country).
+    """
+    eur = cube["amount_eur_cents"]
+    if isinstance(by, pd.Series):
+        symbols = eur.index.get_level_values("Symbol")
+        keys = [pd.Index(symbols.map(by), name=by.name), eur.index.get_level_values("category")]
+    else:
+        keys = [by, "category"]
+    sums = eur.groupby(keys, dropna=False).sum().unstack("category")
+    sums = (
+        sums.reindex(columns=list(CATEGORY_COLUMNS))
+        .fillna(0)
+        .astype("int64")
+        .rename(columns=CATEGORY_COLUMNS)
+    )
+    sums.columns.name = None
+    sums["dividend_net_cents"] = sums["dividend_gross_cents"] + sums["foreign_tax_cents"]
+    return sums
@@ -0,0 +1,292 @@
+from __future__ import annotations
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Protocol
+import threading
+import time
+
+import pandas as pd
+
+from model_720.utils.dictionary import COUNTRY_CODES, METADATA_COLUMNS
+
+
+class MetadataProvider(Protocol):
+    """Source of ISIN and fiscal-domicile data for a single ticker.
+
+    `rate_limit` is the maximum calls per second the source tolerates
+    (None for local sources that need no pacing).
+    """
+
+    name: str
+    rate_limit: float | None
+
+    def fetch(self, ticker: str) -> dict[str, str]:
+        """Returns the metadata columns (without `Ticker`) for `ticker`."""
+        ...
+
+
+def normalize_country_code(country: str) -> str:
+    if not country:
+        return ""
+    value = str(country).strip()
+    if len(value) == 2:
+        return value.upper()
+    return COUNTRY_CODES.get(value, "")
+
+
+class YFinanceProvider:
+    """Metadata from yfinance (ISIN plus the company address as fiscal domicile)."""
+
+    name = "yfinance"
+    rate_limit = 4.0
+
+    def fetch(self, ticker: str) -> dict[str, str]:
+        import yfinance as yf
+
+        ticker_obj = yf.Ticker(ticker)
+        isin = ""
+        info = {}
+        errors = []
+        try:
+            if hasattr(ticker_obj, "get_isin"):
+                isin = ticker_obj.get_isin() or ""
+        except Exception as e:
+            errors.append(e)
+
+        if not isin:
+            try:
+                info = ticker_obj.get_info()
+            except Exception as e:
+                errors.append(e)
+                info = {}
+            isin = info.get("isin", "") or ""
+
+        if not isin:
+            try:
+                info = ticker_obj.info
+            except Exception as e:
+                errors.append(e)
+                info = info or {}
+            isin = info.get("isin", "") or ""
+
+        # Sin ningún dato y con errores: fallo transitorio, se reintenta
+        if not isin and not info and errors:
+            raise errors[-1]
+
+        address1 = info.get("address1", "") or ""
+        address2 = info.get("address2", "") or ""
+        city = info.get("city", "") or ""
+        state = info.get("state", "") or ""
+        zip_code = info.get("zip", "") or ""
+        country = info.get("country", "") or ""
+        domicilio_parts = [p for p in [address1, address2] if p]
+        domicilio = ", ".join(domicilio_parts)
+        for part in [city, state, zip_code, country]:
+            if part:
+                domicilio = f"{domicilio}, {part}" if domicilio else part
+
+        return {
+            "ISIN": isin,
+            "Domicilio Fiscal": domicilio,
+            "Poblacion": city,
+            "Pais Dom Fiscal": normalize_country_code(country),
+        }
+
+
+class StaticProvider:
+    """In-memory provider (local fake for tests and offline runs).
+
+    `latency` delays every call and `failures` makes the first N calls of
+    each ticker raise `ConnectionError`, as a flaky remote source would.
+    """
+
+    name = "static"
+    rate_limit = None
+
+    def __init__(
+        self, data: dict[str, dict[str, str]], latency: float = 0.0, failures: int = 0
+    ):
+        self.data = data
+        self.latency = latency
+        self.failures = failures
+        self.calls: Counter = Counter()
+        self._lock = threading.Lock()
+
+    def fetch(self, ticker: str) -> dict[str, str]:
+        with self._lock:
+            self.calls[ticker] += 1
+            attempt = self.calls[ticker]
+        if self.latency:
+            time.sleep(self.latency)
+        if attempt <= self.failures:
+            raise ConnectionError(f"fallo simulado {attempt} de {ticker}")
+        return dict(self.data.get(ticker, {}))
+
+
+def default_metadata_provider() -> MetadataProvider | None:
+    """yfinance when installed, otherwise no enrichment."""
+    try:
+        import yfinance  # noqa: F401
+    except Exception:
+        return None
+    return YFinanceProvider()
+
+
+class TokenBucket:
+    """Thread-safe token bucket: `rate` tokens per second, bursts up to `capacity`."""
+
+    def __init__(self, rate: float, capacity: float | None = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(rate, 1.0)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(
+                    self.capacity, self._tokens + (now - self._updated) * self.rate
+                )
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+@dataclass(frozen=True)
+class CallStats:
+    provider: str
+    ticker: str
+    attempt: int
+    outcome: str  # ok | error | timeout
+    seconds: float
+    error: str = ""
+
+
+@dataclass
+class EnrichmentReport:
+    calls: list[CallStats] = field(default_factory=list)
+
+    def to_frame(self) -> pd.DataFrame:
+        return pd.DataFrame(
+            [c.__dict__ for c in self.calls], columns=list(CallStats.__dataclass_fields__)
+        )
+
+    def summary(self) -> pd.DataFrame:
+        """Per-provider call counts, outcomes and latency."""
+        calls = self.to_frame()
+        if calls.empty:
+            return pd.DataFrame()
+        grouped = calls.groupby("provider")
+        return pd.DataFrame(
+            {
+                "calls": grouped.size(),
+                "tickers": grouped["ticker"].nunique(),
+                "ok": grouped["outcome"].apply(lambda s: int((s == "ok").sum())),
+                "errors": grouped["outcome"].apply(
+                    lambda s: int((s == "error").sum())
+                ),
+                "timeouts": grouped["outcome"].apply(
+                    lambda s: int((s == "timeout").sum())
+                ),
+                "seconds_mean": grouped["seconds"].mean(),
+                "seconds_max": grouped["seconds"].max(),
+            }
+        )
+
+
+class MetadataEnricher:
+    """Fetches metadata for many tickers concurrently.
+
+    Calls are bounded to `max_workers` in flight (including calls abandoned
+    after `timeout`), paced by a token bucket of `rate_per_second` (by default
+    the provider's `rate_limit`), and failed or timed-out calls are retried
+    `retries` times with exponential backoff.
+    """
+
+    def __init__(
+        self,
+        provider: MetadataProvider,
+        max_workers: int = 8,
+        rate_per_second: float | None = None,
+        retries: int = 2,
+        backoff: float = 0.5,
+        timeout: float = 15.0,
+    ):
+        self.provider = provider
+        self.max_workers = max_workers
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+        rate = rate_per_second or getattr(provider, "rate_limit", None)
+        self._bucket = TokenBucket(rate) if rate else None
+        self._slots = threading.BoundedSemaphore(max_workers)
+        self._lock = threading.Lock()
+
+    def _call(self, ticker: str) -> dict[str, str]:
+        """One provider call, abandoned (not killed) after `timeout`."""
+        result: dict = {}
+
+        def target() -> None:
+            try:
+                result["value"] = self.provider.fetch(ticker)
+            except Exception as e:
+                result["error"] = e
+            finally:
+                self._slots.release()
+
+        if not self._slots.acquire(timeout=self.timeout):
+            raise TimeoutError(f"{self.provider.name} saturado para {ticker}")
+        if self._bucket is not None:
+            self._bucket.acquire()
+        thread = threading.Thread(target=target, daemon=True)
+        thread.start()
+        thread.join(self.timeout)
+        if thread.is_alive():
+            raise TimeoutError(f"{self.provider.name} no responde para {ticker}")
+        if "error" in result:
+            raise result["error"]
+        return result["value"]
+
+    def _fetch_one(self, ticker: str, report: EnrichmentReport) -> dict[str, str]:
+        for attempt in range(1, self.retries + 2):
+            start = time.perf_counter()
+            try:
+                value = self._call(ticker)
+                outcome, error = "ok", ""
+            except TimeoutError as e:
+                value, outcome, error = None, "timeout", str(e)
+            except Exception as e:
+                value, outcome, error = None, "error", f"{type(e).__name__}: {e}"
+            with self._lock:
+                report.calls.append(
+                    CallStats(
+                        self.provider.name,
+                        ticker,
+                        attempt,
+                        outcome,
+                        time.perf_counter() - start,
+                        error,
+                    )
+                )
+            if value is not None:
+                return {"Ticker": ticker, **value}
+            if attempt <= self.retries:
+                time.sleep(self.backoff * 2 ** (attempt - 1))
+        return {"Ticker": ticker}
+
+    def enrich(self, tickers: list[str]) -> tuple[pd.DataFrame, EnrichmentReport]:
+        """Metadata of `tickers` (blank fields when unavailable) plus call statistics."""
+        report = EnrichmentReport()
+        if not tickers:
+            return pd.DataFrame(columns=METADATA_COLUMNS), report
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            rows = list(pool.map(lambda t: self._fetch_one(t, report), tickers))
+
+        return pd.DataFrame(rows, columns=METADATA_COLUMNS).fillna(""), report
@@ -1,66 +1,612 @@
 from __future__ import annotations
-from dataclasses import dataclass
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import copy_context
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from functools import cached_property
 from pathlib import Path
+import os
+
+import numpy as np
 import pandas as pd
-import requests
 
+from .http import HttpClient, ValidatorStore
+from .locking import atomic_write, lock_for, single_flight
 from .pandas_transform import convert_to_numeric
+from .profiling import count
+
+ECB_BASE = "https://data-api.ecb.europa.eu/service/data"
 
 
 @dataclass(frozen=True)
 class FxConfig:
     cache_dir: Path = Path(".cache/dec_renta")
+    # DEC_RENTA_ECB_URL apunta a otro servidor (p.ej. un stub local en pruebas)
+    ecb_base: str = field(
+        default_factory=lambda: os.environ.get("DEC_RENTA_ECB_URL", ECB_BASE)
+    )
+
+
+# Primer día de la serie EXR del BCE; la posición en el store es `ordinal - EPOCH`
+RATE_EPOCH = date(1999, 1, 1)
+# Días previos que se piden además del rango para poder hacer forward-fill
+# (último día hábil anterior) desde el primer día del rango.
+LOOKBACK_DAYS = 10
+# Divisa de los importes cuando el export no la indica (Schwab US)
+DEFAULT_CURRENCY = "USD"
+# Divisas que se piden al BCE si las entradas no indican otras
+FX_CURRENCIES = (DEFAULT_CURRENCY,)
+# Peticiones simultáneas al BCE al descargar varios años
+FETCH_WORKERS = 4
+
+
+def _normalize(currencies) -> tuple[str, ...]:
+    """Unique upper-case currency codes, in order; EUR needs no series."""
+    codes = dict.fromkeys(str(c).strip().upper() for c in currencies)
+    return tuple(c for c in codes if c and c != "EUR")
+
+
+def currencies_of(df: pd.DataFrame) -> tuple[str, ...]:
+    """Currencies of `df` needing an ECB series (USD without a `currency` column)."""
+    if "currency" not in df.columns:
+        return (DEFAULT_CURRENCY,)
+    return _normalize(df["currency"].dropna().unique())
+
+
+def _record(currencies: tuple[str, ...]) -> np.dtype:
+    """Store record: the fixing of each currency and whether its day was fetched."""
+    return np.dtype(
+        [(c, "<f8") for c in currencies] + [(f"{c}_covered", "?") for c in currencies]
+    )
+
+
+@dataclass(frozen=True)
+class RateTable:
+    """Sorted ECB fixings of several currencies for batched as-of lookups.
+
+    `dates` is a sorted datetime64[D] array of fixing days and `per_eur` a
+    dense (day x currency) matrix with the units of each of `currencies`
+    per EUR in force on those days (forward-filled; NaN before the first
+    fixing of a currency). A 1-D `per_eur` is a table of a single currency.
+    """
+
+    dates: np.ndarray
+    per_eur: np.ndarray
+    currencies: tuple[str, ...] = (DEFAULT_CURRENCY,)
+
+    def __post_init__(self):
+        per_eur = np.asarray(self.per_eur, dtype="f8")
+        if per_eur.ndim == 1:
+            per_eur = per_eur.reshape(-1, 1)
+        if per_eur.shape != (len(self.dates), len(self.currencies)):
+            raise ValueError("La matriz de tipos no cuadra con fechas y divisas.")
+        object.__setattr__(self, "per_eur", per_eur)
+        object.__setattr__(self, "currencies", tuple(self.currencies))
+
+    @classmethod
+    def from_series(cls, rates: pd.Series, currency: str = DEFAULT_CURRENCY) -> RateTable:
+        """Builds a table from a date -> per-EUR series (NaN days are dropped)."""
+        return cls.from_frame(rates.rename(currency).to_frame())
+
+    @classmethod
+    def from_frame(cls, rates: pd.DataFrame) -> RateTable:
+        """Builds a table from a date x currency frame of fixings (NaN: no fixing)."""
+        rates = rates.dropna(how="all").sort_index(kind="stable").ffill()
+        dates = pd.to_datetime(pd.Index(rates.index)).to_numpy(dtype="datetime64[D]")
+        return cls(dates, rates.to_numpy(dtype="f8"), _normalize(rates.columns))
+
+    @property
+    def usd_per_eur(self) -> np.ndarray:
+        return self.column(DEFAULT_CURRENCY)
+
+    def column(self, currency: str) -> np.ndarray:
+        """Fixings of `currency` on each of `dates`."""
+        return self.per_eur[:, self.currencies.index(currency)]
+
+    def _columns(self, currency: str | pd.Series, n: int) -> np.ndarray:
+        """Column of each row's currency in `per_eur` (-1 unknown, -2 EUR)."""
+        index = pd.Index(self.currencies)
+        if isinstance(currency, str):
+            codes = pd.Index([currency.strip().upper()])
+            cols = np.where(codes == "EUR", -2, index.get_indexer(codes))
+            return np.full(n, cols[0])
+        values = pd.Series(currency)
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            # Pocas categorías: se resuelven una vez y se indexan por código
+            codes = pd.Index(values.cat.categories.astype(str).str.strip().str.upper())
+            lookup = np.append(np.where(codes == "EUR", -2, index.get_indexer(codes)), -1)
+            return lookup[values.cat.codes.to_numpy()]
+        codes = pd.Index(values.astype(str).str.strip().str.upper())
+        return np.where(codes == "EUR", -2, index.get_indexer(codes))
+
+    def asof(
+        self, when: pd.Series, currency: str | pd.Series = DEFAULT_CURRENCY
+    ) -> pd.Series:
+        """Per-EUR rate of the last fixing on or before each date, in each row's currency.
+
+        `currency` is one code for every row or a series aligned with `when`.
+        EUR rows get 1.0; rows without fixing or of an unknown currency, NaN.
+        """
+        days = pd.to_datetime(when).to_numpy(dtype="datetime64[D]")
+        cols = self._columns(currency, len(days))
+        pos = np.searchsorted(self.dates, days, side="right") - 1
+        dated = ~np.isnat(days)
+        found = (pos >= 0) & dated & (cols >= 0)
+        values = np.full(len(days), np.nan)
+        values[found] = self.per_eur[pos[found], cols[found]]
+        values[dated & (cols == -2)] = 1.0
+        return pd.Series(values, index=when.index, name="fx_per_eur")
+
+    def rate_on(self, day: date, currency: str = DEFAULT_CURRENCY) -> float:
+        """Rate of the last fixing on or before `day` (NaN if there is none)."""
+        return float(self.asof(pd.Series([pd.Timestamp(day)]), currency).iloc[0])
+
+
+class FxRateStore:
+    """Array-backed store of daily ECB fixings, a dense day x currency matrix.
+
+    One record per calendar day, positioned by date ordinal since
+    `RATE_EPOCH`, with one field per currency (NaN on days without fixing:
+    weekends, holidays) and a `<currency>_covered` flag for the days already
+    downloaded. The file is memory-mapped and loaded lazily on the first
+    lookup. A store of the older USD-only layout at `legacy_path` is read as
+    the USD column. Writes hold `lock` (shared by every process using the
+    file) and merge into the file as it is on disk, so concurrent runs
+    never lose each other's fixings.
+    """
+
+    def __init__(self, path: Path, legacy_path: Path | None = None):
+        self.path = path
+        self.legacy_path = legacy_path
+        self.lock = lock_for(path)
+        self._data: np.ndarray | None = None
+        self._last: dict[str, np.ndarray] = {}
+        self._signature: tuple[int, int, int] | None = None
+
+    def _file_signature(self) -> tuple[int, int, int] | None:
+        try:
+            st = self.path.stat()
+        except FileNotFoundError:
+            return None
+        return (st.st_ino, st.st_size, st.st_mtime_ns)
+
+    def reload(self) -> None:
+        """Drops the loaded data if the file was replaced (e.g. by another process)."""
+        if self._data is not None and self._file_signature() != self._signature:
+            self._data = None
+            self._last = {}
+
+    def _load(self) -> np.ndarray:
+        if self._data is None:
+            self._signature = self._file_signature()
+            if self.path.exists():
+                self._data = np.load(self.path, mmap_mode="r")
+            elif self.legacy_path is not None and self.legacy_path.exists():
+                legacy = np.load(self.legacy_path)
+                data = np.zeros(len(legacy), dtype=_record((DEFAULT_CURRENCY,)))
+                data[DEFAULT_CURRENCY] = legacy["usd_per_eur"]
+                data[f"{DEFAULT_CURRENCY}_covered"] = legacy["covered"]
+                self._data = data
+            else:
+                self._data = np.zeros(0, dtype=_record((DEFAULT_CURRENCY,)))
+            self._last = {}
+        return self._data
+
+    @property
+    def currencies(self) -> tuple[str, ...]:
+        """Currencies with a column in the store."""
+        return tuple(
+            name for name in self._load().dtype.names if not name.endswith("_covered")
+        )
+
+    def _last_fixing(self, currency: str) -> np.ndarray:
+        """Position of the last fixing of `currency` on or before each day (-1: none)."""
+        data = self._load()
+        if currency not in self._last:
+            if currency in self.currencies:
+                positions = np.arange(len(data))
+                has_fixing = ~np.isnan(data[currency])
+                last = np.maximum.accumulate(np.where(has_fixing, positions, -1))
+            else:
+                last = np.full(len(data), -1)
+            self._last[currency] = last
+        return self._last[currency]
+
+    @staticmethod
+    def _pos(day: date) -> int:
+        return max(day.toordinal() - RATE_EPOCH.toordinal(), 0)
+
+    @staticmethod
+    def _day(pos: int) -> date:
+        return date.fromordinal(RATE_EPOCH.toordinal() + pos)
+
+    def missing_ranges(
+        self, start: date, end: date, currencies: tuple[str, ...] = (DEFAULT_CURRENCY,)
+    ) -> list[tuple[date, date]]:
+        """Contiguous date ranges within [start, end] not yet fetched for some currency."""
+        data = self._load()
+        lo, hi = self._pos(start), self._pos(end) + 1
+        covered = np.zeros(hi - lo, dtype=bool)
+        known = np.ones(max(min(hi, len(data)) - lo, 0), dtype=bool)
+        for currency in _normalize(currencies):
+            if currency not in self.currencies:
+                known[:] = False
+                break
+            known &= data[f"{currency}_covered"][lo:hi]
+        covered[: len(known)] = known
+
+        edges = np.diff(np.concatenate(([1], covered.view(np.int8), [1])))
+        starts = np.flatnonzero(edges == -1)
+        ends = np.flatnonzero(edges == 1) - 1
+        return [(self._day(lo + a), self._day(lo + b)) for a, b in zip(starts, ends)]
+
+    def update(
+        self,
+        start: date,
+        end: date,
+        fixings: pd.DataFrame,
+        covered_until: date,
+        currencies: tuple[str, ...] = (DEFAULT_CURRENCY,),
+    ) -> None:
+        """Stores the fixings (`date`, `currency`, `per_eur`) fetched for [start, end]."""
+        with self.lock:
+            self.reload()
+            self._update(start, end, fixings, covered_until, _normalize(currencies))
+
+    def _update(
+        self,
+        start: date,
+        end: date,
+        fixings: pd.DataFrame,
+        covered_until: date,
+        currencies: tuple[str, ...],
+    ) -> None:
+        lo, hi = self._pos(start), self._pos(end) + 1
+        old = self._load()
+        fields = self.currencies + tuple(c for c in currencies if c not in self.currencies)
+
+        data = np.zeros(max(len(old), hi), dtype=_record(fields))
+        for currency in fields:
+            data[currency] = np.nan
+            if currency in old.dtype.names:
+                data[currency][: len(old)] = old[currency]
+                data[f"{currency}_covered"][: len(old)] = old[f"{currency}_covered"]
+
+        for currency in currencies:
+            data[currency][lo:hi] = np.nan
+            rows = fixings[fixings["currency"] == currency] if not fixings.empty else fixings
+            if not rows.empty:
+                pos = np.array([self._pos(d) for d in rows["date"]], dtype=np.int64)
+                data[currency][pos] = rows["per_eur"].to_numpy(dtype="f8")
+            data[f"{currency}_covered"][lo : min(self._pos(covered_until) + 1, hi)] = True
+
+        def save(tmp: Path) -> None:
+            with open(tmp, "wb") as f:
+                np.save(f, data)
+
+        atomic_write(self.path, save)
+        self._data = None
+        self._last = {}
+
+    def rate_on(self, day: date, currency: str = DEFAULT_CURRENCY) -> float:
+        """Returns the last fixing on or before `day` (NaN if there is none)."""
+        last = self._last_fixing(currency)
+        pos = min(self._pos(day), len(last) - 1)
+        if pos < 0 or last[pos] < 0:
+            return float("nan")
+        return float(self._data[currency][last[pos]])
+
+    def rates_between(
+        self, start: date, end: date, currency: str = DEFAULT_CURRENCY
+    ) -> pd.Series:
+        """Returns a daily date -> per-EUR series of `currency`, forward-filled."""
+        known = self._last_fixing(currency)
+        pos = np.arange(self._pos(start), self._pos(end) + 1)
+        last = np.full(len(pos), -1)
+        in_store = pos < len(known)
+        last[in_store] = known[pos[in_store]]
+        values = np.full(len(pos), np.nan)
+        values[last >= 0] = self._data[currency][last[last >= 0]]
+        idx = pd.date_range(start=start, end=end, freq="D").date
+        return pd.Series(values, index=idx, name=f"{currency.lower()}_per_eur")
+
+    def table(
+        self, start: date, end: date, currencies: tuple[str, ...] = (DEFAULT_CURRENCY,)
+    ) -> RateTable:
+        """Returns the fixings published within [start, end] as a `RateTable`."""
+        currencies = _normalize(currencies)
+        data = self._load()
+        lo, hi = self._pos(start), min(self._pos(end) + 1, len(data))
+        published = np.zeros(max(hi - lo, 0), dtype=bool)
+        for currency in currencies:
+            if currency in self.currencies:
+                published |= ~np.isnan(data[currency][lo:hi])
+        pos = lo + np.flatnonzero(published)
+
+        per_eur = np.full((len(pos), len(currencies)), np.nan)
+        for j, currency in enumerate(currencies):
+            last = self._last_fixing(currency)[pos]
+            # Forward-fill: un día sin fixing de una divisa toma su última anterior
+            per_eur[last >= 0, j] = data[currency][last[last >= 0]]
+        dates = np.datetime64(RATE_EPOCH, "D") + pos.astype("timedelta64[D]")
+        return RateTable(dates, per_eur, currencies)
 
 
 class ECBExchangeService:
-    """Service to fetch and manage exchange rates from the European Central Bank."""
+    """Service to fetch and manage exchange rates from the European Central Bank.
 
-    ECB_BASE = "https://data-api.ecb.europa.eu/service/data"
+    `currencies` are the ECB series kept in the store; all of them are
+    fetched together, one request per missing year, in parallel over a
+    pooled `HttpClient`. A refresh of data already in the store is a
+    conditional request: series the ECB reports unchanged (304) are not
+    downloaded again.
+    """
 
-    def __init__(self, config: FxConfig = FxConfig()):
-        self.config = config
+    ECB_BASE = ECB_BASE
 
-    def _fetch_from_ecb(self, start: str, end: str) -> pd.DataFrame:
-        # Serie diaria USD/EUR: EXR/D.USD.EUR.SP00.A
-        url = f"{self.ECB_BASE}/EXR/D.USD.EUR.SP00.A"
-        r = requests.get(
-            url,
-            params={"startPeriod": start, "endPeriod": end, "format": "csvdata"},
-            timeout=60,
+    def __init__(
+        self,
+        config: FxConfig | None = None,
+        currencies: tuple[str, ...] = FX_CURRENCIES,
+        http: HttpClient | None = None,
+    ):
+        # Config de cada servicio: DEC_RENTA_ECB_URL se lee al crearlo, no al importar
+        self.config = config = config or FxConfig()
+        self.currencies = _normalize(currencies)
+        self.store = FxRateStore(
+            config.cache_dir / "fx_per_eur.npy",
+            legacy_path=config.cache_dir / "fx_usd_per_eur.npy",
         )
+        if http is not None:
+            self.http = http
+
+    @cached_property
+    def http(self) -> HttpClient:
+        """Pooled client, created on the first download."""
+        return HttpClient(
+            "ecb", validators=ValidatorStore(self.config.cache_dir / "http_validators.json")
+        )
+
+    def _request(
+        self, start: str, end: str, currencies: tuple[str, ...]
+    ) -> tuple[str, dict]:
+        # Series diarias <divisa>/EUR en una sola petición: EXR/D.USD+GBP.EUR.SP00.A
+        url = f"{self.config.ecb_base}/EXR/D.{'+'.join(currencies)}.EUR.SP00.A"
+        return url, {"startPeriod": start, "endPeriod": end, "format": "csvdata"}
+
+    @staticmethod
+    def _parse_response(r) -> pd.DataFrame | None:
+        """Fixings of an ECB csvdata response (None when not modified)."""
+        if r.status_code == 304:
+            return None
+        # El BCE responde 404 cuando el rango no tiene ninguna fixing (festivos)
+        if r.status_code == 404:
+            return pd.DataFrame({"date": [], "currency": [], "per_eur": []})
         r.raise_for_status()
         df = pd.read_csv(pd.io.common.StringIO(r.text))
-        df = df.rename(columns={"TIME_PERIOD": "date", "OBS_VALUE": "usd_per_eur"})
+        df = df.rename(
+            columns={"TIME_PERIOD": "date", "OBS_VALUE": "per_eur", "CURRENCY": "currency"}
+        )
         df["date"] = pd.to_datetime(df["date"]).dt.date
-        df["usd_per_eur"] = convert_to_numeric(df[["usd_per_eur"]])["usd_per_eur"]
+        df["per_eur"] = convert_to_numeric(df[["per_eur"]])["per_eur"]
 
-        return df[["date", "usd_per_eur"]].dropna()
+        return df[["date", "currency", "per_eur"]].dropna()
 
-    def get_rates_for_year(self, year: int, refresh: bool = False) -> pd.Series:
-        """Get USD/EUR exchange rates for a specific year, with caching."""
-        self.config.cache_dir.mkdir(parents=True, exist_ok=True)
-        cache_path = self.config.cache_dir / f"fx_usd_per_eur_{year}.csv"
+    def _fetch_from_ecb(
+        self,
+        start: str,
+        end: str,
+        currencies: tuple[str, ...] = (DEFAULT_CURRENCY,),
+        conditional: bool = False,
+    ) -> pd.DataFrame | None:
+        """Fixings of `currencies` within [start, end]; None if unchanged (`conditional`)."""
+        url, params = self._request(start, end, currencies)
+        return self._parse_response(self.http.get(url, params, conditional))
+
+    def _fetch_many(
+        self, ranges: list[tuple[date, date, bool]], currencies: tuple[str, ...]
+    ) -> list[pd.DataFrame | None]:
+        """`_fetch_from_ecb` of each `(start, end, conditional)`, concurrently."""
+        calls = [
+            (a.isoformat(), b.isoformat(), currencies, conditional)
+            for a, b, conditional in ranges
+        ]
+        if len(calls) <= 1:
+            return [self._fetch_from_ecb(*call) for call in calls]
+        # Cada hilo copia el contexto: los contadores llegan a la etapa en curso
+        with ThreadPoolExecutor(max_workers=min(FETCH_WORKERS, len(calls))) as pool:
+            futures = [
+                pool.submit(copy_context().run, self._fetch_from_ecb, *call)
+                for call in calls
+            ]
+            return [future.result() for future in futures]
+
+    def _currencies(self, currencies) -> tuple[str, ...]:
+        return self.currencies if currencies is None else _normalize(currencies)
+
+    @staticmethod
+    def _merge(ranges: list[tuple[date, date]]) -> list[tuple[date, date]]:
+        """Union of date ranges as sorted, disjoint ranges."""
+        merged: list[tuple[date, date]] = []
+        for start, end in sorted(ranges):
+            if merged and start <= merged[-1][1] + timedelta(days=1):
+                merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+            else:
+                merged.append((start, end))
+        return merged
 
-        if cache_path.exists() and not refresh:
-            fx_raw = pd.read_csv(cache_path)
-            fx_raw["date"] = pd.to_datetime(fx_raw["date"]).dt.date
+    @staticmethod
+    def _by_year(start: date, end: date) -> list[tuple[date, date]]:
+        """[start, end] split at year boundaries (one request per year)."""
+        return [
+            (max(start, date(year, 1, 1)), min(end, date(year, 12, 31)))
+            for year in range(start.year, end.year + 1)
+        ]
+
+    def ensure_ranges(
+        self,
+        ranges: list[tuple[date, date]],
+        refresh: bool = False,
+        currencies: tuple[str, ...] | None = None,
+    ) -> None:
+        """Fetches the parts of every [start, end] of `ranges` missing from the store.
+
+        Missing days are requested per year and concurrently. With `refresh`
+        the whole ranges are requested again; years already in the store are
+        revalidated and only downloaded if the ECB data changed. Downloads
+        hold the store lock: simultaneous calls (threads or processes)
+        needing the same days wait for one download and reuse it.
+        """
+        currencies = self._currencies(currencies)
+        if not currencies:
+            return
+        ranges = [
+            (max(start - timedelta(days=LOOKBACK_DAYS), RATE_EPOCH), end)
+            for start, end in ranges
+        ]
+        plan = self._plan(ranges, refresh, currencies)
+        count("fx_store.miss" if plan else "fx_store.hit")
+        if not plan:
+            return
+
+        def pending() -> bool:
+            # Otro proceso o hilo puede haber descargado ya esos días
+            self.store.reload()
+            plan.clear()
+            plan.update(self._plan(ranges, refresh, currencies))
+            return bool(plan)
+
+        # Una descarga a la vez por store: las peticiones simultáneas la esperan y la reutilizan
+        single_flight(self.store.lock, pending, lambda: self._fetch_plan(plan, currencies))
+
+    def _plan(
+        self, ranges: list[tuple[date, date]], refresh: bool, currencies: tuple[str, ...]
+    ) -> dict[tuple[date, date], bool]:
+        """(start, end) of each request needed -> conditional (revalidating stored days)."""
+        plan: dict[tuple[date, date], bool] = {}
+        if refresh:
+            for a, b in self._merge(ranges):
+                for chunk in self._by_year(a, b):
+                    plan[chunk] = not self.store.missing_ranges(*chunk, currencies)
         else:
-            start, end = f"{year}-01-01", f"{year}-12-31"
-            fx_raw = self._fetch_from_ecb(start, end)
-            fx_raw.to_csv(cache_path, index=False)
+            missing = [
+                gap
+                for start, end in ranges
+                for gap in self.store.missing_ranges(start, end, currencies)
+            ]
+            for a, b in self._merge(missing):
+                plan.update(dict.fromkeys(self._by_year(a, b), False))
+        return plan
 
-        # Calendario diario con forward-fill (último día hábil anterior)
-        start, end = f"{year}-01-01", f"{year}-12-31"
-        idx = pd.date_range(start=start, end=end, freq="D").date
-        s = fx_raw.set_index("date")["usd_per_eur"].reindex(idx).ffill()
+    def _fetch_plan(
+        self, plan: dict[tuple[date, date], bool], currencies: tuple[str, ...]
+    ) -> None:
+        """Downloads the requests of `plan` and stores their fixings."""
+        chunks = sorted(plan)
+        fetched = self._fetch_many([(a, b, plan[(a, b)]) for a, b in chunks], currencies)
+        today = date.today()
+        for (range_start, range_end), fixings in zip(chunks, fetched):
+            if fixings is None:
+                # Sin cambios en el BCE: el store ya tiene esos días
+                continue
+            # Los días aún no publicados no se marcan como descargados
+            if range_end < today:
+                covered_until = range_end
+            elif not fixings.empty:
+                covered_until = max(fixings["date"])
+            else:
+                covered_until = range_start - timedelta(days=1)
+            self.store.update(range_start, range_end, fixings, covered_until, currencies)
+
+    def ensure_range(
+        self,
+        start: date,
+        end: date,
+        refresh: bool = False,
+        currencies: tuple[str, ...] | None = None,
+    ) -> None:
+        """Fetches only the parts of [start, end] missing from the rate store."""
+        self.ensure_ranges([(start, end)], refresh, currencies)
+
+    def get_rate(
+        self, day: date, refresh: bool = False, currency: str = DEFAULT_CURRENCY
+    ) -> float:
+        """Get the `currency`/EUR rate in force on `day` (last fixing on or before)."""
+        if currency.strip().upper() == "EUR":
+            return 1.0
+        self.ensure_range(day, day, refresh, (currency,))
+        return self.store.rate_on(day, currency)
+
+    def get_rates(
+        self,
+        start: date,
+        end: date,
+        refresh: bool = False,
+        currency: str = DEFAULT_CURRENCY,
+    ) -> pd.Series:
+        """Get daily `currency`/EUR rates (forward-filled) for a date range."""
+        self.ensure_range(start, end, refresh, (currency,))
+        return self.store.rates_between(start, end, currency)
+
+    def get_rate_table(
+        self,
+        start: date,
+        end: date,
+        refresh: bool = False,
+        currencies: tuple[str, ...] | None = None,
+    ) -> RateTable:
+        """Get the fixings needed to convert amounts dated within [start, end].
 
-        return s  # date -> usd_per_eur
+        One table for all `currencies` (by default, those of the service).
+        """
+        currencies = self._currencies(currencies)
+        self.ensure_range(start, end, refresh, currencies)
+        return self.store.table(start - timedelta(days=LOOKBACK_DAYS), end, currencies)
+
+    def get_rates_for_year(self, year: int, refresh: bool = False) -> pd.Series:
+        """Get USD/EUR exchange rates for a specific year, with caching."""
+        return self.get_rates(date(year, 1, 1), date(year, 12, 31), refresh)
 
     def get_usd_per_eur_on_dec31(self, year: int, refresh: bool = False) -> float:
         """Get USD/EUR exchange rate for December 31st of a specific year."""
-        return self.get_rates_for_year(year, refresh).iloc[-1]
+        return self.get_rate(date(year, 12, 31), refresh)
 
 
-def usd_to_eur(amount_usd: pd.Series, usd_per_eur: pd.Series) -> pd.Series:
-    """Helper to convert USD amounts to EUR using provided rates."""
+def usd_to_eur(
+    amount_usd: pd.Series,
+    usd_per_eur: pd.Series | float | RateTable,
+    on: pd.Series | None = None,
+) -> pd.Series:
+    """Helper to convert USD amounts to EUR using provided rates.
+
+    With a `RateTable`, `on` holds the date of each amount and every amount is
+    converted with the last fixing on or before that date.
+    """
+    if isinstance(usd_per_eur, RateTable):
+        if on is None:
+            raise ValueError("usd_to_eur con RateTable necesita las fechas (`on`).")
+        usd_per_eur = usd_per_eur.asof(on)
     return amount_usd / usd_per_eur
+
+
+def to_eur(
+    frame: pd.DataFrame,
+    amount_col: str,
+    date_col: str,
+    rates: RateTable,
+    currency_col: str = "currency",
+) -> pd.Series:
+    """Converts `amount_col` to EUR with the fixing of each row's date and currency.
+
+    One vectorized lookup for the whole frame; rows without a `currency_col`
+    are taken as USD.
+    """
+    currency = frame[currency_col] if currency_col in frame.columns else DEFAULT_CURRENCY
+    return frame[amount_col] / rates.asof(frame[date_col], currency)
+
+
+def missing_fixings(
+    frame: pd.DataFrame, rate_col: str = "fx_per_eur"
+) -> pd.DataFrame:
+    """Returns the rows of `frame` for which no fixing was found."""
+    return frame[frame[rate_col].isna()]
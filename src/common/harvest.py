@@ -0,0 +1,242 @@
+from __future__ import annotations
+from dataclasses import dataclass
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+# Regla de los dos meses (art. 33.5 LIRPF): la pérdida no computa si se recompraron
+# valores homogéneos en los dos meses anteriores y se siguen teniendo
+WASH_SALE_MONTHS = 2
+# Filas evaluadas por bloque (memoria acotada: bloque x símbolos enteros)
+CHUNK_ROWS = 65_536
+LOT_COLUMNS = ["Symbol", "open_date", "quantity", "cost_eur_cents"]
+
+
+@dataclass(frozen=True)
+class SaleOptions:
+    """Sales each symbol allows, as (symbol, k) tables: k = lots sold, oldest first.
+
+    Spanish tax rules sell homogeneous securities FIFO, so a sale of a
+    symbol is fully described by how many of its lots it takes; option 0
+    sells nothing. Tables are padded to the symbol with most lots (padding
+    is never chosen). Amounts are EUR cents; `deductible_cents` is the gain
+    once the losses deferred by the two-month rule are taken out. Only
+    earlier repurchases count: the rule also defers a loss when the same
+    securities are bought in the two months after the sale, and planned
+    repurchases are not modelled.
+    """
+
+    symbols: np.ndarray
+    n_options: np.ndarray
+    lots: np.ndarray
+    quantity: np.ndarray
+    proceeds_cents: np.ndarray
+    cost_cents: np.ndarray
+    gain_cents: np.ndarray
+    deductible_cents: np.ndarray
+
+    @property
+    def deferred_cents(self) -> np.ndarray:
+        return self.deductible_cents - self.gain_cents
+
+
+def sale_options(
+    lots: pd.DataFrame, price_eur_cents: pd.Series, sale_date: date
+) -> SaleOptions:
+    """FIFO sale options of the open `lots` at `price_eur_cents` per share (by symbol).
+
+    `lots` has `LOT_COLUMNS` (open date NaT when unknown). A loss is
+    deferred in the proportion of the lots bought within the two months
+    before `sale_date` that the sale leaves in the portfolio.
+    """
+    lots = lots[lots["Symbol"].isin(price_eur_cents.index) & (lots["quantity"] > 0)]
+    lots = lots.sort_values(["Symbol", "open_date"], kind="stable", na_position="first")
+    codes, symbols = pd.factorize(lots["Symbol"], sort=True)
+    n_lots = np.bincount(codes, minlength=len(symbols))
+    width = int(n_lots.max(initial=0)) + 1
+
+    # Posición de cada lote dentro de su símbolo (1 = el más antiguo)
+    starts = np.cumsum(n_lots) - n_lots
+    k = np.arange(len(codes)) - starts[codes] + 1
+
+    def by_option(values: np.ndarray) -> np.ndarray:
+        """Cumulative sum of `values` over the first k lots, as (symbol, k)."""
+        table = np.zeros((len(symbols), width), dtype=values.dtype)
+        table[codes, k] = values
+        return np.cumsum(table, axis=1)
+
+    quantity = by_option(lots["quantity"].to_numpy(np.float64))
+    cost = by_option(lots["cost_eur_cents"].to_numpy(np.int64))
+    price = price_eur_cents.reindex(symbols).to_numpy(np.float64)
+    proceeds = np.rint(quantity * price[:, None]).astype(np.int64)
+    gain = proceeds - cost
+
+    window = pd.Timestamp(sale_date) - pd.DateOffset(months=WASH_SALE_MONTHS)
+    recent = (lots["open_date"] > window).to_numpy() & lots["open_date"].notna().to_numpy()
+    recent_qty = by_option(np.where(recent, lots["quantity"].to_numpy(np.float64), 0.0))
+    # Recompras recientes que siguen en cartera tras vender los k primeros lotes
+    kept_recent = recent_qty[:, -1:] - recent_qty
+    with np.errstate(divide="ignore", invalid="ignore"):
+        deferred_share = np.where(quantity > 0, np.minimum(kept_recent / quantity, 1.0), 0.0)
+    deferred = np.where(gain < 0, np.rint(-gain * deferred_share), 0).astype(np.int64)
+
+    options = np.arange(width)
+    valid = options[None, :] <= n_lots[:, None]
+    return SaleOptions(
+        symbols=np.asarray(symbols, dtype=object),
+        n_options=n_lots + 1,
+        lots=np.where(valid, options[None, :], 0),
+        quantity=np.where(valid, quantity, 0.0),
+        proceeds_cents=np.where(valid, proceeds, 0),
+        cost_cents=np.where(valid, cost, 0),
+        gain_cents=np.where(valid, gain, 0),
+        deductible_cents=np.where(valid, gain + deferred, 0),
+    )
+
+
+def candidate_scenarios(
+    options: SaleOptions, max_scenarios: int = 200_000, seed: int = 0
+) -> np.ndarray:
+    """Scenarios to evaluate, one row per scenario: the option taken per symbol.
+
+    Every combination when there are at most `max_scenarios`; otherwise each
+    single-symbol sale, the greedy sequence that adds the symbols by their
+    largest deductible loss, and random combinations (each with its own
+    share of symbols sold) up to `max_scenarios`. Duplicates are dropped.
+    """
+    n = options.n_options
+    dtype = np.int16 if n.max(initial=1) < 2**15 else np.int32
+    total = float(np.prod(n.astype(np.float64)))
+    if total <= max_scenarios:
+        idx = np.arange(int(total))
+        radix = np.cumprod(np.r_[1, n[:-1]])
+        return ((idx[:, None] // radix[None, :]) % n[None, :]).astype(dtype)
+
+    n_symbols = len(n)
+    rows = []
+    # Cada venta de un solo símbolo
+    sym = np.repeat(np.arange(n_symbols), n - 1)
+    opt = np.concatenate([np.arange(1, m) for m in n])
+    singles = np.zeros((len(sym), n_symbols), dtype=dtype)
+    singles[np.arange(len(sym)), sym] = opt
+    rows.append(singles)
+
+    # Voraz: se añade símbolo a símbolo su venta de mayor pérdida deducible
+    best = np.argmin(options.deductible_cents, axis=1)
+    order = np.argsort(options.deductible_cents[np.arange(n_symbols), best], kind="stable")
+    greedy = np.zeros((n_symbols, n_symbols), dtype=dtype)
+    take = np.tril(np.ones((n_symbols, n_symbols), dtype=bool))
+    greedy[:, order] = np.where(take, best[order][None, :], 0)
+    rows.append(greedy)
+
+    budget = max(max_scenarios - sum(len(r) for r in rows), 0)
+    if budget:
+        rng = np.random.default_rng(seed)
+        # Proporción de símbolos vendidos distinta en cada fila (pocos o muchos)
+        share = rng.uniform(1 / max(n_symbols, 1), 1.0, size=(budget, 1))
+        sold = rng.random((budget, n_symbols)) < share
+        pick = 1 + np.floor(rng.random((budget, n_symbols)) * (n - 1)[None, :])
+        rows.append(np.where(sold, pick, 0).astype(dtype))
+
+    return np.unique(np.concatenate(rows), axis=0)
+
+
+def evaluate(
+    options: SaleOptions,
+    scenarios: np.ndarray,
+    realized_cents: int,
+    target_cents: int = 0,
+) -> pd.DataFrame:
+    """Totals of each scenario, computed in blocks of `CHUNK_ROWS` scenarios.
+
+    `net_gain_cents` is the year's realized gain plus the deductible gain of
+    the sales; `distance_cents` is how far it ends from `target_cents`.
+    """
+    columns = {
+        "proceeds_cents": options.proceeds_cents,
+        "gain_cents": options.gain_cents,
+        "deductible_cents": options.deductible_cents,
+    }
+    rows = np.arange(len(options.symbols))[None, :]
+    totals = {name: np.empty(len(scenarios), dtype=np.int64) for name in columns}
+    for start in range(0, len(scenarios), CHUNK_ROWS):
+        block = scenarios[start : start + CHUNK_ROWS]
+        for name, table in columns.items():
+            totals[name][start : start + len(block)] = table[rows, block].sum(axis=1)
+
+    net = realized_cents + totals["deductible_cents"]
+    return pd.DataFrame(
+        {
+            "net_gain_cents": net,
+            "distance_cents": np.abs(net - target_cents),
+            "sales_gain_cents": totals["gain_cents"],
+            "deferred_loss_cents": totals["deductible_cents"] - totals["gain_cents"],
+            "proceeds_cents": totals["proceeds_cents"],
+            "symbols_sold": (scenarios > 0).sum(axis=1),
+        }
+    )
+
+
+@dataclass(frozen=True)
+class HarvestResult:
+    """Best scenarios (`ranking`) and the sales of each one (`detail`)."""
+
+    ranking: pd.DataFrame
+    detail: pd.DataFrame
+    evaluated: int
+
+
+def simulate_harvest(
+    lots: pd.DataFrame,
+    price_eur_cents: pd.Series,
+    realized_cents: int,
+    sale_date: date,
+    target_cents: int = 0,
+    top: int = 20,
+    max_scenarios: int = 200_000,
+    seed: int = 0,
+) -> HarvestResult:
+    """Ranks sale scenarios of the open `lots` by the net gain they leave.
+
+    Scenarios closest to `target_cents` come first (0: gains fully offset,
+    no loss wasted); ties go to the one that sells less, then to the one
+    touching fewer symbols.
+    """
+    options = sale_options(lots, price_eur_cents, sale_date)
+    scenarios = candidate_scenarios(options, max_scenarios, seed)
+    scored = evaluate(options, scenarios, realized_cents, target_cents)
+    order = np.lexsort(
+        (
+            scored["symbols_sold"].to_numpy(),
+            scored["proceeds_cents"].to_numpy(),
+            scored["distance_cents"].to_numpy(),
+        )
+    )[:top]
+
+    ranking = scored.iloc[order].reset_index(drop=True)
+    ranking.insert(0, "scenario", np.arange(1, len(ranking) + 1))
+    chosen = scenarios[order]
+    scenario, sym = np.nonzero(chosen)
+    k = chosen[scenario, sym]
+    detail = pd.DataFrame(
+        {
+            "scenario": scenario + 1,
+            "Symbol": options.symbols[sym],
+            "lots": options.lots[sym, k],
+            "quantity": options.quantity[sym, k],
+            "proceeds_cents": options.proceeds_cents[sym, k],
+            "cost_cents": options.cost_cents[sym, k],
+            "gain_cents": options.gain_cents[sym, k],
+            "deferred_loss_cents": options.deductible_cents[sym, k]
+            - options.gain_cents[sym, k],
+        }
+    )
+    ranking["sales"] = [
+        "; ".join(
+            f"{row.Symbol}:{row.quantity:g}"
+            for row in detail[detail["scenario"] == i + 1].itertuples()
+        )
+        for i in range(len(ranking))
+    ]
+    return HarvestResult(ranking, detail, len(scenarios))
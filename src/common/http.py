@@ -0,0 +1,129 @@
+from __future__ import annotations
+from pathlib import Path
+import hashlib
+import json
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from common.locking import atomic_write_text, lock_for
+from common.profiling import count
+
+# Errores transitorios que se reintentan con backoff exponencial
+RETRY_STATUS = (429, 500, 502, 503, 504)
+
+
+class ValidatorStore:
+    """ETag / Last-Modified of each fetched request, persisted as JSON.
+
+    Requests are keyed by URL and query parameters, so a later request for
+    the same series and range can be revalidated instead of downloaded.
+    Each write merges into the file as it is on disk, under a lock shared
+    with the other processes.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._data: dict[str, dict[str, str]] | None = None
+        self._lock = threading.Lock()
+        self._file_lock = lock_for(path)
+
+    @staticmethod
+    def key(url: str, params: dict | None) -> str:
+        query = json.dumps(sorted((params or {}).items()), default=str)
+        return hashlib.sha256(f"{url}?{query}".encode()).hexdigest()
+
+    def _load(self) -> dict[str, dict[str, str]]:
+        if self._data is None:
+            try:
+                self._data = json.loads(self.path.read_text(encoding="utf-8"))
+            except (FileNotFoundError, ValueError):
+                self._data = {}
+        return self._data
+
+    def get(self, url: str, params: dict | None) -> dict[str, str]:
+        with self._lock:
+            return dict(self._load().get(self.key(url, params), {}))
+
+    def set(self, url: str, params: dict | None, validators: dict[str, str]) -> None:
+        with self._lock, self._file_lock:
+            # Otro proceso puede haber guardado sus validadores desde la última lectura
+            self._data = None
+            data = self._load()
+            data[self.key(url, params)] = validators
+            atomic_write_text(self.path, json.dumps(data, indent=1))
+
+
+class HttpClient:
+    """Pooled HTTP client with retries, compression and conditional requests.
+
+    One `requests.Session` keeps up to `pool_size` connections alive per
+    host; transient errors (connection, `RETRY_STATUS`) are retried up to
+    `retries` times with exponential backoff (honouring `Retry-After`).
+    With `conditional=True` and `validators`, a request sends the ETag /
+    Last-Modified of its previous response and a `304 Not Modified` skips
+    the download. Each request adds to the `http.<name>` profiling counter
+    and each 304 to `not_modified.<name>`.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        validators: ValidatorStore | None = None,
+        retries: int = 3,
+        backoff: float = 0.5,
+        timeout: tuple[float, float] = (10, 60),
+        pool_size: int = 8,
+    ):
+        self.name = name
+        self.validators = validators
+        self.timeout = timeout
+        self.pool_size = pool_size
+        self.session = requests.Session()
+        self.session.headers["Accept-Encoding"] = "gzip, deflate"
+        adapter = HTTPAdapter(
+            pool_connections=pool_size,
+            pool_maxsize=pool_size,
+            max_retries=Retry(
+                total=retries,
+                backoff_factor=backoff,
+                status_forcelist=RETRY_STATUS,
+                allowed_methods=frozenset({"GET"}),
+                respect_retry_after_header=True,
+                raise_on_status=False,
+            ),
+        )
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def get(
+        self, url: str, params: dict | None = None, conditional: bool = False
+    ) -> requests.Response:
+        """GETs `url`; with `conditional`, a 304 response means the data is unchanged."""
+        headers = {}
+        if conditional and self.validators is not None:
+            known = self.validators.get(url, params)
+            if "etag" in known:
+                headers["If-None-Match"] = known["etag"]
+            if "last_modified" in known:
+                headers["If-Modified-Since"] = known["last_modified"]
+
+        count(f"http.{self.name}")
+        r = self.session.get(url, params=params, headers=headers, timeout=self.timeout)
+        if r.status_code == 304:
+            # Fuera de `http.*`: no es una llamada de red más, sino el resultado de una
+            count(f"not_modified.{self.name}")
+        elif r.ok and self.validators is not None:
+            validators = {}
+            if r.headers.get("ETag"):
+                validators["etag"] = r.headers["ETag"]
+            if r.headers.get("Last-Modified"):
+                validators["last_modified"] = r.headers["Last-Modified"]
+            if validators:
+                self.validators.set(url, params, validators)
+        return r
+
+    def close(self) -> None:
+        self.session.close()
@@ -1,19 +1,24 @@
 from __future__ import annotations
 from dataclasses import dataclass
 from pathlib import Path
+from typing import TYPE_CHECKING
 import re
 
+if TYPE_CHECKING:
+    from common.catalog import FileCatalog
+
 DATE_YYYY = re.compile(r"(20\d{2})")
 
 @dataclass(frozen=True)
 class DataInputs:
-    transactions_csv: Path
-    realized_csv: Path
+    """Every matching export (one or more accounts, possibly overlapping), sorted by name."""
+    transactions_csvs: tuple[Path, ...]
+    realized_csvs: tuple[Path, ...]
     year: int
 
 @dataclass(frozen=True)
 class Inputs720:
-    positions_csv: Path
+    positions_csvs: tuple[Path, ...]
     year: int
 
 def infer_year_from_filename(path: Path) -> int:
@@ -22,48 +27,72 @@ def infer_year_from_filename(path: Path) -> int:
         raise ValueError(f"No encuentro el `year` en el filename: {path.name}")
     return int(m.group(1))
 
-def pick_single(glob_results: list[Path], label: str) -> Path:
+def pick_all(glob_results: list[Path], label: str) -> tuple[Path, ...]:
+    """Every matching file, sorted by name: each account and each partial export counts."""
     if len(glob_results) == 0:
         raise FileNotFoundError(f"No encuentro fichero para {label}")
-    if len(glob_results) > 1:
-        # Si hay varios, coger el más reciente por nombre (suele contener timestamp)
-        glob_results = sorted(glob_results, key=lambda p: p.name)
-        return glob_results[-1]
-    return glob_results[0]
+    return tuple(sorted(glob_results, key=lambda p: p.name))
+
+def of_year(paths: tuple[Path, ...], year: int | None, label: str) -> tuple[tuple[Path, ...], int]:
+    """`paths` whose filename year is `year`, and that year.
+
+    Without `year`, the latest filename year of any of them (names start
+    with the account, so the last name is not the newest export). Exports
+    of other years are left out instead of being merged.
+    """
+    if year is None:
+        dated = [p for p in paths if DATE_YYYY.search(p.name)]
+        year = max(map(infer_year_from_filename, dated or paths[-1:]))
+    kept = tuple(p for p in paths if DATE_YYYY.search(p.name) and infer_year_from_filename(p) == year)
+    if not kept:
+        raise FileNotFoundError(f"No encuentro fichero de {year} para {label}")
+    return kept, year
+
+def latest_per_account(paths: tuple[Path, ...]) -> tuple[Path, ...]:
+    """Newest snapshot (by name) of each account among `paths`."""
+    from common.accounts import account_of
+
+    latest = {account_of(p): p for p in paths}
+    return tuple(sorted(latest.values(), key=lambda p: p.name))
+
+def find(data_dir: str, pattern: str, catalog: FileCatalog | None = None) -> list[Path]:
+    """Files of `data_dir` matching `pattern`, from `catalog` if given (no directory scan)."""
+    if catalog is not None:
+        return catalog.glob(data_dir, pattern)
+    return list(Path(data_dir).glob(pattern))
 
 def resolve_inputs(
     data_dir: str,
     pattern_transactions: str = "Individual_*_Transactions_*.csv",
     pattern_realized: str = "*_GainLoss_Realized_Details_*.csv",
-    year: int | None = None
+    year: int | None = None,
+    catalog: FileCatalog | None = None,
 ) -> DataInputs:
-    d = Path(data_dir)
-    tx = pick_single(list(d.glob(pattern_transactions)), "transactions (compras y ventas de acciones)")
-    rg = pick_single(list(d.glob(pattern_realized)), "realized (dividendos)")
-
-    y_tx = infer_year_from_filename(tx)
-    y_rg = infer_year_from_filename(rg)
-
-    inferred = y_tx
+    tx, y_tx = of_year(
+        pick_all(find(data_dir, pattern_transactions, catalog), "transactions (compras y ventas de acciones)"),
+        year,
+        "transactions",
+    )
+    rg, y_rg = of_year(
+        pick_all(find(data_dir, pattern_realized, catalog), "realized (dividendos)"),
+        year,
+        "realized",
+    )
     if y_tx != y_rg:
         raise ValueError(f"Años distintos en filenames: tx={y_tx}, realized={y_rg}. Usa --year.")
-    if year is not None:
-        inferred = year
 
-    return DataInputs(tx, rg, inferred)
+    return DataInputs(tx, rg, y_tx)
 
 def resolve_positions_inputs(
     data_dir: str,
     pattern_positions: str = "Individual-Positions*.csv",
-    year: int | None = None
+    year: int | None = None,
+    catalog: FileCatalog | None = None,
 ) -> Inputs720:
-    d = Path(data_dir)
-    pos = pick_single(list(d.glob(pattern_positions)), "positions (acciones)")
-
-    y_pos = infer_year_from_filename(pos)
-
-    inferred = y_pos
-    if year is not None:
-        inferred = year
-
-    return Inputs720(pos, inferred)
+    """Positions at year end: the newest snapshot of each account of that year."""
+    pos, year = of_year(
+        pick_all(find(data_dir, pattern_positions, catalog), "positions (acciones)"),
+        year,
+        "positions",
+    )
+    return Inputs720(latest_per_account(pos), year)
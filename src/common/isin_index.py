@@ -0,0 +1,255 @@
+from __future__ import annotations
+from pathlib import Path
+from typing import Iterable
+import json
+import re
+import struct
+
+import numpy as np
+import pandas as pd
+
+from common.enrichment import normalize_country_code
+from common.locking import atomic_write
+from model_720.utils.dictionary import METADATA_COLUMNS
+
+INDEX_VERSION = 1
+_MAGIC = b"DRISIN\x00\x01"
+# Prefijo de cada clase de clave dentro del array ordenado de claves
+KEY_KINDS = {"ticker": b"T", "cusip": b"C", "isin": b"I"}
+# Países cuyo ISIN lleva dentro el CUSIP (`US` + CUSIP + dígito de control)
+_CUSIP_COUNTRIES = ("US", "CA")
+# Alias aceptados en la cabecera del volcado -> campo
+_DUMP_ALIASES = {
+    "ticker": "ticker",
+    "symbol": "ticker",
+    "isin": "isin",
+    "cusip": "cusip",
+    "domicilio fiscal": "domicilio",
+    "domicilio_fiscal": "domicilio",
+    "address": "domicilio",
+    "address1": "address1",
+    "address2": "address2",
+    "poblacion": "city",
+    "city": "city",
+    "state": "state",
+    "zip": "zip",
+    "postal_code": "zip",
+    "pais dom fiscal": "country",
+    "pais_dom_fiscal": "country",
+    "country": "country",
+}
+# Separadores de clase de acción que cambian entre fuentes (BRK/B, BRK.B, BRK-B)
+_TICKER_SEPARATORS = re.compile(r"[/\-\s]+")
+
+
+def normalize_key(value: str, kind: str = "ticker") -> str:
+    """Key form of a ticker, CUSIP or ISIN (upper case, one class separator)."""
+    value = str(value).strip().upper()
+    if kind == "ticker":
+        value = _TICKER_SEPARATORS.sub(".", value)
+    return value
+
+
+def _column(df: pd.DataFrame, name: str) -> pd.Series:
+    return df[name] if name in df.columns else pd.Series("", index=df.index)
+
+
+def _joined(parts: list[pd.Series]) -> pd.Series:
+    """Non-blank `parts` of each row joined with ", " (the yfinance address format)."""
+    out = parts[0]
+    for part in parts[1:]:
+        out = pd.Series(
+            np.where(part == "", out, np.where(out == "", part, out + ", " + part)),
+            index=out.index,
+        )
+    return out
+
+
+def read_dump(path: str | Path) -> pd.DataFrame:
+    """Reference dump (CSV, or JSON records) as `METADATA_COLUMNS` plus `CUSIP`.
+
+    The dump carries tickers, ISINs and/or CUSIPs, and either a ready
+    `Domicilio Fiscal` or its parts (`address1`, `city`, `country`, ...).
+    The CUSIP of a US/CA ISIN is derived when the dump does not give it.
+    """
+    path = Path(path)
+    if path.suffix.lower() == ".json":
+        raw = json.loads(path.read_text(encoding="utf-8"))
+        if isinstance(raw, dict):
+            raw = next((v for v in raw.values() if isinstance(v, list)), [])
+        df = pd.DataFrame.from_records(raw)
+    else:
+        df = pd.read_csv(path, dtype=str, keep_default_na=False)
+    df = df.rename(columns=lambda c: _DUMP_ALIASES.get(str(c).strip().lower(), c))
+    df = df.fillna("").astype(str).apply(lambda s: s.str.strip())
+
+    isin = _column(df, "isin").str.upper()
+    cusip = _column(df, "cusip").str.upper()
+    derive = (cusip == "") & (isin.str.len() == 12) & isin.str[:2].isin(_CUSIP_COUNTRIES)
+    cusip = cusip.mask(derive, isin.str[2:11])
+
+    country = _column(df, "country")
+    address = _joined(
+        [_joined([_column(df, "address1"), _column(df, "address2")])]
+        + [_column(df, c) for c in ("city", "state", "zip")]
+        + [country]
+    )
+    domicilio = _column(df, "domicilio")
+    out = pd.DataFrame(
+        {
+            "Ticker": _column(df, "ticker"),
+            "ISIN": isin,
+            "Domicilio Fiscal": domicilio.where(domicilio != "", address),
+            "Poblacion": _column(df, "city"),
+            "Pais Dom Fiscal": country.map(
+                {c: normalize_country_code(c) for c in country.unique()}
+            ),
+            "CUSIP": cusip,
+        }
+    )
+    return out[(out["Ticker"] != "") | (out["ISIN"] != "") | (out["CUSIP"] != "")]
+
+
+def _keys(values: pd.Series, kind: str) -> pd.Series:
+    """Index keys (kind prefix + normalized value) of `values`, as str."""
+    values = values.str.upper()
+    if kind == "ticker":
+        values = values.str.replace(_TICKER_SEPARATORS, ".", regex=True)
+    return KEY_KINDS[kind].decode() + values
+
+
+def compile_index(dump: str | Path, path: str | Path) -> IsinIndex:
+    """Compiles a reference dump into the on-disk index at `path`.
+
+    The file is written next to `path` and moved into place, so readers
+    never see a partial index (those that have it mapped keep the old one).
+    """
+    df = read_dump(dump).reset_index(drop=True)
+
+    keys = []
+    for kind, column in (("ticker", "Ticker"), ("cusip", "CUSIP"), ("isin", "ISIN")):
+        present = df[column] != ""
+        keys.append(
+            pd.DataFrame({"key": _keys(df.loc[present, column], kind), "ref": df.index[present]})
+        )
+    # Clave repetida: gana la última fila del volcado
+    keyed = pd.concat(keys, ignore_index=True).drop_duplicates("key", keep="last")
+    keyed = keyed.sort_values("key", kind="stable")
+    keys_arr = keyed["key"].str.encode("utf-8").to_numpy().astype(bytes)
+    refs_arr = keyed["ref"].to_numpy(dtype=np.int32)
+
+    encoded = pd.Series(df[METADATA_COLUMNS].to_numpy().ravel()).str.encode("utf-8")
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum(encoded.str.len().to_numpy())
+    if offsets[-1] < 2**32:
+        offsets = offsets.astype(np.uint32)
+    strings = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+
+    path = Path(path)
+    atomic_write(
+        path,
+        lambda tmp: _write(
+            tmp,
+            {"keys": keys_arr, "refs": refs_arr, "offsets": offsets, "strings": strings},
+            {
+                "version": INDEX_VERSION,
+                "fields": METADATA_COLUMNS,
+                "records": len(df),
+                "source": str(dump),
+            },
+        ),
+    )
+    return IsinIndex(path)
+
+
+def _write(path: Path, arrays: dict[str, np.ndarray], header: dict) -> None:
+    """Header (JSON) plus each array, 8-byte aligned, in one file."""
+    sections, offset = {}, 0
+    for name, arr in arrays.items():
+        sections[name] = [offset, arr.dtype.str, len(arr)]
+        offset += -(-arr.nbytes // 8) * 8
+    meta = json.dumps({**header, "sections": sections}).encode("utf-8")
+    meta += b" " * (-(len(_MAGIC) + 8 + len(meta)) % 8)
+    with open(path, "wb") as f:
+        f.write(_MAGIC + struct.pack("<Q", len(meta)) + meta)
+        for arr in arrays.values():
+            data = arr.tobytes()
+            f.write(data + b"\0" * (-len(data) % 8))
+
+
+class IsinIndex:
+    """Memory-mapped index of security metadata by ticker, CUSIP and ISIN.
+
+    One file holds a sorted array of keys (kind prefix + normalized value),
+    the record each key points to, and the record strings as one UTF-8
+    blob with their offsets. Whole portfolios are looked up at once with a
+    vectorized binary search (`np.searchsorted`); only the pages touched
+    are read from disk. Built with `compile_index` (`dec-renta isin build`).
+    """
+
+    def __init__(self, path: str | Path):
+        self.path = Path(path)
+        with open(self.path, "rb") as f:
+            if f.read(len(_MAGIC)) != _MAGIC:
+                raise ValueError(f"{self.path} no es un índice de ISIN de dec-renta")
+            (size,) = struct.unpack("<Q", f.read(8))
+            self.header = json.loads(f.read(size))
+        if self.header.get("version") != INDEX_VERSION:
+            raise ValueError(
+                f"Índice de ISIN de otra versión ({self.header.get('version')}): "
+                "vuelve a compilarlo con `dec-renta isin build`"
+            )
+        self.fields: list[str] = self.header["fields"]
+        start = len(_MAGIC) + 8 + size
+        self._arrays = {
+            name: np.memmap(
+                self.path, dtype=np.dtype(dtype), mode="r", offset=start + offset, shape=(n,)
+            )
+            if n
+            else np.zeros(0, dtype=np.dtype(dtype))
+            for name, (offset, dtype, n) in self.header["sections"].items()
+        }
+
+    @classmethod
+    def open(cls, path: str | Path) -> IsinIndex | None:
+        """The index at `path`, None if it has not been built."""
+        return cls(path) if Path(path).exists() else None
+
+    def __len__(self) -> int:
+        return int(self.header["records"])
+
+    def _record(self, i: int) -> list[str]:
+        offsets, strings = self._arrays["offsets"], self._arrays["strings"]
+        n = len(self.fields)
+        return [
+            bytes(strings[offsets[i * n + j] : offsets[i * n + j + 1]]).decode("utf-8")
+            for j in range(n)
+        ]
+
+    def lookup(self, values: Iterable[str], by: str = "ticker") -> pd.DataFrame:
+        """Metadata (`METADATA_COLUMNS`) of the `values` found in the index.
+
+        Looked up by ticker, the `Ticker` column keeps the value asked for
+        (`BRK/B` finds `BRK.B`); by CUSIP or ISIN, it is the indexed ticker.
+        """
+        if by not in KEY_KINDS:
+            raise ValueError(f"Clave desconocida: {by} (válidas: {', '.join(KEY_KINDS)})")
+        values = list(dict.fromkeys(str(v) for v in values))
+        keys = self._arrays["keys"]
+        if not values or not len(keys):
+            return pd.DataFrame(columns=METADATA_COLUMNS)
+
+        encoded = [KEY_KINDS[by] + normalize_key(v, by).encode("utf-8") for v in values]
+        # Una consulta más larga que las claves se truncaría al tipo del array
+        fits = np.array([len(q) <= keys.dtype.itemsize for q in encoded])
+        queries = np.array([q if ok else b"" for q, ok in zip(encoded, fits)], dtype=keys.dtype)
+        pos = np.searchsorted(keys, queries)
+        found = fits & (pos < len(keys))
+        found[found] = keys[pos[found]] == queries[found]
+        refs = self._arrays["refs"][pos[found]]
+
+        rows = [self._record(int(i)) for i in refs]
+        df = pd.DataFrame(rows, columns=self.fields)[METADATA_COLUMNS]
+        if by == "ticker":
+            df["Ticker"] = [v for v, hit in zip(values, found) if hit]
+        return df
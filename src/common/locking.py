@@ -0,0 +1,151 @@
+from __future__ import annotations
+from pathlib import Path
+from typing import Callable
+import os
+import threading
+
+from common.profiling import count
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+def _try_lock(fd: int) -> bool:
+    try:
+        if fcntl is not None:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:
+            msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+        return True
+    except OSError:
+        return False
+
+
+def _lock(fd: int) -> None:
+    if fcntl is not None:
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        return
+    # LK_LOCK se rinde tras 10 reintentos: se insiste hasta conseguirlo
+    while True:
+        try:
+            msvcrt.locking(fd, msvcrt.LK_LOCK, 1)
+            return
+        except OSError:
+            continue
+
+
+def _unlock(fd: int) -> None:
+    if fcntl is not None:
+        fcntl.flock(fd, fcntl.LOCK_UN)
+    else:
+        msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+
+
+class FileLock:
+    """Exclusive lock shared by the threads and processes using one lock file.
+
+    Threads of a process queue on an in-process lock (one per path, so
+    every `FileLock` of the same file agrees); the thread holding it takes
+    an OS lock on the file (`flock`, `msvcrt.locking` on Windows), which
+    excludes the other processes. Re-entrant within a thread, also across
+    `FileLock` instances of the same file: the OS lock is held per path and
+    thread, not per instance, since a second `flock` on another descriptor
+    would wait for the first. Each time the lock was busy adds to the
+    `lock.wait` profiling counter. The lock file is left in place: removing
+    it would let two holders lock different files.
+    """
+
+    # Por ruta: el lock entre hilos y el descriptor/profundidad de cada hilo
+    _registry: dict[str, tuple[threading.RLock, threading.local]] = {}
+    _registry_lock = threading.Lock()
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        key = str(self.path.resolve())
+        with self._registry_lock:
+            self._thread_lock, self._local = self._registry.setdefault(
+                key, (threading.RLock(), threading.local())
+            )
+
+    def acquire(self) -> None:
+        if not self._thread_lock.acquire(blocking=False):
+            count("lock.wait")
+            self._thread_lock.acquire()
+        depth = getattr(self._local, "depth", 0)
+        if depth == 0:
+            try:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+                if not _try_lock(fd):
+                    count("lock.wait")
+                    _lock(fd)
+            except BaseException:
+                self._thread_lock.release()
+                raise
+            self._local.fd = fd
+        self._local.depth = depth + 1
+
+    def release(self) -> None:
+        self._local.depth -= 1
+        if self._local.depth == 0:
+            fd = self._local.fd
+            try:
+                _unlock(fd)
+            finally:
+                os.close(fd)
+        self._thread_lock.release()
+
+    def __enter__(self) -> FileLock:
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.release()
+
+
+def lock_for(path: Path) -> FileLock:
+    """Lock guarding the file at `path` (`<name>.lock` next to it)."""
+    return FileLock(path.with_name(f"{path.name}.lock"))
+
+
+def atomic_write(path: Path, write: Callable[[Path], None]) -> None:
+    """Writes `path` through `write(tmp)` and renames it into place.
+
+    The temporary file is unique per process and thread, so concurrent
+    writers never share it; readers see either the old or the new file.
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        write(tmp)
+        os.replace(tmp, path)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+
+
+def atomic_write_text(path: Path, text: str) -> None:
+    atomic_write(path, lambda tmp: tmp.write_text(text, encoding="utf-8"))
+
+
+def single_flight(
+    lock: FileLock, pending: Callable[[], bool], fetch: Callable[[], None]
+) -> bool:
+    """Runs `fetch` only if `pending()` is still true once `lock` is held.
+
+    Concurrent callers (threads or processes) needing the same data queue on
+    `lock`; the first one fetches it and the others find it done and reuse
+    it, adding to the `single_flight.shared` profiling counter. `pending`
+    must read the shared state afresh. Returns whether this caller fetched.
+    """
+    if not pending():
+        return False
+    with lock:
+        if not pending():
+            count("single_flight.shared")
+            return False
+        fetch()
+        return True
@@ -0,0 +1,301 @@
+from __future__ import annotations
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from common.fx import DEFAULT_CURRENCY
+from model_100.utils.dictionary import BUY_ACTIONS, SELL_ACTIONS, SPLIT_ACTIONS
+
+# Cantidades en millonésimas de acción (int64): el casado FIFO es exacto
+QTY_SCALE = 10**6
+
+TRADE_COLUMNS = ["Symbol", "date", "kind", "quantity", "amount_cents", "currency", "seq"]
+
+
+@dataclass(frozen=True)
+class LotMatch:
+    """Result of matching sells against buy lots, first in first out.
+
+    `closed` has one row per (buy lot, sell) slice, `open` the quantity still
+    held of each buy lot and `unmatched` the sold quantity with no known
+    acquisition (history older than the export). Amounts are cents of the
+    symbol's `currency` (USD in Schwab exports, hence the `*_usd_cents`
+    names) and quantities post-split shares.
+    """
+
+    closed: pd.DataFrame
+    open: pd.DataFrame
+    unmatched: pd.DataFrame
+
+
+def _quantity(s: pd.Series) -> pd.Series:
+    """Signed share quantities (`1,000`, `-2.5`); blanks are 0."""
+    return pd.to_numeric(
+        s.astype(str).str.replace(",", "", regex=False), errors="coerce"
+    ).fillna(0.0)
+
+
+def trades_from_transactions(tx: pd.DataFrame) -> pd.DataFrame:
+    """Buy, sell and split rows of a parsed transactions export, oldest first.
+
+    Schwab lists the newest rows first, so rows of the same day keep the
+    reverse of the file order. Split rows of the same symbol and day (reverse
+    splits come as a removal plus an addition) become one share delta.
+    """
+    if "Quantity" not in tx.columns:
+        raise ValueError("El export de transacciones no tiene columna Quantity.")
+
+    kind = pd.Series("", index=tx.index)
+    kind[tx["Action"].isin(BUY_ACTIONS)] = "buy"
+    kind[tx["Action"].isin(SELL_ACTIONS)] = "sell"
+    kind[tx["Action"].isin(SPLIT_ACTIONS)] = "split"
+    keep = (kind != "") & tx["date"].notna()
+
+    quantity = _quantity(tx.loc[keep, "Quantity"])
+    trades = pd.DataFrame(
+        {
+            "Symbol": tx.loc[keep, "Symbol"].astype(str),
+            "date": tx.loc[keep, "date"],
+            "kind": kind[keep],
+            # Compras/ventas en valor absoluto; el split conserva el signo (delta)
+            "quantity": quantity.where(kind[keep] == "split", quantity.abs()),
+            "amount_cents": tx.loc[keep, "amount_cents"].fillna(0).abs().astype("int64"),
+            "currency": (
+                tx.loc[keep, "currency"].astype(str)
+                if "currency" in tx.columns
+                else DEFAULT_CURRENCY
+            ),
+            "seq": -np.arange(len(tx))[keep.to_numpy()],
+        }
+    )
+
+    splits = trades[trades["kind"] == "split"]
+    if not splits.empty:
+        merged = splits.groupby(["Symbol", "date"], as_index=False).agg(
+            quantity=("quantity", "sum"), currency=("currency", "first"), seq=("seq", "max")
+        )
+        merged["kind"] = "split"
+        merged["amount_cents"] = 0
+        trades = pd.concat(
+            [trades[trades["kind"] != "split"], merged[TRADE_COLUMNS]],
+            ignore_index=True,
+        )
+
+    return trades.sort_values(["Symbol", "date", "seq"], kind="stable").reset_index(
+        drop=True
+    )
+
+
+def _split_factors(trades: pd.DataFrame) -> np.ndarray:
+    """Multiplier taking each row's quantity to post-split shares.
+
+    Each split scales every earlier row of its symbol by
+    `(held + delta) / held`, with `held` the position just before the split.
+    Only symbols with splits are walked, one split at a time.
+    """
+    factor = np.ones(len(trades))
+    signed = np.select(
+        [trades["kind"] == "buy", trades["kind"] == "sell"],
+        [trades["quantity"], -trades["quantity"]],
+        0.0,
+    )
+    split_rows = np.flatnonzero(trades["kind"].to_numpy() == "split")
+    symbols = trades["Symbol"].to_numpy()
+    for pos in split_rows:
+        # Filas anteriores del mismo símbolo (trades está ordenado por símbolo y fecha)
+        first = np.searchsorted(symbols[:pos], symbols[pos], side="left")
+        before = slice(first, pos)
+        held = float((signed[before] * factor[before]).sum())
+        if held <= 0:
+            continue
+        factor[before] *= (held + trades["quantity"].iat[pos]) / held
+    return factor
+
+
+def _allocate(
+    total: np.ndarray, quantity: np.ndarray, lo: np.ndarray, hi: np.ndarray
+) -> np.ndarray:
+    """Cents of `total` for the slice [lo, hi) of `quantity`.
+
+    Cumulative rounding: the slices of one lot always add up to its total.
+    """
+
+    def upto(q: np.ndarray) -> np.ndarray:
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.rint(total * np.where(quantity > 0, q / quantity, 0.0))
+
+    return (upto(hi) - upto(lo)).astype(np.int64)
+
+
+def _group_cumsum(values: np.ndarray, codes: np.ndarray) -> np.ndarray:
+    """Cumulative sum restarting at each group (`codes` sorted ascending)."""
+    if len(values) == 0:
+        return values
+    total = np.cumsum(values)
+    starts = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]])
+    before = np.repeat(total[starts] - values[starts], np.diff(np.r_[starts, len(codes)]))
+    return total - before
+
+
+def match_fifo(trades: pd.DataFrame) -> LotMatch:
+    """Matches the sells of `trades` against earlier buys of the same symbol (FIFO).
+
+    Split-adjusted quantities are laid on one axis as cumulative intervals,
+    symbol after symbol; every overlap of a buy interval with a sell interval
+    is a closed slice, found for all symbols at once with one sort and one
+    binary search per side. Shares sold before any buy in the export were
+    held before its history: they go into an opening lot without date that,
+    being the oldest, FIFO sells first (`unmatched`).
+    """
+    trades = trades.reset_index(drop=True)
+    units = np.rint(
+        trades["quantity"].to_numpy() * _split_factors(trades) * QTY_SCALE
+    ).astype(np.int64)
+    kind = trades["kind"].to_numpy()
+    is_buy = (kind == "buy") & (units > 0)
+    is_sell = (kind == "sell") & (units > 0)
+    # trades está ordenado por símbolo: los códigos crecen con él
+    codes, symbols = pd.factorize(trades["Symbol"], sort=True)
+    symbols = symbols.to_numpy()
+    # Divisa de cada símbolo: la de su primera operación
+    first = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]]) if len(codes) else codes
+    currency = (
+        trades["currency"].to_numpy()
+        if "currency" in trades.columns
+        else np.full(len(trades), DEFAULT_CURRENCY, dtype=object)
+    )
+    currencies = currency[first]
+    dates = trades["date"].to_numpy()
+    cents = trades["amount_cents"].to_numpy(np.int64)
+
+    # Posición de apertura: lo mínimo que hay que tener antes del export
+    flow = np.where(is_buy, units, 0) - np.where(is_sell, units, 0)
+    running = _group_cumsum(flow, codes)
+    deficit = np.zeros(len(symbols), dtype=np.int64)
+    np.minimum.at(deficit, codes, running)
+    opening = np.flatnonzero(deficit < 0)
+
+    # Compras: lotes de apertura delante de las de su símbolo
+    buy_idx = np.flatnonzero(is_buy)
+    buy_codes = np.concatenate([opening, codes[buy_idx]])
+    order = np.argsort(buy_codes, kind="stable")
+    buy_codes = buy_codes[order]
+    buy_units = np.concatenate([-deficit[opening], units[buy_idx]])[order]
+    buy_cents = np.concatenate([np.zeros(len(opening), np.int64), cents[buy_idx]])[order]
+    buy_dates = np.concatenate(
+        [np.full(len(opening), np.datetime64("NaT"), dtype=dates.dtype), dates[buy_idx]]
+    )[order]
+    known = np.concatenate([np.zeros(len(opening), bool), np.ones(len(buy_idx), bool)])[order]
+
+    sell_idx = np.flatnonzero(is_sell)
+    sell_codes, sell_units = codes[sell_idx], units[sell_idx]
+
+    # Eje común: cada símbolo empieza donde acaba lo comprado de los anteriores
+    b1 = np.cumsum(buy_units)
+    b0 = b1 - buy_units
+    bought = np.zeros(len(symbols), dtype=np.int64)
+    np.add.at(bought, buy_codes, buy_units)
+    offset = np.cumsum(bought) - bought
+    s1 = _group_cumsum(sell_units, sell_codes) + offset[sell_codes]
+    s0 = s1 - sell_units
+
+    points = np.unique(np.concatenate([b0, b1, s0, s1]))
+    a, b = points[:-1], points[1:]
+    # Lo vendido nunca supera lo comprado: todo tramo está dentro de una compra
+    bi = np.searchsorted(b1, a, side="right")
+    si = np.searchsorted(s1, a, side="right")
+    in_sell = si < len(s1)
+    in_sell[in_sell] &= s0[si[in_sell]] <= a[in_sell]
+
+    def share(mask, idx, start, side_units, side_cents):
+        """Quantity and cents of the tramos in `mask` within their lot."""
+        lo = (a[mask] - start[idx[mask]]).astype(np.float64)
+        hi = (b[mask] - start[idx[mask]]).astype(np.float64)
+        total = side_cents[idx[mask]].astype(np.float64)
+        lot = side_units[idx[mask]].astype(np.float64)
+        return (hi - lo) / QTY_SCALE, _allocate(total, lot, lo, hi)
+
+    lot_of = bi[in_sell]
+    sale_of = si[in_sell]
+    quantity, cost = share(in_sell, bi, b0, buy_units, buy_cents)
+    _, proceeds = share(in_sell, si, s0, sell_units, cents[sell_idx])
+    matched = pd.DataFrame(
+        {
+            "Symbol": symbols[buy_codes[lot_of]],
+            "currency": currencies[buy_codes[lot_of]],
+            "open_date": buy_dates[lot_of],
+            "close_date": dates[sell_idx][sale_of],
+            "quantity": quantity,
+            "cost_usd_cents": cost,
+            "proceeds_usd_cents": proceeds,
+        }
+    )
+    from_history = known[lot_of]
+
+    held = ~in_sell
+    quantity, cost = share(held, bi, b0, buy_units, buy_cents)
+    open_lots = (
+        pd.DataFrame(
+            {"lot": bi[held], "quantity": quantity, "cost_usd_cents": cost}
+        )
+        .groupby("lot", sort=True)
+        .sum()
+    )
+    lots = open_lots.index.to_numpy()
+    open_lots = pd.DataFrame(
+        {
+            "Symbol": symbols[buy_codes[lots]],
+            "currency": currencies[buy_codes[lots]],
+            "open_date": buy_dates[lots],
+            "quantity": open_lots["quantity"].to_numpy(),
+            "cost_usd_cents": open_lots["cost_usd_cents"].to_numpy(),
+        }
+    )
+
+    return LotMatch(
+        closed=matched[from_history].reset_index(drop=True),
+        open=open_lots,
+        unmatched=matched.loc[
+            ~from_history,
+            ["Symbol", "currency", "close_date", "quantity", "proceeds_usd_cents"],
+        ].reset_index(drop=True),
+    )
+
+
+def per_symbol(closed: pd.DataFrame) -> pd.DataFrame:
+    """Per-symbol sums of closed lots (quantity and every `*_cents` column)."""
+    columns = ["quantity", *[c for c in closed.columns if c.endswith("_cents")]]
+    return closed.groupby("Symbol")[columns].sum()
+
+
+def reconcile(lots: pd.DataFrame, realized: pd.DataFrame) -> pd.DataFrame:
+    """Per-symbol comparison of FIFO lots with Schwab's realized export (USD).
+
+    `lots` are closed lots of the tax year and `realized` the parsed realized
+    export filtered to the same year. A symbol is `ok` when quantity,
+    proceeds and cost agree.
+    """
+    ours = per_symbol(lots)[["quantity", "proceeds_usd_cents", "cost_usd_cents"]]
+    theirs = pd.DataFrame(
+        {
+            "Symbol": realized["Symbol"].astype(str),
+            "quantity": _quantity(realized.get("Quantity", pd.Series(0, index=realized.index))),
+            "proceeds_usd_cents": realized.get("proceeds_cents", 0),
+            "cost_usd_cents": realized.get("cost_basis_cents", 0),
+        }
+    )
+    theirs = theirs.groupby("Symbol").sum()
+    report = ours.join(theirs, how="outer", lsuffix="_fifo", rsuffix="_schwab").fillna(0)
+
+    for col in ["quantity", "proceeds_usd_cents", "cost_usd_cents"]:
+        report[f"{col}_diff"] = report[f"{col}_fifo"] - report[f"{col}_schwab"]
+    cents = [c for c in report.columns if c.endswith("_cents") or c.endswith("_cents_diff")]
+    report[cents] = report[cents].astype("int64")
+    agrees = (
+        (report["quantity_diff"].abs() < 1 / QTY_SCALE)
+        & (report["proceeds_usd_cents_diff"] == 0)
+        & (report["cost_usd_cents_diff"] == 0)
+    )
+    report["status"] = np.where(agrees, "ok", "diferencia")
+    return report
@@ -0,0 +1,201 @@
+from __future__ import annotations
+from pathlib import Path
+from typing import Iterable
+import sqlite3
+import threading
+import time
+
+import pandas as pd
+
+from common.locking import lock_for, single_flight
+from model_720.utils.dictionary import METADATA_COLUMNS, REQUIRED_METADATA_COLUMNS
+
+# Columna del DataFrame -> columna SQL
+_FIELDS = {
+    "ISIN": "isin",
+    "Domicilio Fiscal": "domicilio_fiscal",
+    "Poblacion": "poblacion",
+    "Pais Dom Fiscal": "pais_dom_fiscal",
+}
+# Alias aceptados en la cabecera del CSV local
+_CSV_ALIASES = {
+    "ticker": "Ticker",
+    "isin": "ISIN",
+    "domicilio fiscal": "Domicilio Fiscal",
+    "domicilio_fiscal": "Domicilio Fiscal",
+    "poblacion": "Poblacion",
+    "pais dom fiscal": "Pais Dom Fiscal",
+    "pais_dom_fiscal": "Pais Dom Fiscal",
+    "pais dom. fiscal": "Pais Dom Fiscal",
+}
+# Límite de parámetros por sentencia en SQLite
+_BATCH = 900
+
+
+def _clean(df: pd.DataFrame) -> pd.DataFrame:
+    """Normalizes a metadata frame to `METADATA_COLUMNS`, blanks for unknowns."""
+    df = df.rename(columns=lambda c: _CSV_ALIASES.get(str(c).strip().lower(), c))
+    for col in METADATA_COLUMNS:
+        if col not in df.columns:
+            df[col] = ""
+    df = df[METADATA_COLUMNS].fillna("").astype(str)
+    df = df.apply(lambda s: s.str.strip())
+    df["ISIN"] = df["ISIN"].replace({"-": "", "N/A": "", "NA": ""})
+    return df[df["Ticker"] != ""].drop_duplicates("Ticker", keep="last")
+
+
+class TickerMetadataStore:
+    """SQLite store of ticker metadata keyed by ticker and indexed by ISIN.
+
+    Each field keeps its own `*_updated_at` timestamp, upserts only overwrite
+    non-blank values and every write runs in a single transaction. `lock`,
+    shared by every process using the store, serializes the CSV import and
+    the provider fetches, so a ticker is fetched once however many runs
+    need it at the same time. The connection is shared by the threads of a
+    run; each statement runs under an in-process lock.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.lock = lock_for(path)
+        self._conn: sqlite3.Connection | None = None
+        self._lock = threading.RLock()
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        with self._lock:
+            if self._conn is None:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                self._conn = sqlite3.connect(self.path, check_same_thread=False)
+                self._conn.execute("PRAGMA journal_mode=WAL")
+                self._create_schema()
+            return self._conn
+
+    def _create_schema(self) -> None:
+        fields = ", ".join(
+            f"{c} TEXT NOT NULL DEFAULT '', {c}_updated_at REAL"
+            for c in _FIELDS.values()
+        )
+        with self._conn:
+            self._conn.execute(
+                f"CREATE TABLE IF NOT EXISTS ticker_metadata "
+                f"(ticker TEXT PRIMARY KEY, {fields}, source TEXT NOT NULL DEFAULT '')"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS ix_ticker_metadata_isin "
+                "ON ticker_metadata (isin)"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS seeds "
+                "(path TEXT PRIMARY KEY, mtime_ns INTEGER, size INTEGER)"
+            )
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def _rows(self, key: str, values: Iterable[str]) -> pd.DataFrame:
+        """Stored rows (SQL column names) whose `key` is in `values`."""
+        columns = [
+            "ticker",
+            *_FIELDS.values(),
+            *(f"{c}_updated_at" for c in _FIELDS.values()),
+        ]
+        values = list(dict.fromkeys(str(v) for v in values))
+        frames = []
+        for i in range(0, len(values), _BATCH):
+            batch = values[i : i + _BATCH]
+            with self._lock:
+                frames.append(
+                    pd.read_sql_query(
+                        f"SELECT {', '.join(columns)} FROM ticker_metadata "
+                        f"WHERE {key} IN ({', '.join('?' * len(batch))})",
+                        self.conn,
+                        params=batch,
+                    )
+                )
+        if not frames:
+            return pd.DataFrame(columns=columns)
+        return pd.concat(frames, ignore_index=True)
+
+    @staticmethod
+    def _to_metadata(rows: pd.DataFrame) -> pd.DataFrame:
+        return rows.rename(
+            columns={"ticker": "Ticker", **{v: k for k, v in _FIELDS.items()}}
+        )[METADATA_COLUMNS]
+
+    def lookup(self, tickers: Iterable[str]) -> pd.DataFrame:
+        """Metadata rows of the stored `tickers` (unknown tickers are absent)."""
+        return self._to_metadata(self._rows("ticker", tickers))
+
+    def lookup_isin(self, isins: Iterable[str]) -> pd.DataFrame:
+        """Metadata rows whose ISIN is in `isins`."""
+        return self._to_metadata(self._rows("isin", isins))
+
+    def missing(
+        self, tickers: Iterable[str], max_age: float | None = None
+    ) -> list[str]:
+        """Tickers with a blank required field, or one older than `max_age` seconds."""
+        tickers = list(dict.fromkeys(str(t) for t in tickers))
+        rows = self._rows("ticker", tickers).set_index("ticker").reindex(tickers)
+        stored = self._to_metadata(rows.reset_index()).set_index("Ticker").fillna("")
+        incomplete = (stored[REQUIRED_METADATA_COLUMNS] == "").any(axis=1)
+
+        if max_age is not None:
+            stamps = rows[[f"{c}_updated_at" for c in _FIELDS.values()]]
+            stale = stamps.astype(float).fillna(0) < time.time() - max_age
+            incomplete |= stale.any(axis=1)
+
+        return incomplete.index[incomplete].tolist()
+
+    def upsert(self, df: pd.DataFrame, source: str) -> int:
+        """Inserts or updates rows in one transaction; blank values never overwrite."""
+        df = _clean(df)
+        if df.empty:
+            return 0
+        now = time.time()
+        sets = ", ".join(
+            f"{c} = CASE WHEN excluded.{c} != '' THEN excluded.{c} ELSE {c} END, "
+            f"{c}_updated_at = CASE WHEN excluded.{c} != '' "
+            f"THEN excluded.{c}_updated_at ELSE {c}_updated_at END"
+            for c in _FIELDS.values()
+        )
+        columns = ["ticker", *_FIELDS.values()]
+        stamps = [f"{c}_updated_at" for c in _FIELDS.values()]
+        sql = (
+            f"INSERT INTO ticker_metadata ({', '.join(columns + stamps)}, source) "
+            f"VALUES ({', '.join('?' * (len(columns) + len(stamps) + 1))}) "
+            f"ON CONFLICT(ticker) DO UPDATE SET {sets}, source = excluded.source"
+        )
+        values = df[METADATA_COLUMNS].to_numpy().tolist()
+        rows = [
+            [*row, *[now if v else None for v in row[1:]], source] for row in values
+        ]
+        with self._lock, self.conn:
+            self.conn.executemany(sql, rows)
+        return len(rows)
+
+    def import_csv(self, path: Path) -> bool:
+        """Loads the user-edited CSV, only when it changed since the last import."""
+        if not path.exists():
+            return False
+        stat = path.stat()
+
+        def pending() -> bool:
+            with self._lock:
+                seen = self.conn.execute(
+                    "SELECT mtime_ns, size FROM seeds WHERE path = ?", (str(path),)
+                ).fetchone()
+            return seen != (stat.st_mtime_ns, stat.st_size)
+
+        def load() -> None:
+            self.upsert(pd.read_csv(path, dtype=str), source="csv")
+            with self._lock, self.conn:
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO seeds VALUES (?, ?, ?)",
+                    (str(path), stat.st_mtime_ns, stat.st_size),
+                )
+
+        return single_flight(self.lock, pending, load)
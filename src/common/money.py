@@ -0,0 +1,163 @@
+from __future__ import annotations
+from enum import Enum
+
+import numpy as np
+import pandas as pd
+
+# Importes en céntimos (int64) y tipos de cambio escalados a enteros
+CENTS = 100
+RATE_SCALE = 10**6
+# Mayor importe en céntimos cuyo producto por RATE_SCALE cabe en int64
+MAX_CENTS = np.iinfo(np.int64).max // RATE_SCALE
+
+
+class Rounding(str, Enum):
+    """Rounding modes, named as in the `decimal` module."""
+
+    HALF_UP = "half_up"  # mitad: se aleja de cero (redondeo al céntimo habitual)
+    HALF_EVEN = "half_even"  # mitad: al par (bancario)
+    DOWN = "down"  # hacia cero
+    UP = "up"  # alejándose de cero
+    FLOOR = "floor"  # hacia -infinito
+    CEILING = "ceiling"  # hacia +infinito
+
+
+def _round_magnitude(
+    q: np.ndarray,
+    negative: np.ndarray,
+    exact: np.ndarray,
+    above_half: np.ndarray,
+    half: np.ndarray,
+    rounding: Rounding,
+) -> np.ndarray:
+    """Rounds the truncated magnitudes `q` given how the discarded part compares to 1/2."""
+    rounding = Rounding(rounding)
+    if rounding is Rounding.HALF_UP:
+        bump = above_half | half
+    elif rounding is Rounding.HALF_EVEN:
+        bump = above_half | (half & (q % 2 == 1))
+    elif rounding is Rounding.DOWN:
+        bump = np.zeros(len(q), dtype=bool)
+    elif rounding is Rounding.UP:
+        bump = ~exact
+    elif rounding is Rounding.FLOOR:
+        bump = negative & ~exact
+    else:
+        bump = ~negative & ~exact
+    return q + bump
+
+
+def div_round(num: np.ndarray, den: np.ndarray, rounding: Rounding) -> np.ndarray:
+    """Integer division `num / den` rounded with `rounding` (int64, exact)."""
+    num = np.asarray(num, dtype=np.int64)
+    den = np.asarray(den, dtype=np.int64)
+    if np.any(den == 0):
+        raise ValueError("División por cero en importes en céntimos.")
+    negative = (num < 0) != (den < 0)
+    a, b = np.abs(num), np.abs(den)
+    q, r = np.divmod(a, b)
+    q = _round_magnitude(q, negative, r == 0, 2 * r > b, 2 * r == b, rounding)
+    return np.where(negative, -q, q)
+
+
+def _parse_cents_text(text: pd.Series, rounding: Rounding) -> pd.Series:
+    """Exact parse from the digits of the text (any number of decimals)."""
+    negative = text.str.contains(r"^\(|-", regex=True).fillna(False).to_numpy(bool)
+    parts = text.str.replace(r"[$,()\-\s]", "", regex=True).str.extract(
+        r"^(?P<int>\d*)(?:\.(?P<frac>\d*))?$"
+    )
+    valid = (
+        parts["int"].fillna("").str.len() + parts["frac"].fillna("").str.len() > 0
+    ).to_numpy(bool)
+    if (parts["int"].fillna("").str.len() > 15).any():
+        raise ValueError("Importe fuera de rango para céntimos en int64.")
+
+    whole = pd.to_numeric(parts["int"].fillna("").replace("", "0")).to_numpy("int64")
+    frac = parts["frac"].fillna("")
+    cents = pd.to_numeric(frac.str[:2].str.ljust(2, "0")).to_numpy("int64")
+    rest = frac.str[2:]
+    first = pd.to_numeric(rest.str[:1].replace("", "0")).to_numpy("int64")
+    tail = rest.str[1:].str.contains("[1-9]", regex=True).fillna(False).to_numpy(bool)
+
+    q = _round_magnitude(
+        whole * CENTS + cents,
+        negative,
+        (first == 0) & ~tail,
+        (first > 5) | ((first == 5) & tail),
+        (first == 5) & ~tail,
+        rounding,
+    )
+    values = pd.Series(np.where(negative, -q, q), index=text.index, name=text.name)
+    return values.astype("Int64").mask(~valid)
+
+
+def parse_cents(s: pd.Series, rounding: Rounding) -> pd.Series:
+    """Parses Schwab amounts (`$1,234.56`, `-$1,234.56`, `($1.00)`) into int64 cents.
+
+    Amounts with up to two decimals (all of Schwab's) take a vectorized numeric
+    path that is exact for them; the rest are parsed digit by digit, rounding
+    the digits past the cents with `rounding`. Blank or unparseable values
+    are `<NA>` (`Int64`).
+    """
+    text = s if s.dtype == object else s.astype("string")
+    values = pd.to_numeric(
+        text.str.replace(r"[$,\s]", "", regex=True), errors="coerce"
+    ).to_numpy("f8")
+    return cents_from_values(values, text, rounding)
+
+
+def cents_from_values(values: np.ndarray, text: pd.Series, rounding: Rounding) -> pd.Series:
+    """Int64 cents of amounts already read as numbers (`values`, NaN if unreadable).
+
+    Values that are not exact to the cent (more decimals, out of range) or
+    unreadable are parsed again from `text`, the original strings.
+    """
+    with np.errstate(invalid="ignore"):
+        scaled = values * CENTS
+        cents = np.rint(scaled)
+        # Con dos decimales como máximo, `scaled` dista del entero solo por el error de float
+        exact = (np.abs(scaled - cents) <= np.abs(cents) * 1e-12) & (
+            np.abs(cents) < MAX_CENTS
+        )
+
+    out = pd.Series(cents, index=text.index, name=text.name).astype("Int64").mask(~exact)
+    slow = ~exact & text.notna().to_numpy(bool)
+    if slow.any():
+        out[slow] = _parse_cents_text(text[slow].astype("string").str.strip(), rounding)
+    return out
+
+
+def scale_rate(rates: pd.Series | np.ndarray | float) -> np.ndarray:
+    """ECB fixings as integers scaled by `RATE_SCALE` (exact for the published decimals)."""
+    values = np.atleast_1d(np.asarray(rates, dtype="f8"))
+    if np.isnan(values).any():
+        raise ValueError("Tipo de cambio ausente al escalar a entero.")
+    return np.rint(values * RATE_SCALE).astype(np.int64)
+
+
+def convert(
+    cents: pd.Series, per_eur: np.ndarray, rounding: Rounding
+) -> pd.Series:
+    """Converts foreign cents to EUR cents (`amount / per_eur`), one rounding per amount.
+
+    `per_eur` holds the units of the amount's currency per EUR scaled by
+    `RATE_SCALE`, one per amount or a single one for all.
+    """
+    values = cents.astype("Int64")
+    mask = values.isna().to_numpy()
+    amounts = values.fillna(0).to_numpy("int64")
+    if (np.abs(amounts) > MAX_CENTS).any():
+        raise ValueError("Importe fuera de rango para la conversión en int64.")
+    rates = np.broadcast_to(np.asarray(per_eur, dtype=np.int64), amounts.shape)
+    eur = div_round(amounts * RATE_SCALE, rates, rounding)
+    return pd.Series(eur, index=cents.index, name=cents.name).astype("Int64").mask(mask)
+
+
+def add_sums(left: pd.DataFrame, right: pd.DataFrame) -> pd.DataFrame:
+    """Adds two per-symbol cent frames, keeping them int64."""
+    return left.add(right, fill_value=0).astype("int64")
+
+
+def from_cents(cents: pd.Series | pd.DataFrame) -> pd.Series | pd.DataFrame:
+    """EUR/USD amounts (float, exact to the cent) for CSV output."""
+    return cents.astype("Float64").astype("float64") / CENTS
@@ -0,0 +1,101 @@
+from __future__ import annotations
+from pathlib import Path
+from typing import Callable
+import hashlib
+import os
+
+import pandas as pd
+
+from common.locking import atomic_write
+from common.profiling import count
+
+# Parquet (columnar) con pyarrow; si no está instalado, pickle binario de pandas
+try:
+    import pyarrow  # noqa: F401
+
+    _SUFFIX = ".parquet"
+except Exception:
+    _SUFFIX = ".pkl"
+
+
+def file_digest(path: str | Path, block_size: int = 1 << 20) -> str:
+    """SHA-256 of the file content, read in blocks."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while block := f.read(block_size):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class ParseCache:
+    """Cache of parsed and cleaned frames keyed by file content and parser version.
+
+    Entries are evicted least-recently-used first once the cache grows past
+    `max_bytes`.
+    """
+
+    def __init__(
+        self,
+        cache_dir: Path = Path(".cache/dec_renta/parsed"),
+        max_bytes: int = 512 * 1024 * 1024,
+    ):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+
+    def _entry(self, path: str | Path, kind: str, version: str) -> Path:
+        key = hashlib.sha256(
+            f"{file_digest(path)}:{kind}:{version}".encode()
+        ).hexdigest()
+        return self.cache_dir / f"{kind}-{key[:32]}{_SUFFIX}"
+
+    def _read(self, entry: Path) -> pd.DataFrame:
+        if _SUFFIX == ".parquet":
+            return pd.read_parquet(entry)
+        return pd.read_pickle(entry)
+
+    def _write(self, entry: Path, df: pd.DataFrame) -> None:
+        if _SUFFIX == ".parquet":
+            atomic_write(entry, df.to_parquet)
+        else:
+            atomic_write(entry, df.to_pickle)
+
+    def _evict(self) -> None:
+        stats = []
+        for entry in self.cache_dir.glob(f"*{_SUFFIX}"):
+            try:
+                stats.append((entry, entry.stat()))
+            except FileNotFoundError:
+                # Descartada a la vez por otro hilo o proceso
+                continue
+        stats.sort(key=lambda item: item[1].st_mtime)
+        total = sum(st.st_size for _, st in stats)
+        for entry, st in stats:
+            if total <= self.max_bytes:
+                break
+            total -= st.st_size
+            entry.unlink(missing_ok=True)
+
+    def get_or_parse(
+        self,
+        path: str | Path,
+        kind: str,
+        version: str,
+        parse: Callable[[str], pd.DataFrame],
+    ) -> pd.DataFrame:
+        """Returns the cached frame of `path`, parsing and storing it on a miss."""
+        entry = self._entry(path, kind, version)
+        if entry.exists():
+            try:
+                df = self._read(entry)
+                os.utime(entry)
+                count("parse_cache.hit")
+                return df
+            except Exception:
+                # Entrada corrupta o de otra versión de pandas: se regenera
+                entry.unlink(missing_ok=True)
+
+        count("parse_cache.miss")
+        df = parse(str(path))
+        self._write(entry, df)
+        self._evict()
+        return df
@@ -0,0 +1,171 @@
+from __future__ import annotations
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import copy_context
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable
+
+import pandas as pd
+
+from common.catalog import FileCatalog
+from common.enrichment import MetadataProvider
+from common.io import DataInputs, Inputs720, resolve_inputs, resolve_positions_inputs
+from common.parse_cache import ParseCache
+from common.processor import TaxReportEngine
+from common.profiling import Profiler
+
+
+# Modelos que genera el pipeline
+FORMS = ("modelo-100", "modelo-720")
+
+
+@dataclass(frozen=True)
+class AllFormsInputs:
+    """Inputs of every form for one tax year; a form without inputs is skipped."""
+
+    year: int
+    inputs_100: DataInputs | None
+    inputs_720: Inputs720 | None
+    skipped: dict[str, str] = field(default_factory=dict)
+
+
+@dataclass(frozen=True)
+class AllFormsResult:
+    outputs: tuple[str, ...]
+    skipped: dict[str, str]
+
+
+def resolve_all_inputs(
+    data_dir: str,
+    pattern_transactions: str = "Individual_*_Transactions_*.csv",
+    pattern_realized: str = "*_GainLoss_Realized_Details_*.csv",
+    pattern_positions: str = "Individual-Positions*.csv",
+    year: int | None = None,
+    catalog: FileCatalog | None = None,
+) -> AllFormsInputs:
+    """Resolves the inputs of both forms once; both must be of the same year.
+
+    With `catalog`, files are looked up in the persistent file index.
+    """
+    skipped = {}
+    inputs_100 = inputs_720 = None
+    try:
+        inputs_100 = resolve_inputs(
+            data_dir, pattern_transactions, pattern_realized, year, catalog
+        )
+    except (FileNotFoundError, ValueError) as e:
+        skipped["modelo-100"] = str(e)
+    try:
+        inputs_720 = resolve_positions_inputs(data_dir, pattern_positions, year, catalog)
+    except (FileNotFoundError, ValueError) as e:
+        skipped["modelo-720"] = str(e)
+
+    if inputs_100 is None and inputs_720 is None:
+        raise FileNotFoundError(
+            "No encuentro ficheros para ningún modelo: "
+            + "; ".join(f"{form}: {error}" for form, error in skipped.items())
+        )
+    years = {i.year for i in (inputs_100, inputs_720) if i is not None}
+    if len(years) > 1:
+        raise ValueError(
+            f"Años distintos en filenames: modelo-100={inputs_100.year}, "
+            f"modelo-720={inputs_720.year}. Usa --year."
+        )
+    return AllFormsInputs(years.pop(), inputs_100, inputs_720, skipped)
+
+
+def _in_threads(tasks: list[Callable[[], object]]) -> list[object]:
+    """Runs `tasks` in threads and returns their results (first error re-raised).
+
+    Each task runs in a copy of the caller's context, so the counters of the
+    active profiler stage still reach it.
+    """
+    if len(tasks) <= 1:
+        return [task() for task in tasks]
+    with ThreadPoolExecutor(max_workers=len(tasks)) as pool:
+        futures = [pool.submit(copy_context().run, task) for task in tasks]
+        return [future.result() for future in futures]
+
+
+def form_outputs(
+    engine: TaxReportEngine,
+    inputs: AllFormsInputs,
+    fifo: bool = False,
+    forms: tuple[str, ...] = FORMS,
+) -> dict[Path, pd.DataFrame]:
+    """Output frames of the `forms` of `inputs`, computed concurrently on `engine`.
+
+    Forms without inputs are left out. Nothing is written.
+    """
+    tasks = []
+    if inputs.inputs_100 is not None and "modelo-100" in forms:
+        tx = inputs.inputs_100.transactions_csvs
+        rg = inputs.inputs_100.realized_csvs
+
+        def modelo_100() -> dict[Path, pd.DataFrame]:
+            outputs = engine.reports_100_outputs(tx, rg)
+            if fifo:
+                outputs.update(engine.lot_outputs(tx, rg))
+            return outputs
+
+        tasks.append(modelo_100)
+    if inputs.inputs_720 is not None and "modelo-720" in forms:
+        positions = inputs.inputs_720.positions_csvs
+        tasks.append(lambda: engine.report_720_outputs(positions))
+
+    outputs: dict[Path, pd.DataFrame] = {}
+    with engine.profiler.stage("forms", rows_in=len(tasks)):
+        for outputs_of_form in _in_threads(tasks):
+            outputs.update(outputs_of_form)
+    return outputs
+
+
+def run_all_forms(
+    inputs: AllFormsInputs,
+    out_dir: str | Path,
+    refresh_fx: bool = False,
+    parse_cache: ParseCache | None = None,
+    fifo: bool = False,
+    profiler: Profiler | None = None,
+    metadata_provider: MetadataProvider | None = None,
+    currencies: tuple[str, ...] = (),
+    metadata_max_age: float | None = None,
+) -> AllFormsResult:
+    """Computes Modelo 100 and 720 of `inputs.year` on one engine and writes them.
+
+    The input files are parsed and the year's FX fixings loaded once, in
+    parallel (the fixings again if an input brings a currency without its
+    series); both forms are then computed concurrently on those shared
+    frames and every output is written at the end, so a failing form leaves
+    no partial outputs.
+    """
+    engine = TaxReportEngine(
+        year=inputs.year,
+        out_dir=out_dir,
+        refresh_fx=refresh_fx,
+        parse_cache=parse_cache,
+        profiler=profiler,
+        metadata_provider=metadata_provider,
+        currencies=currencies,
+        metadata_max_age=metadata_max_age,
+    )
+    files = []
+    if inputs.inputs_100 is not None:
+        files += [
+            ("transactions", inputs.inputs_100.transactions_csvs),
+            ("realized", inputs.inputs_100.realized_csvs),
+        ]
+    if inputs.inputs_720 is not None:
+        files.append(("positions", inputs.inputs_720.positions_csvs))
+
+    with engine.profiler.stage("load_inputs", rows_in=len(files)):
+        _in_threads(
+            [lambda: engine.rates]
+            + [
+                lambda kind=kind, path=path: engine.load_input(kind, path)
+                for kind, path in files
+            ]
+        )
+
+    outputs = form_outputs(engine, inputs, fifo)
+    return AllFormsResult(engine.write_outputs(outputs), dict(inputs.skipped))
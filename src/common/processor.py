@@ -1,248 +1,897 @@
 from __future__ import annotations
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import copy_context
+from datetime import date
+from functools import cached_property
 from pathlib import Path
+from typing import Callable, Sequence, Union
+import threading
+
+import numpy as np
 import pandas as pd
 
-from common.fx import ECBExchangeService, usd_to_eur
-from model_100.utils.dictionary import (
-    DIVIDEND_ACTIONS,
-    TAX_ACTIONS,
-    GAIN_LOSS_COLUMNS,
+from common.accounts import ACCOUNT_COLUMN, account_of, combine_exports
+from common.checkpoint import Checkpoint, CheckpointStore, fingerprint
+from common.cube import build_cube, dividend_sums, empty_cube
+from common.enrichment import (
+    EnrichmentReport,
+    MetadataEnricher,
+    MetadataProvider,
+    default_metadata_provider,
+)
+from common.fx import (
+    DEFAULT_CURRENCY,
+    FX_CURRENCIES,
+    ECBExchangeService,
+    RateTable,
+    currencies_of,
+    missing_fixings,
+)
+from common.harvest import LOT_COLUMNS, simulate_harvest
+from common.lots import (
+    LotMatch,
+    match_fifo,
+    per_symbol,
+    reconcile,
+    trades_from_transactions,
 )
-from .schwab import SchwabParser
+from common.isin_index import IsinIndex
+from common.locking import single_flight
+from common.metadata_store import TickerMetadataStore
+from common.money import (
+    Rounding,
+    add_sums,
+    convert,
+    from_cents,
+    parse_cents,
+    scale_rate,
+)
+from common.parse_cache import ParseCache
+from common.profiling import Profiler
+from model_720.utils.dictionary import METADATA_COLUMNS, REQUIRED_METADATA_COLUMNS
+from .schwab import PARSE_ROUNDING, PARSER_VERSION, SchwabParser
+
+# Un export o varios (cuentas distintas o exports solapados de la misma cuenta)
+InputFiles = Union[str, Path, Sequence[Union[str, Path]]]
+# Exports de un mismo tipo que se parsean a la vez
+PARSE_WORKERS = 4
+
+# Exports de Schwab que sabe leer el motor (tipo -> loader)
+LOADERS: dict[str, Callable[..., pd.DataFrame]] = {
+    "transactions": SchwabParser.load_transactions,
+    "realized": SchwabParser.load_realized,
+    "positions": SchwabParser.load_positions,
+}
+
+
+def input_files(files: InputFiles) -> tuple[str, ...]:
+    """Paths of `files` (one path or a sequence of them) as a tuple of strings."""
+    if isinstance(files, (str, Path)):
+        return (str(files),)
+    if not files:
+        raise ValueError("No hay ficheros de entrada.")
+    return tuple(str(f) for f in files)
+
+
+def default_metadata_path() -> Path:
+    repo_root = Path(__file__).resolve().parents[2]
+    return repo_root / "data" / "ticker_metadata.csv"
+
+
+def default_isin_index_path(cache_dir: Path) -> Path:
+    return cache_dir / "isin_index.bin"
+
+
+def fill_blanks(metadata: pd.DataFrame, fallback: pd.DataFrame) -> pd.DataFrame:
+    """`metadata` with its blank fields (and missing tickers) taken from `fallback`."""
+    if fallback.empty:
+        return metadata
+    metadata, fallback = metadata.set_index("Ticker"), fallback.set_index("Ticker")
+    filled = metadata.where(metadata != "").combine_first(fallback.where(fallback != ""))
+    return filled.fillna("").reset_index()[METADATA_COLUMNS]
+
+
+def _cents_to_eur(cents: pd.Series | pd.DataFrame) -> pd.Series | pd.DataFrame:
+    """`*_cents` sums as the `*_eur` amounts of the public API and outputs."""
+    eur = from_cents(cents)
+    if isinstance(eur, pd.Series):
+        return eur.rename(str(eur.name).replace("_cents", "_eur"))
+    return eur.rename(columns=lambda c: c.replace("_cents", "_eur"))
+
+
+def _amounts(df: pd.DataFrame) -> pd.DataFrame:
+    """Replaces every `*_cents` column (any position in the name) by its amount."""
+    cents = [c for c in df.columns if "_cents" in c]
+    df = df.copy()
+    df[cents] = from_cents(df[cents])
+    return df.rename(columns={c: c.replace("_cents", "") for c in cents})
+
+
+def security_positions(positions_df: pd.DataFrame) -> pd.DataFrame:
+    """Drops the summary rows of a positions export, keeping securities only."""
+    # Filter out invalid tickers (e.g. "Account Total", "Cash & Cash Investments")
+    # Assuming valid tickers are short (<= 5 chars)
+    return positions_df[positions_df["Ticker"].astype(str).str.len() <= 5]
+
+
+def consolidate_positions(positions_df: pd.DataFrame) -> pd.DataFrame:
+    """Positions of several accounts summed per ticker (quantity and EUR cents)."""
+    qty = pd.to_numeric(
+        positions_df["Qty"].astype(str).str.replace(",", "", regex=False), errors="coerce"
+    )
+    out = (
+        positions_df.assign(Qty=qty)
+        .groupby("Ticker", as_index=False, sort=True)
+        .agg(
+            Description=("Description", "first"),
+            Qty=("Qty", "sum"),
+            value_eur_cents=("value_eur_cents", "sum"),
+        )
+    )
+    if (out["Qty"] % 1 == 0).all():
+        out["Qty"] = out["Qty"].astype("int64")
+    out["value_eur"] = from_cents(out["value_eur_cents"])
+    return out
+
+
+def _symbol_breakdown(dividend_cents: pd.DataFrame, gain_cents: pd.Series) -> pd.DataFrame:
+    """Per-symbol dividends, foreign taxes and realized gains in EUR, by symbol."""
+    return (
+        _cents_to_eur(
+            dividend_cents.join(gain_cents, how="outer").fillna(0).astype("int64")
+        )
+        .reset_index()
+        .rename(columns={"Symbol": "symbol"})
+        .sort_values("symbol")
+    )
 
 
 class TaxReportEngine:
-    """Engine to calculate tax reports for Spanish residents with foreign investments."""
+    """Engine to calculate tax reports for Spanish residents with foreign investments.
+
+    `rates` and `metadata` let a caller share already loaded FX fixings and
+    ticker metadata between engines; injected metadata is used read-only.
+    `chunksize` streams the transactions CSV in bounded memory.
+    `metadata_provider` replaces yfinance as the source of missing ticker metadata.
+    `metadata_max_age` (seconds) also fetches again the tickers whose stored
+    metadata is older.
+    `parse_cache` reuses the cleaned frames of input files parsed before.
+    `csv_backend` picks the CSV reader (`pandas`, `arrow`; by default Arrow
+    when `pyarrow` is installed, see `common.csv_backend.get_backend`).
+    `incremental` only converts and aggregates the rows added since the
+    previous run (checkpoints in `out_dir/.checkpoints`); the export is still
+    parsed and its settled rows fingerprinted in full. It takes precedence
+    over `chunksize`.
+    `profiler` records each stage (time, rows, cache, network calls, memory);
+    hooks registered with `profiler.add_hook` see every stage as it ends.
+    Amounts are summed as int64 cents; `rounding` applies to each conversion
+    to EUR cents. Each row is converted from its own `currency` (USD when the
+    export has none): the ECB series fetched are those of the loaded inputs
+    (USD before any is loaded) plus `currencies`.
 
-    def __init__(self, year: int, out_dir: str | Path, refresh_fx: bool = False):
+    Each input file is parsed once per engine (`load_input`) and shared by
+    every form computed from it, also across threads. An input can also be
+    several exports (accounts, overlapping date ranges): they are parsed in
+    parallel, tagged with their `account` and merged without repeated rows,
+    and the forms add per-account outputs to the consolidated ones. The
+    `chunksize` streaming only applies to a single transactions export.
+    The `*_outputs` methods return the output frames by path without writing
+    them; `write_outputs` writes any set of them in one pass.
+    """
+
+    def __init__(
+        self,
+        year: int,
+        out_dir: str | Path,
+        refresh_fx: bool = False,
+        rates: RateTable | None = None,
+        metadata: pd.DataFrame | None = None,
+        chunksize: int | None = None,
+        metadata_provider: MetadataProvider | None = None,
+        parse_cache: ParseCache | None = None,
+        incremental: bool = False,
+        profiler: Profiler | None = None,
+        rounding: Rounding = Rounding.HALF_UP,
+        currencies: tuple[str, ...] = (),
+        csv_backend: str | None = None,
+        metadata_max_age: float | None = None,
+    ):
         self.year = year
         self.out_dir = Path(out_dir)
         self.refresh_fx = refresh_fx
-        self.fx_service = ECBExchangeService()
-        self.rates = self.fx_service.get_rates_for_year(year, refresh=refresh_fx)
+        self.chunksize = chunksize
+        self.parse_cache = parse_cache
+        self.csv_backend = csv_backend
+        self.incremental = incremental
+        self.checkpoints = CheckpointStore(self.out_dir / ".checkpoints")
+        self.incremental_status: dict[str, str] = {}
+        self.profiler = profiler or Profiler()
+        self.rounding = rounding
+        self.fx_service = ECBExchangeService(currencies=currencies)
+        self.metadata_path = default_metadata_path()
+        self.metadata = metadata
+        self.metadata_provider = metadata_provider or default_metadata_provider()
+        self.metadata_max_age = metadata_max_age
+        self.enrichment_report = EnrichmentReport()
+        self._parsed: dict[tuple[str, str], pd.DataFrame] = {}
+        self._parse_locks: dict[tuple[str, str], threading.Lock] = {}
+        self._lock = threading.Lock()
+        self._rates = rates
+        self._rates_lock = threading.Lock()
+
+    @property
+    def fx_currencies(self) -> tuple[str, ...]:
+        """ECB series needed: those of the inputs loaded so far and `currencies`."""
+        return self.fx_service.currencies or FX_CURRENCIES
+
+    def _add_currencies(self, df: pd.DataFrame) -> None:
+        """Adds the currencies of `df` to `fx_currencies`."""
+        with self._lock:
+            currencies = self.fx_service.currencies
+            self.fx_service.currencies = tuple(dict.fromkeys(currencies + currencies_of(df)))
+
+    @property
+    def rates(self) -> RateTable:
+        """Fixings per EUR of the tax year in `fx_currencies`, loaded on first use.
+
+        The table (also one given to the engine) is loaded again when an
+        input brings a currency it lacks.
+        """
+        with self._rates_lock:
+            rates = self._rates
+            if rates is None or set(self.fx_currencies) - set(rates.currencies):
+                with self.profiler.stage("fx_rates") as stage:
+                    rates = self._rates = self.fx_service.get_rate_table(
+                        date(self.year, 1, 1),
+                        date(self.year, 12, 31),
+                        refresh=self.refresh_fx,
+                        currencies=self.fx_currencies,
+                    )
+                    stage.rows_out = len(rates.dates)
+        return rates
+
+    def load_input(self, kind: str, path: InputFiles) -> pd.DataFrame:
+        """Parsed `kind` export (`transactions`, `realized`, `positions`) at `path`.
+
+        With several paths, each export is parsed in parallel and the rows
+        are merged by `combine_exports` (`account` column, overlapping rows
+        removed). The frame is parsed on first use and then shared: callers
+        must not modify it in place.
+        """
+        if kind not in LOADERS:
+            raise ValueError(f"Tipo de export desconocido: {kind}")
+        paths = input_files(path)
+        key = (kind, paths[0] if len(paths) == 1 else paths)
+        with self._lock:
+            lock = self._parse_locks.setdefault(key, threading.Lock())
+        # Un hilo parsea; los demás que pidan el mismo fichero esperan su resultado
+        with lock:
+            if key not in self._parsed:
+                if len(paths) > 1:
+                    self._parsed[key] = self._load_combined(kind, paths)
+                else:
+                    with self.profiler.stage(f"parse_{kind}") as parse:
+                        df = LOADERS[kind](
+                            paths[0], cache=self.parse_cache, backend=self.csv_backend
+                        )
+                        parse.rows_out = len(df)
+                    self._add_currencies(df)
+                    self._parsed[key] = df
+        return self._parsed[key]
+
+    def _load_combined(self, kind: str, paths: tuple[str, ...]) -> pd.DataFrame:
+        with self.profiler.stage(f"combine_{kind}") as stage:
+            with ThreadPoolExecutor(max_workers=min(len(paths), PARSE_WORKERS)) as pool:
+                futures = [
+                    pool.submit(copy_context().run, self.load_input, kind, p)
+                    for p in paths
+                ]
+                frames = [(account_of(p), f.result()) for p, f in zip(paths, futures)]
+            stage.rows_in = sum(len(df) for _, df in frames)
+            combined = combine_exports(frames)
+            stage.rows_out = len(combined)
+        return combined
+
+    def forget_inputs(self, paths: Sequence[str | Path]) -> int:
+        """Drops the parsed frames of `paths` (alone or combined); returns how many.
+
+        The next `load_input` parses them again, e.g. after the files changed.
+        """
+        paths = {str(p) for p in paths}
+        with self._lock:
+            stale = [
+                key
+                for key in self._parsed
+                if paths & set(key[1] if isinstance(key[1], tuple) else (key[1],))
+            ]
+            for key in stale:
+                del self._parsed[key]
+        return len(stale)
+
+    def _accounts(self, kind: str, path: InputFiles) -> list[str]:
+        """Accounts of the rows of the `kind` input at `path`."""
+        df = self.load_input(kind, path)
+        if ACCOUNT_COLUMN in df.columns:
+            return sorted(df[ACCOUNT_COLUMN].astype(str).unique())
+        return [account_of(input_files(path)[0])]
 
-    def process_dividends(self, transactions_csv: str) -> pd.DataFrame:
-        """Processes dividend and tax transactions, converting to EUR."""
-        tx = SchwabParser.load_transactions(transactions_csv)
+    def _by_account(self, kind: str, path: InputFiles) -> pd.DataFrame:
+        """`load_input` with the `account` column also for a single export."""
+        df = self.load_input(kind, path)
+        if ACCOUNT_COLUMN in df.columns:
+            return df
+        return df.assign(**{ACCOUNT_COLUMN: account_of(input_files(path)[0])})
+
+    def _apply_fx(
+        self, df: pd.DataFrame, date_col: str, rates: RateTable | None = None
+    ) -> None:
+        """Adds the `fx_per_eur` in force on `date_col` in each row's `currency`."""
+        if rates is None:
+            # Los bloques de `chunksize` no pasan por `load_input`
+            self._add_currencies(df)
+            rates = self.rates
+        currency = df["currency"] if "currency" in df.columns else DEFAULT_CURRENCY
+        with self.profiler.stage("fx_asof", rows_in=len(df)) as stage:
+            df["fx_per_eur"] = rates.asof(df[date_col], currency)
+            stage.rows_out = int(df["fx_per_eur"].notna().sum())
+
+        missing = missing_fixings(df)
+        if not missing.empty:
+            if "currency" in missing.columns:
+                unknown = set(missing["currency"].astype(str)) - {"EUR"}
+                unknown = sorted(unknown - set(rates.currencies))
+                if unknown:
+                    raise ValueError(
+                        f"Divisas sin serie del BCE cargada: {unknown} "
+                        "(parámetro `currencies` del motor)."
+                    )
+            dates = missing[date_col].astype(str).unique()[:5].tolist()
+            raise ValueError(
+                f"{len(missing)} filas sin fixing del BCE para su fecha: {dates}"
+            )
 
-        # Filter by year
-        start_date = pd.to_datetime(f"{self.year}-01-01")
-        end_date = pd.to_datetime(f"{self.year}-12-31")
-        tx = tx[tx["date"].between(start_date, end_date)].copy()
+    def _to_eur_cents(self, cents: pd.Series, per_eur: pd.Series | float) -> pd.Series:
+        """Converts cents to EUR cents, rounding each amount with `rounding`."""
+        return convert(cents, scale_rate(per_eur), self.rounding)
 
+    def _dividend_cube(self, tx: pd.DataFrame) -> pd.DataFrame:
+        """Aggregation cube (`common.cube`) of the dividends and foreign taxes of `tx`."""
         # Apply FX
-        tx["usd_per_eur"] = tx["date"].map(self.rates)
-        tx["amount_eur"] = usd_to_eur(tx["Amount"], tx["usd_per_eur"])
+        self._apply_fx(tx, "date")
+        tx["amount_eur_cents"] = self._to_eur_cents(tx["amount_cents"], tx["fx_per_eur"])
+        return build_cube(tx)
 
-        # Group by symbol
-        div = (
-            tx[tx["Action"].isin(DIVIDEND_ACTIONS)]
-            .groupby("Symbol", dropna=False)["amount_eur"]
-            .sum()
-            .rename("dividend_gross_eur")
-        )
-        tax = (
-            tx[tx["Action"].isin(TAX_ACTIONS)]
-            .groupby("Symbol", dropna=False)["amount_eur"]
-            .sum()
-            .rename("foreign_tax_eur")
-        )
+    def _incremental_sums(
+        self,
+        name: str,
+        df: pd.DataFrame,
+        date_col: str,
+        summarize: Callable[[pd.DataFrame], pd.DataFrame],
+    ) -> pd.DataFrame:
+        """Additive sums of `df`, reusing the checkpoint of a previous run.
+
+        Rows dated up to the checkpoint cutoff are only fingerprinted; if they
+        changed since that run (history rewritten), everything is recomputed.
+        """
+        if df.empty:
+            return summarize(df.copy())
 
-        dividend_summary = pd.concat([div, tax], axis=1).fillna(0.0)
-        dividend_summary["dividend_net_eur"] = (
-            dividend_summary["dividend_gross_eur"] + dividend_summary["foreign_tax_eur"]
+        pending = df
+        settled = None
+        checkpoint = self.checkpoints.load(name, self.year)
+        if checkpoint is not None:
+            seen = df[df[date_col] <= checkpoint.cutoff]
+            if checkpoint.matches(seen, self.year, PARSER_VERSION):
+                settled = checkpoint.sums
+                pending = df[df[date_col] > checkpoint.cutoff]
+        self.incremental_status[name] = "incremental" if settled is not None else "completo"
+
+        # El último día del export puede estar incompleto: no entra en el checkpoint
+        cutoff = df[date_col].max() - pd.Timedelta(days=1)
+        new_sums = summarize(pending[pending[date_col] <= cutoff].copy())
+        settled = new_sums if settled is None else add_sums(settled, new_sums)
+
+        settled_rows = df[df[date_col] <= cutoff]
+        self.checkpoints.save(
+            name,
+            Checkpoint(
+                year=self.year,
+                version=PARSER_VERSION,
+                cutoff=cutoff,
+                rows=len(settled_rows),
+                fingerprint=fingerprint(settled_rows),
+                sums=settled,
+            ),
         )
-        return dividend_summary
 
-    def process_realized_gains(self, realized_csv: str) -> pd.Series:
-        """Processes realized gains/losses, converting to EUR."""
-        rg = SchwabParser.load_realized(realized_csv)
+        tail = summarize(pending[pending[date_col] > cutoff].copy())
+        return add_sums(settled, tail)
 
-        # Filter by year
-        start_date = pd.to_datetime(f"{self.year}-01-01")
-        end_date = pd.to_datetime(f"{self.year}-12-31")
-        rg = rg[rg["closed_date"].between(start_date, end_date)].copy()
+    def process_dividends(self, transactions_csv: InputFiles) -> pd.DataFrame:
+        """Processes dividend and tax transactions, converting to EUR.
 
-        # Apply FX
-        rg["usd_per_eur"] = rg["closed_date"].map(self.rates)
+        With `chunksize` set the CSV is streamed and only the aggregation
+        cube is kept between chunks, so memory does not grow with the file.
+        """
+        return _cents_to_eur(dividend_sums(self.dividend_cube(transactions_csv)))
 
-        # Identify gainloss column
-        gl_col = next((c for c in GAIN_LOSS_COLUMNS if c in rg.columns), None)
-        if not gl_col:
+    def dividend_cube(self, transactions_csv: InputFiles) -> pd.DataFrame:
+        """EUR and original-currency cent sums of the year's dividends and taxes.
+
+        Indexed by symbol x category (`dividend`, `tax`) x month x currency
+        (see `common.cube`), built in one pass over the transactions; the
+        per-symbol, monthly and per-country breakdowns are slices of it.
+        """
+        with self.profiler.stage("process_dividends") as stage:
+            if (
+                self.chunksize
+                and not self.incremental
+                and len(input_files(transactions_csv)) == 1
+            ):
+                cube = empty_cube()
+                stage.rows_in = 0
+                for chunk in SchwabParser.iter_transactions(
+                    input_files(transactions_csv)[0],
+                    year=self.year,
+                    chunksize=self.chunksize,
+                ):
+                    stage.rows_in += len(chunk)
+                    cube = add_sums(cube, self._dividend_cube(chunk))
+            else:
+                tx = self.load_input("transactions", transactions_csv)
+
+                # Filter by year
+                start_date = pd.to_datetime(f"{self.year}-01-01")
+                end_date = pd.to_datetime(f"{self.year}-12-31")
+                tx = tx[tx["date"].between(start_date, end_date)].copy()
+                stage.rows_in = len(tx)
+
+                if self.incremental:
+                    cube = self._incremental_sums(
+                        "dividend_cube", tx, "date", self._dividend_cube
+                    )
+                else:
+                    cube = self._dividend_cube(tx)
+            stage.rows_out = len(cube)
+        return cube
+
+    def _gain_sums(self, rg: pd.DataFrame) -> pd.DataFrame:
+        """Per-symbol EUR cent sums of the realized gains/losses of `rg`."""
+        # Gain/loss column (one of GAIN_LOSS_COLUMNS) parsed to cents by the loader
+        if "gainloss_cents" not in rg.columns:
             raise ValueError(
                 f"No gain/loss column found. Available: {rg.columns.tolist()}"
             )
 
-        rg["gainloss_eur"] = usd_to_eur(rg[gl_col], rg["usd_per_eur"])
+        # Apply FX
+        self._apply_fx(rg, "closed_date")
+
+        rg["gainloss_eur_cents"] = self._to_eur_cents(
+            rg["gainloss_cents"], rg["fx_per_eur"]
+        )
         return (
-            rg.groupby("Symbol")["gainloss_eur"].sum().rename("realized_gainloss_eur")
+            rg.groupby("Symbol")["gainloss_eur_cents"]
+            .sum()
+            .astype("int64")
+            .rename("realized_gainloss_cents")
+            .to_frame()
         )
 
-    def process_positions(self, positions_csv: str) -> pd.DataFrame:
-        """Processes positions, converting to EUR."""
-        pos = SchwabParser.load_positions(positions_csv)
+    def process_realized_gains(self, realized_csv: InputFiles) -> pd.Series:
+        """Processes realized gains/losses, converting to EUR."""
+        return _cents_to_eur(self._gain_cents(realized_csv))
 
-        usd_per_eur = self.fx_service.get_usd_per_eur_on_dec31(
-            self.year, refresh=self.refresh_fx
-        )
+    def _gain_cents(self, realized_csv: InputFiles) -> pd.Series:
+        with self.profiler.stage("process_realized_gains") as stage:
+            rg = self.load_input("realized", realized_csv)
 
-        pos["value_eur"] = usd_to_eur(pos["Market Value"], usd_per_eur)
+            # Filter by year
+            start_date = pd.to_datetime(f"{self.year}-01-01")
+            end_date = pd.to_datetime(f"{self.year}-12-31")
+            rg = rg[rg["closed_date"].between(start_date, end_date)].copy()
+            stage.rows_in = len(rg)
 
-        return pos
+            if self.incremental:
+                gains = self._incremental_sums(
+                    "gains", rg, "closed_date", self._gain_sums
+                )
+            else:
+                gains = self._gain_sums(rg)
+            stage.rows_out = len(gains)
+        return gains["realized_gainloss_cents"]
+
+    def _rates_from(self, start: date) -> RateTable:
+        """Fixings from `start` (lots may open years before) to the end of the tax year."""
+        rates = self.rates
+        if len(rates.dates) and rates.dates[0] <= np.datetime64(start, "D"):
+            return rates
+        with self.profiler.stage("fx_rates"):
+            return self.fx_service.get_rate_table(
+                start,
+                date(self.year, 12, 31),
+                refresh=self.refresh_fx,
+                currencies=self.fx_currencies,
+            )
 
-    def _normalize_country_code(self, country: str) -> str:
-        if not country:
-            return ""
-        value = str(country).strip()
-        if len(value) == 2:
-            return value.upper()
-        mapping = {
-            "United States": "US",
-            "United States of America": "US",
-            "USA": "US",
+    def process_lots(self, transactions_csv: InputFiles) -> LotMatch:
+        """FIFO lots from the Buy/Sell/split rows of the transactions export.
+
+        `closed` and `unmatched` keep the sells of the tax year and `open` the
+        lots held at year end. Each leg of a closed lot is converted at its own
+        fixing (cost at the open date, proceeds at the close date), adding the
+        `*_eur_cents` columns and `gain_eur_cents`.
+        """
+        with self.profiler.stage("fifo_lots") as stage:
+            tx = self.load_input("transactions", transactions_csv)
+            trades = trades_from_transactions(
+                tx[tx["date"] <= pd.Timestamp(self.year, 12, 31)]
+            )
+            with self.profiler.stage("match_fifo", rows_in=len(trades)) as matching:
+                match = match_fifo(trades)
+                matching.rows_out = len(match.closed)
+
+            closed = match.closed[match.closed["close_date"].dt.year == self.year]
+            closed = closed.copy()
+            unmatched = match.unmatched[
+                match.unmatched["close_date"].dt.year == self.year
+            ]
+            stage.rows_in = len(trades)
+
+            start = closed["open_date"].min() if not closed.empty else None
+            rates = self._rates_from(
+                start.date() if start is not None else date(self.year, 1, 1)
+            )
+            for leg, date_col in (("cost", "open_date"), ("proceeds", "close_date")):
+                self._apply_fx(closed, date_col, rates)
+                closed[f"{leg}_fx_per_eur"] = closed.pop("fx_per_eur")
+                closed[f"{leg}_eur_cents"] = self._to_eur_cents(
+                    closed[f"{leg}_usd_cents"], closed[f"{leg}_fx_per_eur"]
+                )
+            closed["gain_eur_cents"] = (
+                closed["proceeds_eur_cents"] - closed["cost_eur_cents"]
+            )
+            stage.rows_out = len(closed)
+
+        return LotMatch(closed=closed, open=match.open, unmatched=unmatched)
+
+    def generate_lot_reports(
+        self, transactions_csv: InputFiles, realized_csv: InputFiles | None = None
+    ) -> tuple[str, ...]:
+        """Writes the FIFO lots and their per-symbol gains.
+
+        With `realized_csv`, also the per-symbol reconciliation against
+        Schwab's realized export.
+        """
+        return self.write_outputs(self.lot_outputs(transactions_csv, realized_csv))
+
+    def lot_outputs(
+        self, transactions_csv: InputFiles, realized_csv: InputFiles | None = None
+    ) -> dict[Path, pd.DataFrame]:
+        """Output frames of `generate_lot_reports`, by path."""
+        lots = self.process_lots(transactions_csv)
+        by_symbol = per_symbol(lots.closed)
+        outputs = {
+            self.out_dir / f"lotes_fifo_{self.year}.csv": _amounts(lots.closed),
+            self.out_dir
+            / f"plusvalias_fifo_symbol_{self.year}.csv": _amounts(by_symbol).reset_index(),
         }
-        return mapping.get(value, "")
-
-    def _fetch_yfinance_metadata(self, tickers: list[str]) -> pd.DataFrame:
-        try:
-            import yfinance as yf
-        except Exception:
-            return pd.DataFrame(
-                columns=[
-                    "Ticker",
-                    "ISIN",
-                    "Domicilio Fiscal",
-                    "Poblacion",
-                    "Pais Dom Fiscal",
-                ]
+        if not lots.unmatched.empty:
+            outputs[self.out_dir / f"ventas_sin_lote_{self.year}.csv"] = _amounts(
+                lots.unmatched
             )
 
-        rows = []
-        for ticker in tickers:
-            ticker_obj = yf.Ticker(ticker)
-            isin = ""
-            info = {}
-            try:
-                if hasattr(ticker_obj, "get_isin"):
-                    isin = ticker_obj.get_isin() or ""
-            except Exception:
-                isin = ""
-
-            if not isin:
-                try:
-                    info = ticker_obj.get_info()
-                except Exception:
-                    info = {}
-                isin = info.get("isin", "") or ""
-
-            if not isin:
-                try:
-                    info = ticker_obj.info
-                except Exception:
-                    info = info or {}
-                isin = info.get("isin", "") or ""
-
-            address1 = info.get("address1", "") or ""
-            address2 = info.get("address2", "") or ""
-            city = info.get("city", "") or ""
-            state = info.get("state", "") or ""
-            zip_code = info.get("zip", "") or ""
-            country = info.get("country", "") or ""
-            domicilio_parts = [p for p in [address1, address2] if p]
-            domicilio = ", ".join(domicilio_parts)
-            for part in [city, state, zip_code, country]:
-                if part:
-                    domicilio = f"{domicilio}, {part}" if domicilio else part
-
-            rows.append(
-                {
-                    "Ticker": ticker,
-                    "ISIN": isin,
-                    "Domicilio Fiscal": domicilio,
-                    "Poblacion": city,
-                    "Pais Dom Fiscal": self._normalize_country_code(country),
-                }
+        if realized_csv is not None:
+            rg = self.load_input("realized", realized_csv)
+            rg = rg[rg["closed_date"].dt.year == self.year]
+            report = reconcile(lots.closed, rg)
+            # Plusvalía en EUR por ambos criterios: FIFO (dos fixings) y Schwab (fecha de venta)
+            report = report.join(
+                by_symbol["gain_eur_cents"].rename("gain_eur_cents_fifo")
+            )
+            report = report.join(
+                self._gain_cents(realized_csv).rename("gain_eur_cents_schwab")
+            )
+            report = report.fillna(
+                {"gain_eur_cents_fifo": 0, "gain_eur_cents_schwab": 0}
+            )
+            outputs[self.out_dir / f"conciliacion_fifo_{self.year}.csv"] = _amounts(
+                report
+            ).reset_index()
+
+        return outputs
+
+    def generate_harvest_report(
+        self, positions_csv: InputFiles, **options
+    ) -> tuple[str, ...]:
+        """Writes the best sale scenarios and their sales (see `harvest_outputs`)."""
+        return self.write_outputs(self.harvest_outputs(positions_csv, **options))
+
+    def harvest_outputs(
+        self,
+        positions_csv: InputFiles,
+        realized_csv: InputFiles | None = None,
+        transactions_csv: InputFiles | None = None,
+        prices: dict[str, float] | None = None,
+        fx: dict[str, float] | None = None,
+        sale_date: date | None = None,
+        target_eur: float = 0.0,
+        top: int = 20,
+        max_scenarios: int = 200_000,
+    ) -> dict[Path, pd.DataFrame]:
+        """Sale scenarios of the open positions ranked by the year's net gain.
+
+        Prices default to the export's (market value / quantity) and FX to
+        the ECB fixing of `sale_date` (today, or Dec 31 for past years);
+        `prices` (symbol -> price) and `fx` (currency -> units per EUR)
+        override them. With `transactions_csv` the lots are the FIFO ones,
+        each at its own cost in EUR; symbols whose history does not add up
+        to the position are sold as one lot at the export's Cost Basis.
+        """
+        sale_date = sale_date or min(date.today(), date(self.year, 12, 31))
+        with self.profiler.stage("harvest") as stage:
+            held = self._held_positions(positions_csv)
+            stage.rows_in = len(held)
+            if held.empty:
+                raise ValueError("No hay posiciones abiertas que simular.")
+
+            on = pd.Series(pd.Timestamp(sale_date), index=held.index)
+            per_eur = self._rates_from(sale_date).asof(on, held["currency"])
+            if fx:
+                per_eur = held["currency"].map(fx).fillna(per_eur)
+            if per_eur.isna().any():
+                unknown = sorted(set(held.loc[per_eur.isna(), "currency"]))
+                raise ValueError(f"Sin tipo de cambio para {unknown} en {sale_date}")
+
+            price = held["market_value_cents"] / held["Qty"]
+            if prices:
+                price = held.index.to_series().map(prices).mul(100).fillna(price)
+            price_eur_cents = price / per_eur.to_numpy()
+
+            lots = self._harvest_lots(held, transactions_csv, per_eur)
+            realized = (
+                int(self._gain_cents(realized_csv).sum()) if realized_csv is not None else 0
             )
+            with self.profiler.stage("harvest_scenarios") as scoring:
+                result = simulate_harvest(
+                    lots[LOT_COLUMNS],
+                    price_eur_cents,
+                    realized,
+                    sale_date,
+                    target_cents=round(target_eur * 100),
+                    top=top,
+                    max_scenarios=max_scenarios,
+                )
+                scoring.rows_in = result.evaluated
+            stage.rows_out = len(result.ranking)
+
+        source = lots.drop_duplicates("Symbol").set_index("Symbol")["lot_source"]
+        detail = result.detail.assign(lot_source=result.detail["Symbol"].map(source))
+        return {
+            self.out_dir / f"escenarios_venta_{self.year}.csv": _amounts(result.ranking),
+            self.out_dir / f"escenarios_venta_detalle_{self.year}.csv": _amounts(detail),
+        }
+
+    def _held_positions(self, positions_csv: InputFiles) -> pd.DataFrame:
+        """Securities of the positions export summed per ticker, indexed by it."""
+        pos = security_positions(self.load_input("positions", positions_csv))
+        qty = pd.to_numeric(
+            pos["Qty"].astype(str).str.replace(",", "", regex=False), errors="coerce"
+        )
+        cost = (
+            parse_cents(pos["Cost Basis"].astype(str), PARSE_ROUNDING)
+            if "Cost Basis" in pos.columns
+            else pd.Series(pd.NA, index=pos.index, dtype="Int64")
+        )
+        held = (
+            pos.assign(Qty=qty, cost_basis_cents=cost)
+            .groupby("Ticker", sort=True)
+            .agg(
+                currency=("currency", "first"),
+                Qty=("Qty", "sum"),
+                market_value_cents=("market_value_cents", "sum"),
+                cost_basis_cents=("cost_basis_cents", lambda s: s.sum(min_count=len(s))),
+            )
+        )
+        return held[held["Qty"] > 0]
 
-        return pd.DataFrame(rows)
+    def _harvest_lots(
+        self,
+        held: pd.DataFrame,
+        transactions_csv: InputFiles | None,
+        per_eur: pd.Series,
+    ) -> pd.DataFrame:
+        """Open lots of `held` (`LOT_COLUMNS` plus `lot_source`), cost in EUR cents."""
+        fifo = pd.DataFrame(columns=["Symbol", "currency", "open_date", "quantity"])
+        if transactions_csv is not None:
+            tx = self.load_input("transactions", transactions_csv)
+            trades = trades_from_transactions(tx[tx["date"] <= pd.Timestamp(self.year, 12, 31)])
+            with self.profiler.stage("match_fifo", rows_in=len(trades)):
+                fifo = match_fifo(trades).open
+            fifo = fifo[fifo["Symbol"].isin(held.index) & (fifo["quantity"] > 0)].copy()
 
-    def generate_report_720(self, positions_csv: str) -> str:
-        """Generates the final report for the 720."""
+        # El histórico solo vale si cuadra con la posición y fecha todos los lotes
+        fifo_qty = fifo.groupby("Symbol")["quantity"].sum().reindex(held.index)
+        dated = fifo.groupby("Symbol")["open_date"].apply(lambda d: d.notna().all())
+        usable = np.isclose(fifo_qty, held["Qty"], rtol=0, atol=1e-6) & dated.reindex(
+            held.index
+        ).fillna(False).astype(bool)
+        fifo = fifo[fifo["Symbol"].isin(held.index[usable])].copy()
+        fifo["cost_eur_cents"] = 0
+        if not fifo.empty:
+            self._apply_fx(fifo, "open_date", self._rates_from(fifo["open_date"].min().date()))
+            fifo["cost_eur_cents"] = self._to_eur_cents(fifo["cost_usd_cents"], fifo["fx_per_eur"])
+        fifo["lot_source"] = "fifo"
+
+        whole = held[~usable]
+        if whole["cost_basis_cents"].isna().any():
+            missing = whole.index[whole["cost_basis_cents"].isna()].tolist()
+            raise ValueError(
+                f"Sin lotes en las transacciones ni Cost Basis en posiciones: {missing}"
+            )
+        whole = pd.DataFrame(
+            {
+                "Symbol": whole.index,
+                "open_date": pd.NaT,
+                "quantity": whole["Qty"].to_numpy(),
+                "cost_eur_cents": self._to_eur_cents(
+                    whole["cost_basis_cents"].astype("int64"), per_eur[~usable]
+                ).to_numpy(),
+                "lot_source": "posiciones",
+            }
+        )
+        lots = pd.concat(
+            [df for df in (fifo[whole.columns], whole) if not df.empty], ignore_index=True
+        )
+        lots["open_date"] = pd.to_datetime(lots["open_date"])
+        lots["cost_eur_cents"] = lots["cost_eur_cents"].astype("int64")
+        return lots
+
+    def write_outputs(self, outputs: dict[Path, pd.DataFrame]) -> tuple[str, ...]:
+        """Writes each frame of `outputs` (path -> frame) as CSV, in order."""
         self.out_dir.mkdir(parents=True, exist_ok=True)
+        with self.profiler.stage(
+            "write_outputs", rows_in=sum(len(df) for df in outputs.values())
+        ):
+            for path, df in outputs.items():
+                df.to_csv(path, index=False)
+        return tuple(str(p) for p in outputs)
 
-        positions_df = self.process_positions(positions_csv)
+    def process_positions(self, positions_csv: InputFiles) -> pd.DataFrame:
+        """Processes positions, converting to EUR."""
+        pos = self.load_input("positions", positions_csv).copy()
 
-        # Filter out invalid tickers (e.g. "Account Total", "Cash & Cash Investments")
-        # Assuming valid tickers are short (<= 5 chars)
-        positions_df = positions_df[positions_df["Ticker"].astype(str).str.len() <= 5]
+        dec31 = date(self.year, 12, 31)
+        # Con los fixings del año ya cargados (o compartidos) no se consulta el store
+        if self._rates is not None:
+            rates = self.rates
+        else:
+            with self.profiler.stage("fx_rates"):
+                rates = self.fx_service.get_rate_table(
+                    dec31, dec31, refresh=self.refresh_fx, currencies=self.fx_currencies
+                )
 
-        posiciones_symbol = positions_df[
-            ["Ticker", "Description", "Qty", "value_eur"]
-        ].sort_values("Ticker")
+        on = pd.Series(pd.Timestamp(dec31), index=pos.index)
+        pos["fx_per_eur"] = rates.asof(on, pos.get("currency", DEFAULT_CURRENCY))
+        pos["value_eur_cents"] = self._to_eur_cents(
+            pos["market_value_cents"], pos["fx_per_eur"]
+        )
+        pos["value_eur"] = from_cents(pos["value_eur_cents"])
+
+        return pos
 
-        repo_root = Path(__file__).resolve().parents[2]
-        metadata_path = repo_root / "data" / "ticker_metadata.csv"
-        metadata_df = pd.DataFrame(
-            columns=["Ticker", "ISIN", "Domicilio Fiscal", "Poblacion", "Pais Dom Fiscal"]
+    @cached_property
+    def metadata_store(self) -> TickerMetadataStore:
+        """Local ticker metadata, seeded from `data/ticker_metadata.csv`."""
+        store = TickerMetadataStore(
+            self.fx_service.config.cache_dir / "ticker_metadata.sqlite"
         )
-        if metadata_path.exists():
-            metadata_df = pd.read_csv(metadata_path)
-            metadata_df.columns = [c.strip() for c in metadata_df.columns]
-            rename_map = {}
-            for col in metadata_df.columns:
-                col_key = col.strip().lower()
-                if col_key == "ticker":
-                    rename_map[col] = "Ticker"
-                elif col_key == "isin":
-                    rename_map[col] = "ISIN"
-                elif col_key == "domicilio fiscal" or col_key == "domicilio_fiscal":
-                    rename_map[col] = "Domicilio Fiscal"
-                elif col_key == "poblacion":
-                    rename_map[col] = "Poblacion"
-                elif col_key in {"pais dom fiscal", "pais_dom_fiscal", "pais dom. fiscal"}:
-                    rename_map[col] = "Pais Dom Fiscal"
-            if rename_map:
-                metadata_df = metadata_df.rename(columns=rename_map)
-
-        for col in ["Ticker", "ISIN", "Domicilio Fiscal", "Poblacion", "Pais Dom Fiscal"]:
-            if col not in metadata_df.columns:
-                metadata_df[col] = ""
-        metadata_df = metadata_df[
-            ["Ticker", "ISIN", "Domicilio Fiscal", "Poblacion", "Pais Dom Fiscal"]
-        ]
-        metadata_df = metadata_df.fillna("").astype(str)
-        metadata_df["ISIN"] = (
-            metadata_df["ISIN"].replace({"-": "", "N/A": "", "NA": ""}).astype(str)
+        store.import_csv(self.metadata_path)
+        return store
+
+    @cached_property
+    def isin_index(self) -> IsinIndex | None:
+        """Offline reference index (`dec-renta isin build`), None if not built."""
+        return IsinIndex.open(default_isin_index_path(self.fx_service.config.cache_dir))
+
+    def ticker_metadata(self, tickers: list[str]) -> pd.DataFrame:
+        """Metadata of `tickers`: local store, then the offline index, then the provider.
+
+        Blanks left by the store are filled from the index; only tickers
+        still incomplete after both are fetched from the provider, under the
+        store lock (simultaneous runs fetch each ticker once).
+        """
+        with self.profiler.stage("ticker_metadata", rows_in=len(tickers)) as stage:
+            fetch_targets = sorted(
+                self.metadata_store.missing(tickers, max_age=self.metadata_max_age)
+            )
+            self.profiler.count("metadata_store.hit", len(tickers) - len(fetch_targets))
+            self.profiler.count("metadata_store.miss", len(fetch_targets))
+
+            indexed = pd.DataFrame(columns=METADATA_COLUMNS)
+            if fetch_targets and self.isin_index is not None:
+                indexed = self.isin_index.lookup(fetch_targets)
+                complete = indexed.loc[
+                    (indexed[REQUIRED_METADATA_COLUMNS] != "").all(axis=1), "Ticker"
+                ]
+                self.profiler.count("isin_index.hit", len(complete))
+                fetch_targets = sorted(set(fetch_targets) - set(complete))
+
+            if fetch_targets and self.metadata_provider is not None:
+                targets = set(fetch_targets)
+
+                def pending() -> bool:
+                    # Otro proceso o hilo puede haberlos descargado mientras se esperaba
+                    missing = self.metadata_store.missing(
+                        fetch_targets, max_age=self.metadata_max_age
+                    )
+                    fetch_targets[:] = sorted(targets & set(missing))
+                    return bool(fetch_targets)
+
+                single_flight(
+                    self.metadata_store.lock, pending, lambda: self._fetch_metadata(fetch_targets)
+                )
+
+            metadata = fill_blanks(self.metadata_store.lookup(tickers), indexed)
+            stage.rows_out = len(metadata)
+        return metadata
+
+    def _fetch_metadata(self, tickers: list[str]) -> None:
+        """Fetches `tickers` from the provider into the local store."""
+        fetched_df, self.enrichment_report = MetadataEnricher(
+            self.metadata_provider
+        ).enrich(tickers)
+        # Las llamadas van en hilos del enricher: se cuentan desde el informe
+        self.profiler.count(
+            f"provider.{self.metadata_provider.name}",
+            len(self.enrichment_report.calls),
         )
+        self.metadata_store.upsert(fetched_df, source=self.metadata_provider.name)
 
-        required_cols = ["ISIN", "Domicilio Fiscal", "Poblacion", "Pais Dom Fiscal"]
-        missing_tickers = []
-        for ticker in posiciones_symbol["Ticker"].astype(str).tolist():
-            row = metadata_df[metadata_df["Ticker"] == ticker]
-            if row.empty or any(row[col].iloc[0].strip() == "" for col in required_cols):
-                missing_tickers.append(ticker)
-
-        fetch_targets = sorted(set(missing_tickers))
-        if fetch_targets:
-            fetched_df = self._fetch_yfinance_metadata(fetch_targets)
-            if not fetched_df.empty:
-                fetched_df = fetched_df.fillna("").astype(str)
-                metadata_df = metadata_df.set_index("Ticker")
-                fetched_df = fetched_df.set_index("Ticker")
-                for col in required_cols:
-                    if col in fetched_df.columns:
-                        metadata_df[col] = metadata_df[col].mask(
-                            metadata_df[col].str.strip() == "", fetched_df[col]
-                        )
-                for ticker in fetched_df.index:
-                    if ticker not in metadata_df.index:
-                        metadata_df.loc[ticker] = fetched_df.loc[ticker]
-                metadata_df = metadata_df.reset_index()
+    def generate_report_720(self, positions_csv: InputFiles) -> tuple[str, ...]:
+        """Generates the final report for the 720 (and its per-account detail)."""
+        return self.write_outputs(self.report_720_outputs(positions_csv))
+
+    def report_720_outputs(self, positions_csv: InputFiles) -> dict[Path, pd.DataFrame]:
+        with self.profiler.stage("modelo_720"):
+            return self._report_720(positions_csv)
 
-        metadata_df["ISIN"] = (
-            metadata_df["ISIN"].replace({"-": "", "N/A": "", "NA": ""}).astype(str)
+    def _report_720(self, positions_csv: InputFiles) -> dict[Path, pd.DataFrame]:
+        positions_df = security_positions(self.process_positions(positions_csv))
+
+        if self.metadata is not None:
+            metadata_df = self.metadata
+        else:
+            metadata_df = self.ticker_metadata(
+                sorted(positions_df["Ticker"].astype(str).unique())
+            )
+
+        path = self.out_dir / f"modelo_720_{self.year}.csv"
+        if ACCOUNT_COLUMN not in positions_df.columns or (
+            positions_df[ACCOUNT_COLUMN].nunique() < 2
+        ):
+            return {path: self._modelo_720(positions_df, metadata_df)}
+        # Varias cuentas: el modelo suma cada valor y el detalle va por cuenta
+        return {
+            path: self._modelo_720(consolidate_positions(positions_df), metadata_df),
+            self.out_dir / f"modelo_720_cuenta_{self.year}.csv": self._modelo_720(
+                positions_df, metadata_df
+            ),
+        }
+
+    def _modelo_720(self, positions_df: pd.DataFrame, metadata_df: pd.DataFrame) -> pd.DataFrame:
+        """Modelo 720 rows of `positions_df`, by account first if it has several."""
+        columns = ["Ticker", "Description", "Qty", "value_eur"]
+        by_account = (
+            ACCOUNT_COLUMN in positions_df.columns
+            and positions_df[ACCOUNT_COLUMN].nunique() >= 2
         )
-        metadata_df.to_csv(metadata_path, index=False)
+        if by_account:
+            posiciones_symbol = positions_df[[ACCOUNT_COLUMN] + columns].sort_values(
+                [ACCOUNT_COLUMN, "Ticker"]
+            )
+            posiciones_symbol[ACCOUNT_COLUMN] = posiciones_symbol[ACCOUNT_COLUMN].astype(str)
+        else:
+            posiciones_symbol = positions_df[columns].sort_values("Ticker")
 
         enriched = posiciones_symbol.merge(metadata_df, on="Ticker", how="left")
         enriched = enriched.fillna("")
@@ -267,55 +916,142 @@ class TaxReportEngine:
                 "Fecha Venta (si procede)": "",
             }
         )
+        if by_account:
+            modelo_720.insert(0, "Cuenta", enriched[ACCOUNT_COLUMN])
 
-        modelo_path = self.out_dir / f"modelo_720_{self.year}.csv"
-        modelo_720.round(2).to_csv(modelo_path, index=False)
-
-        return str(modelo_path)
+        return modelo_720.round(2)
 
     def generate_reports(
-        self, transactions_csv: str, realized_csv: str
-    ) -> tuple[str, str]:
-        """Main method to orchestrate report generation."""
-        self.out_dir.mkdir(parents=True, exist_ok=True)
+        self, transactions_csv: InputFiles, realized_csv: InputFiles
+    ) -> tuple[str, ...]:
+        """Writes the Modelo 100 outputs and returns their paths.
+
+        The annual summary, the per-symbol breakdown, the dividends of each
+        month and by source country, and the per-account breakdown when the
+        inputs hold several accounts.
+        """
+        return self.write_outputs(self.reports_100_outputs(transactions_csv, realized_csv))
 
-        dividend_by_symbol = self.process_dividends(transactions_csv)
-        gl_by_symbol = self.process_realized_gains(realized_csv)
+    def reports_100_outputs(
+        self, transactions_csv: InputFiles, realized_csv: InputFiles
+    ) -> dict[Path, pd.DataFrame]:
+        with self.profiler.stage("modelo_100"):
+            return self._reports_100(transactions_csv, realized_csv)
 
-        # Totals
+    def _reports_100(
+        self, transactions_csv: InputFiles, realized_csv: InputFiles
+    ) -> dict[Path, pd.DataFrame]:
+        cube = self.dividend_cube(transactions_csv)
+        dividend_by_symbol = dividend_sums(cube)
+        gl_by_symbol = self._gain_cents(realized_csv)
+
+        # Totals (sumas exactas en céntimos)
         resumen_anual = pd.DataFrame(
             [
                 {
                     "year": self.year,
-                    "Dividendos_brutos_EUR": float(
-                        dividend_by_symbol["dividend_gross_eur"].sum()
+                    "Dividendos_brutos_EUR": int(
+                        dividend_by_symbol["dividend_gross_cents"].sum()
                     ),
-                    "Impuestos_origen_EUR": float(
-                        dividend_by_symbol["foreign_tax_eur"].sum()
+                    "Impuestos_origen_EUR": int(
+                        dividend_by_symbol["foreign_tax_cents"].sum()
                     ),
-                    "Dividendos_netos_EUR": float(
-                        dividend_by_symbol["dividend_net_eur"].sum()
+                    "Dividendos_netos_EUR": int(
+                        dividend_by_symbol["dividend_net_cents"].sum()
                     ),
-                    "Ganancia_perdida_realizada_EUR": float(gl_by_symbol.sum()),
+                    "Ganancia_perdida_realizada_EUR": int(gl_by_symbol.sum()),
                 }
             ]
         )
+        totals = resumen_anual.columns.drop("year")
+        resumen_anual[totals] = from_cents(resumen_anual[totals])
 
         # Detailed breakdown
-        desglose_symbol = (
-            dividend_by_symbol.join(gl_by_symbol, how="outer")
-            .fillna(0.0)
-            .reset_index()
-            .rename(columns={"Symbol": "symbol"})
-            .sort_values("symbol")
+        desglose_symbol = _symbol_breakdown(dividend_by_symbol, gl_by_symbol)
+
+        # Round (se escriben con write_outputs)
+        outputs = {
+            self.out_dir / f"resumen_anual_{self.year}.csv": resumen_anual.round(2),
+            self.out_dir / f"desglose_symbol_{self.year}.csv": desglose_symbol.round(2),
+            self.out_dir / f"dividendos_mes_{self.year}.csv": self._month_breakdown(cube),
+            self.out_dir
+            / f"doble_imposicion_pais_{self.year}.csv": self._country_breakdown(cube),
+        }
+        accounts = sorted(
+            set(self._accounts("transactions", transactions_csv))
+            | set(self._accounts("realized", realized_csv))
         )
+        if len(accounts) > 1:
+            desglose_cuenta = self._account_breakdown(
+                transactions_csv, realized_csv, accounts
+            )
+            outputs[self.out_dir / f"desglose_cuenta_{self.year}.csv"] = (
+                desglose_cuenta.round(2)
+            )
+        return outputs
+
+    def _account_breakdown(
+        self, transactions_csv: InputFiles, realized_csv: InputFiles, accounts: list[str]
+    ) -> pd.DataFrame:
+        """`desglose_symbol` of each account; the consolidated one is their sum."""
+        with self.profiler.stage("account_breakdown", rows_in=len(accounts)) as stage:
+            tx = self._by_account("transactions", transactions_csv)
+            tx = tx[tx["date"].dt.year == self.year]
+            rg = self._by_account("realized", realized_csv)
+            rg = rg[rg["closed_date"].dt.year == self.year]
 
-        # Paths
-        res_path = self.out_dir / f"resumen_anual_{self.year}.csv"
-        des_path = self.out_dir / f"desglose_symbol_{self.year}.csv"
+            parts = []
+            for account in accounts:
+                dividends = dividend_sums(
+                    self._dividend_cube(tx[tx[ACCOUNT_COLUMN].astype(str) == account].copy())
+                )
+                gains = self._gain_sums(
+                    rg[rg[ACCOUNT_COLUMN].astype(str) == account].copy()
+                )["realized_gainloss_cents"]
+                breakdown = _symbol_breakdown(dividends, gains)
+                breakdown.insert(0, ACCOUNT_COLUMN, account)
+                parts.append(breakdown)
+            stage.rows_out = sum(len(part) for part in parts)
+        return pd.concat(parts, ignore_index=True)
 
-        # Round and save
-        resumen_anual.round(2).to_csv(res_path, index=False)
-        desglose_symbol.round(2).to_csv(des_path, index=False)
+    def _month_breakdown(self, cube: pd.DataFrame) -> pd.DataFrame:
+        """Dividends and foreign taxes in EUR of each month of the year."""
+        months = pd.RangeIndex(1, 13, name="month")
+        by_month = dividend_sums(cube, "month").reindex(months, fill_value=0)
+        return _cents_to_eur(by_month).reset_index().round(2)
 
-        return str(res_path), str(des_path)
+    def _country_breakdown(self, cube: pd.DataFrame) -> pd.DataFrame:
+        """Dividends and foreign taxes in EUR by source country (double taxation).
+
+        The withholding rate of each country is the tax over the gross
+        dividends, to compare with the treaty rate when claiming the
+        deduction for international double taxation.
+        """
+        symbols = cube.index.get_level_values("Symbol").unique()
+        by_country = dividend_sums(cube, self._source_countries(symbols))
+        out = _cents_to_eur(by_country).reset_index()
+        gross = by_country["dividend_gross_cents"].to_numpy()
+        tax = by_country["foreign_tax_cents"].to_numpy()
+        out["withholding_pct"] = np.where(gross > 0, -100 * tax / np.maximum(gross, 1), 0.0)
+        return out.round(2)
+
+    def _source_countries(self, symbols: pd.Index) -> pd.Series:
+        """Source country of each symbol's dividends ("" when unknown), offline.
+
+        The country of the ISIN (its issuer), else the tax domicile; taken
+        from the shared metadata, or else the local store and ISIN index.
+        The provider is never called: an unknown symbol is left blank.
+        """
+        tickers = [str(s) for s in symbols if isinstance(s, str) and s]
+        if self.metadata is not None:
+            metadata = self.metadata[self.metadata["Ticker"].isin(tickers)]
+        else:
+            metadata = self.metadata_store.lookup(tickers)
+            if self.isin_index is not None:
+                metadata = fill_blanks(metadata, self.isin_index.lookup(tickers))
+        metadata = metadata.drop_duplicates("Ticker").set_index("Ticker").fillna("")
+        issuer = metadata["ISIN"].astype(str).str[:2]
+        country = issuer.where(
+            issuer.str.fullmatch(r"[A-Z]{2}"), metadata["Pais Dom Fiscal"]
+        )
+        return country.reindex(symbols).fillna("").rename("country")
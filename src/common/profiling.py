@@ -0,0 +1,226 @@
+from __future__ import annotations
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Iterator
+import json
+import os
+import sys
+import threading
+import time
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Profiler de la etapa en curso (los módulos de bajo nivel cuentan sin conocerlo)
+_ACTIVE: ContextVar[Profiler | None] = ContextVar("dec_renta_profiler", default=None)
+# Etapa abierta en el contexto: un hilo lanzado con copy_context() anida bajo ella
+_CURRENT: ContextVar[StageRecord | None] = ContextVar("dec_renta_stage", default=None)
+
+
+def count(name: str, n: int = 1) -> None:
+    """Adds `n` to counter `name` of every open stage of the active profiler."""
+    profiler = _ACTIVE.get()
+    if profiler is not None:
+        profiler.count(name, n)
+
+
+def peak_rss_bytes() -> int | None:
+    """Peak resident memory of the process so far (None where unsupported)."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux lo da en KiB, macOS en bytes
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+@dataclass
+class StageRecord:
+    """Measurements of one pipeline stage.
+
+    `counters` holds the events counted while the stage was open
+    (`http.*` requests, `provider.*` metadata lookups, `parse_cache.hit`/`miss`,
+    ...); both `http.*` and `provider.*` count as network calls.
+    """
+
+    name: str
+    parent: str | None
+    depth: int
+    start: float
+    seconds: float = 0.0
+    rows_in: int | None = None
+    rows_out: int | None = None
+    counters: Counter = field(default_factory=Counter)
+    peak_rss_bytes: int | None = None
+    thread: int = 0
+    up: StageRecord | None = field(default=None, repr=False, compare=False)
+
+    @property
+    def cache(self) -> str | None:
+        """`hit`/`miss` when the stage went through the parse cache."""
+        if self.counters.get("parse_cache.miss"):
+            return "miss"
+        if self.counters.get("parse_cache.hit"):
+            return "hit"
+        return None
+
+    @property
+    def network_calls(self) -> int:
+        return sum(
+            v
+            for k, v in self.counters.items()
+            if k.startswith(("http.", "provider."))
+        )
+
+    def to_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "parent": self.parent,
+            "depth": self.depth,
+            "start_s": round(self.start, 6),
+            "seconds": round(self.seconds, 6),
+            "rows_in": self.rows_in,
+            "rows_out": self.rows_out,
+            "cache": self.cache,
+            "network_calls": self.network_calls,
+            "counters": dict(self.counters),
+            "peak_rss_bytes": self.peak_rss_bytes,
+        }
+
+
+StageHook = Callable[[StageRecord], None]
+
+
+class Profiler:
+    """Records nested pipeline stages and notifies hooks as each one ends.
+
+    Stages are opened with `stage()`; the yielded `StageRecord` takes the row
+    counts. The trace is written as JSON (`write_json`) and optionally in the
+    Chrome trace format (`write_chrome_trace`, chrome://tracing or Perfetto).
+    """
+
+    def __init__(self, hooks: list[StageHook] | None = None):
+        self.hooks: list[StageHook] = list(hooks or [])
+        self.records: list[StageRecord] = []
+        self.totals: Counter = Counter()
+        self._origin = time.perf_counter()
+        self._started_at = time.strftime("%Y-%m-%dT%H:%M:%S")
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def add_hook(self, hook: StageHook) -> None:
+        """Registers `hook`, called with the `StageRecord` of every finished stage."""
+        self.hooks.append(hook)
+
+    @property
+    def _open(self) -> list[StageRecord]:
+        if not hasattr(self._local, "stack"):
+            self._local.stack = []
+        return self._local.stack
+
+    def count(self, name: str, n: int = 1) -> None:
+        """Adds `n` to counter `name` of the innermost open stage and its parents."""
+        stack = self._open
+        record = stack[-1] if stack else None
+        if record is None and _ACTIVE.get() is self:
+            # Hilo lanzado con copy_context(): cuenta en la etapa que lo lanzó
+            record = _CURRENT.get()
+        with self._lock:
+            self.totals[name] += n
+            while record is not None:
+                record.counters[name] += n
+                record = record.up
+
+    @contextmanager
+    def stage(self, name: str, rows_in: int | None = None) -> Iterator[StageRecord]:
+        """Times the enclosed block as stage `name` (nested in the open stage).
+
+        In a thread started with `contextvars.copy_context()` the first stage
+        nests in the stage open where the thread was started.
+        """
+        stack = self._open
+        parent = stack[-1] if stack else None
+        if parent is None and _ACTIVE.get() is self:
+            parent = _CURRENT.get()
+        record = StageRecord(
+            name=name,
+            parent=parent.name if parent else None,
+            depth=parent.depth + 1 if parent else 0,
+            start=time.perf_counter() - self._origin,
+            rows_in=rows_in,
+            thread=threading.get_ident(),
+            up=parent,
+        )
+        stack.append(record)
+        token = _ACTIVE.set(self)
+        current = _CURRENT.set(record)
+        start = time.perf_counter()
+        try:
+            yield record
+        finally:
+            record.seconds = time.perf_counter() - start
+            record.peak_rss_bytes = peak_rss_bytes()
+            _CURRENT.reset(current)
+            _ACTIVE.reset(token)
+            stack.pop()
+            with self._lock:
+                self.records.append(record)
+            for hook in self.hooks:
+                hook(record)
+
+    def to_dict(self, **meta) -> dict:
+        records = sorted(self.records, key=lambda r: r.start)
+        return {
+            **meta,
+            "started_at": self._started_at,
+            "pid": os.getpid(),
+            "seconds": round(time.perf_counter() - self._origin, 6),
+            "peak_rss_bytes": peak_rss_bytes(),
+            "counters": dict(self.totals),
+            "stages": [r.to_dict() for r in records],
+        }
+
+    def write_json(self, path: Path, **meta) -> Path:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(self.to_dict(**meta), indent=2), encoding="utf-8")
+        return path
+
+    def write_chrome_trace(self, path: Path) -> Path:
+        """Writes the stages as complete events of the Chrome trace format."""
+        pid = os.getpid()
+        events = [
+            {
+                "name": r.name,
+                "cat": "stage",
+                "ph": "X",
+                "ts": round(r.start * 1e6),
+                "dur": round(r.seconds * 1e6),
+                "pid": pid,
+                "tid": r.thread,
+                "args": {
+                    k: v
+                    for k, v in r.to_dict().items()
+                    if k not in ("name", "start_s", "seconds", "parent", "depth")
+                },
+            }
+            for r in sorted(self.records, key=lambda r: r.start)
+        ]
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(
+            json.dumps({"traceEvents": events, "displayTimeUnit": "ms"}),
+            encoding="utf-8",
+        )
+        return path
+
+    def write(
+        self, out_dir: Path, name: str, chrome_trace: bool = False, **meta
+    ) -> list[Path]:
+        """Writes `<name>.json` (and `<name>.trace.json`) into `out_dir`."""
+        paths = [self.write_json(out_dir / f"{name}.json", **meta)]
+        if chrome_trace:
+            paths.append(self.write_chrome_trace(out_dir / f"{name}.trace.json"))
+        return paths
@@ -1,23 +1,59 @@
 from __future__ import annotations
-from common.processor import TaxReportEngine
+from common.parse_cache import ParseCache
+from common.processor import InputFiles, TaxReportEngine
+from common.profiling import Profiler
 
 
 def build_reports(
-    transactions_csv: str,
-    realized_csv: str,
+    transactions_csv: InputFiles,
+    realized_csv: InputFiles,
     year: int,
     out_dir: str,
     refresh_fx: bool = False,
+    chunksize: int | None = None,
+    parse_cache: bool = False,
+    incremental: bool = False,
+    profiler: Profiler | None = None,
+    fifo: bool = False,
+    currencies: tuple[str, ...] = (),
 ):
-    """Wrapper function to maintain backward compatibility."""
-    engine = TaxReportEngine(year=year, out_dir=out_dir, refresh_fx=refresh_fx)
-    return engine.generate_reports(transactions_csv, realized_csv)
+    """Wrapper function to maintain backward compatibility.
+
+    With `fifo`, the FIFO lot reports are appended to the returned paths.
+    `currencies` are ECB series loaded besides those of the inputs.
+    """
+    engine = TaxReportEngine(
+        year=year,
+        out_dir=out_dir,
+        refresh_fx=refresh_fx,
+        chunksize=chunksize,
+        parse_cache=ParseCache() if parse_cache else None,
+        incremental=incremental,
+        profiler=profiler,
+        currencies=currencies,
+    )
+    paths = engine.generate_reports(transactions_csv, realized_csv)
+    if fifo:
+        paths += engine.generate_lot_reports(transactions_csv, realized_csv)
+    return paths
 
 def generate_report_720(
-    positions_csv: str,
+    positions_csv: InputFiles,
     year: int,
     out_dir: str,
     refresh_fx: bool = False,
-) -> str:
-    engine = TaxReportEngine(year=year, out_dir=out_dir, refresh_fx=refresh_fx)
+    parse_cache: bool = False,
+    profiler: Profiler | None = None,
+    currencies: tuple[str, ...] = (),
+    metadata_max_age: float | None = None,
+) -> tuple[str, ...]:
+    engine = TaxReportEngine(
+        year=year,
+        out_dir=out_dir,
+        refresh_fx=refresh_fx,
+        parse_cache=ParseCache() if parse_cache else None,
+        profiler=profiler,
+        currencies=currencies,
+        metadata_max_age=metadata_max_age,
+    )
     return engine.generate_report_720(positions_csv)
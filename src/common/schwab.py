@@ -1,64 +1,179 @@
 from __future__ import annotations
+from typing import Iterator
+import numpy as np
 import pandas as pd
 
-from model_100.utils.dictionary import NUMERIC_COLUMNS
-from common.pandas_transform import (
-    remove_dollar_comma,
-    convert_to_numeric,
-    convert_to_datetime,
-    fill_na,
-    get_columns,
+from model_100.utils.dictionary import GAIN_LOSS_COLUMNS, NUMERIC_COLUMNS
+from common.pandas_transform import get_columns
+from common.csv_backend import CsvSchema, get_backend, read_header
+from common.fx import DEFAULT_CURRENCY
+from common.money import Rounding, from_cents, parse_cents
+from common.parse_cache import ParseCache
+
+# Sube al cambiar la limpieza de los loaders: invalida la caché de parseo
+PARSER_VERSION = "3"
+
+# Columnas del export de transacciones que usan los informes
+TRANSACTION_COLUMNS = ["Date", "Action", "Symbol", "Amount"]
+# Columna opcional con la divisa ISO de cada fila (sin ella, DEFAULT_CURRENCY)
+CURRENCY_COLUMN = "Currency"
+# Columnas de importes que además se guardan en céntimos (int64) -> nombre
+REALIZED_CENTS_COLUMNS = {
+    "Proceeds": "proceeds_cents",
+    "Cost Basis (CB)": "cost_basis_cents",
+}
+# Los importes con más de dos decimales se redondean al céntimo al parsear
+PARSE_ROUNDING = Rounding.HALF_UP
+
+TRANSACTIONS_SCHEMA = CsvSchema(
+    dates={"Date": "date"},
+    money={"Amount": "amount_cents"},
+    strings=("Symbol", "Action"),
+    rounding=PARSE_ROUNDING,
+)
+POSITIONS_SCHEMA = CsvSchema(
+    skiprows=2,
+    rename={
+        "Qty (Quantity)": "Qty",
+        "Symbol": "Ticker",
+        "Mkt Val (Market Value)": "Market Value",
+    },
+    money={"Market Value": "market_value_cents"},
+    rounding=PARSE_ROUNDING,
 )
 
 
+def realized_schema(path: str) -> CsvSchema:
+    """Schema of a realized gain/loss export: its amount columns depend on the layout."""
+    columns = read_header(path, skiprows=1)
+    money = {
+        col: cents_col
+        for col, cents_col in REALIZED_CENTS_COLUMNS.items()
+        if col in columns
+    }
+    gl_col = next((c for c in GAIN_LOSS_COLUMNS if c in columns), None)
+    if gl_col:
+        money[gl_col] = "gainloss_cents"
+    return CsvSchema(
+        skiprows=1,
+        dates={"Closed Date": "closed_date"},
+        money=money,
+        numbers=tuple(NUMERIC_COLUMNS),
+        strings=("Symbol",),
+        rounding=PARSE_ROUNDING,
+    )
+
+
+def currency(df: pd.DataFrame) -> pd.Series:
+    """ISO currency of each row (categorical): `Currency` if the export has it, USD otherwise."""
+    if CURRENCY_COLUMN not in df.columns:
+        codes = np.zeros(len(df), dtype=np.int8)
+        return pd.Series(
+            pd.Categorical.from_codes(codes, [DEFAULT_CURRENCY]), index=df.index
+        )
+    codes = df[CURRENCY_COLUMN].fillna("").astype(str).str.strip().str.upper()
+    return codes.replace("", DEFAULT_CURRENCY).astype("category")
+
+
 class SchwabParser:
     """Parser to read and clean Schwab Export CSVs."""
 
     @staticmethod
-    def load_transactions(path: str) -> pd.DataFrame:
-        """Loads and cleans the transactions CSV."""
-        df = pd.read_csv(path)
-        df.columns = get_columns(df)
+    def load_transactions(
+        path: str, cache: ParseCache | None = None, backend: str | None = None
+    ) -> pd.DataFrame:
+        """Loads and cleans the transactions CSV.
+
+        `backend` picks the CSV reader (see `common.csv_backend.get_backend`).
+        """
+        reader = get_backend(backend)
+        if cache is not None:
+            return cache.get_or_parse(
+                path,
+                "transactions",
+                f"{PARSER_VERSION}-{reader.name}",
+                lambda p: SchwabParser.load_transactions(p, backend=reader.name),
+            )
 
-        df["date"] = convert_to_datetime(df[["Date"]])["Date"]
-        df["Amount"] = remove_dollar_comma(df[["Amount"]])["Amount"]
-        df["Amount"] = convert_to_numeric(df[["Amount"]])["Amount"]
-        df["Symbol"] = fill_na(df[["Symbol"]])["Symbol"]
-        df["Action"] = fill_na(df[["Action"]])["Action"]
+        df = reader.read(path, TRANSACTIONS_SCHEMA)
+        df["currency"] = currency(df)
 
         return df
 
     @staticmethod
-    def load_realized(path: str) -> pd.DataFrame:
-        """Loads and cleans the realized gain/loss CSV."""
-        df = pd.read_csv(path, skiprows=1)
-        df.columns = get_columns(df)
+    def iter_transactions(
+        path: str, year: int | None = None, chunksize: int = 100_000
+    ) -> Iterator[pd.DataFrame]:
+        """Streams the transactions CSV in cleaned chunks of the needed columns.
+
+        Rows outside `year` are dropped before any date or amount parsing.
+        """
+        reader = pd.read_csv(
+            path,
+            usecols=lambda c: c.strip() in TRANSACTION_COLUMNS + [CURRENCY_COLUMN],
+            dtype=str,
+            chunksize=chunksize,
+        )
+        for chunk in reader:
+            chunk.columns = get_columns(chunk)
+            if year is not None:
+                # Fechas MM/DD/YYYY: se filtra por el texto antes de parsear
+                chunk = chunk[chunk["Date"].str[6:10] == str(year)]
 
-        df["closed_date"] = convert_to_datetime(df[["Closed Date"]])["Closed Date"]
+            amount_cents = parse_cents(chunk["Amount"], PARSE_ROUNDING)
+            yield pd.DataFrame(
+                {
+                    "date": pd.to_datetime(
+                        chunk["Date"], format="%m/%d/%Y", errors="coerce"
+                    ),
+                    "Action": chunk["Action"].fillna(""),
+                    "Symbol": chunk["Symbol"].fillna(""),
+                    "Amount": from_cents(amount_cents),
+                    "amount_cents": amount_cents,
+                    "currency": currency(chunk),
+                }
+            ).dropna(subset=["date"])
 
-        for col in NUMERIC_COLUMNS:
-            if col in df.columns:
-                df[col] = remove_dollar_comma(df[[col]])[col]
-                df[col] = convert_to_numeric(df[[col]])[col]
+    @staticmethod
+    def load_realized(
+        path: str, cache: ParseCache | None = None, backend: str | None = None
+    ) -> pd.DataFrame:
+        """Loads and cleans the realized gain/loss CSV.
+
+        `backend` picks the CSV reader (see `common.csv_backend.get_backend`).
+        """
+        reader = get_backend(backend)
+        if cache is not None:
+            return cache.get_or_parse(
+                path,
+                "realized",
+                f"{PARSER_VERSION}-{reader.name}",
+                lambda p: SchwabParser.load_realized(p, backend=reader.name),
+            )
 
-        df["Symbol"] = fill_na(df[["Symbol"]])["Symbol"]
+        df = reader.read(path, realized_schema(path))
+        df["currency"] = currency(df)
 
         return df
 
     @staticmethod
-    def load_positions(path: str) -> pd.DataFrame:
-        """Loads and cleans the positions CSV."""
-        df = pd.read_csv(path, skiprows=2)
-        df = df.rename(
-            columns={
-                "Qty (Quantity)": "Qty",
-                "Symbol": "Ticker",
-                "Mkt Val (Market Value)": "Market Value",
-            }
-        )
-        df.columns = get_columns(df)
+    def load_positions(
+        path: str, cache: ParseCache | None = None, backend: str | None = None
+    ) -> pd.DataFrame:
+        """Loads and cleans the positions CSV.
+
+        `backend` picks the CSV reader (see `common.csv_backend.get_backend`).
+        """
+        reader = get_backend(backend)
+        if cache is not None:
+            return cache.get_or_parse(
+                path,
+                "positions",
+                f"{PARSER_VERSION}-{reader.name}",
+                lambda p: SchwabParser.load_positions(p, backend=reader.name),
+            )
 
-        df["Market Value"] = remove_dollar_comma(df[["Market Value"]])["Market Value"]
-        df["Market Value"] = convert_to_numeric(df[["Market Value"]])["Market Value"]
+        df = reader.read(path, POSITIONS_SCHEMA)
+        df["currency"] = currency(df)
 
         return df
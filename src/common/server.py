@@ -0,0 +1,494 @@
+from __future__ import annotations
+from collections import Counter, deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from email.parser import BytesParser
+from email.policy import HTTP
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from pathlib import Path
+from typing import Callable, TypeVar
+from urllib.parse import parse_qs, urlsplit
+import json
+import tempfile
+import threading
+import time
+
+import pandas as pd
+
+from common.cube import ACTION_CATEGORIES
+from common.enrichment import MetadataProvider, default_metadata_provider
+from common.fx import ECBExchangeService, RateTable
+from common.pipeline import FORMS, AllFormsInputs, form_outputs, resolve_all_inputs
+from common.processor import TaxReportEngine, security_positions
+from common.profiling import Profiler
+from model_720.utils.dictionary import METADATA_COLUMNS
+
+# Latencias recientes con las que se calculan los percentiles
+LATENCY_WINDOW = 2048
+# Ventana (segundos) del throughput reciente
+THROUGHPUT_WINDOW = 60.0
+MAX_UPLOAD_BYTES = 200 * 2**20
+T = TypeVar("T")
+# Errores al leer un CSV subido (vacío, sin cabecera, sin una columna, codificación...)
+PARSE_ERRORS = (ValueError, KeyError)
+
+
+class RequestError(ValueError):
+    """Invalid request: answered with a 4xx status and its message."""
+
+    def __init__(self, message: str, status: int = 400):
+        super().__init__(message)
+        self.status = status
+
+
+class ServiceMetrics:
+    """Thread-safe latency and throughput figures of the service."""
+
+    def __init__(self, window: int = LATENCY_WINDOW):
+        self.started = time.monotonic()
+        self.requests: Counter = Counter()
+        self.statuses: Counter = Counter()
+        self.stages: dict[str, list[float]] = {}
+        self.in_flight = 0
+        self.queued = 0
+        self.rejected = 0
+        self._latencies: deque[float] = deque(maxlen=window)
+        self._finished: deque[float] = deque()
+        self._lock = threading.Lock()
+
+    def begin(self) -> None:
+        with self._lock:
+            self.in_flight += 1
+
+    def end(self, endpoint: str, status: int, seconds: float) -> None:
+        """Records one finished request; only reports feed the latency figures."""
+        now = time.monotonic()
+        with self._lock:
+            self.in_flight -= 1
+            self.requests[endpoint] += 1
+            self.statuses[status] += 1
+            if endpoint == "reports":
+                self._latencies.append(seconds)
+                self._finished.append(now)
+                while self._finished and now - self._finished[0] > THROUGHPUT_WINDOW:
+                    self._finished.popleft()
+
+    def add_stages(self, profiler: Profiler) -> None:
+        """Adds the stage times of one report (count, seconds) by stage name."""
+        with self._lock:
+            for record in profiler.records:
+                totals = self.stages.setdefault(record.name, [0, 0.0])
+                totals[0] += 1
+                totals[1] += record.seconds
+
+    def snapshot(self) -> dict:
+        now = time.monotonic()
+        with self._lock:
+            latencies = sorted(self._latencies)
+            recent = sum(1 for t in self._finished if now - t <= THROUGHPUT_WINDOW)
+            uptime = now - self.started
+            reports = self.requests["reports"]
+            return {
+                "uptime_s": round(uptime, 3),
+                "in_flight": self.in_flight,
+                "queued": self.queued,
+                "rejected": self.rejected,
+                "requests": dict(self.requests),
+                "statuses": {str(k): v for k, v in sorted(self.statuses.items())},
+                "throughput_rps": {
+                    "overall": round(reports / uptime, 3) if uptime else 0.0,
+                    f"last_{THROUGHPUT_WINDOW:.0f}s": round(
+                        recent / min(uptime, THROUGHPUT_WINDOW), 3
+                    )
+                    if uptime
+                    else 0.0,
+                },
+                "latency_ms": _latency_summary(latencies),
+                "stages": {
+                    name: {"count": n, "seconds": round(seconds, 6)}
+                    for name, (n, seconds) in sorted(self.stages.items())
+                },
+            }
+
+
+def _latency_summary(latencies: list[float]) -> dict:
+    """Nearest-rank percentiles (ms) of sorted `latencies`."""
+    if not latencies:
+        return {"count": 0}
+
+    def rank(q: float) -> float:
+        i = min(len(latencies) - 1, max(0, int(q * len(latencies) + 0.5) - 1))
+        return round(latencies[i] * 1000, 3)
+
+    return {
+        "count": len(latencies),
+        "mean": round(sum(latencies) / len(latencies) * 1000, 3),
+        "p50": rank(0.50),
+        "p95": rank(0.95),
+        "p99": rank(0.99),
+        "max": round(latencies[-1] * 1000, 3),
+    }
+
+
+class WarmState:
+    """FX fixings and ticker metadata kept in memory between requests.
+
+    The fixings of a tax year are loaded once and shared by every engine;
+    those of a year still in progress are reloaded after `fx_ttl` seconds,
+    so new ECB fixings are picked up. Ticker metadata comes from the local
+    store and the provider the first time a ticker is seen, and from memory
+    afterwards (a ticker the provider does not know is not asked again).
+    """
+
+    def __init__(
+        self,
+        metadata_provider: MetadataProvider | None = None,
+        refresh_fx: bool = False,
+        fx_ttl: float = 3600.0,
+    ):
+        self.fx_service = ECBExchangeService()
+        self.refresh_fx = refresh_fx
+        self.fx_ttl = fx_ttl
+        self.metadata_provider = metadata_provider or default_metadata_provider()
+        self._rates: dict[int, tuple[float, RateTable]] = {}
+        self._rates_lock = threading.Lock()
+        self._metadata = pd.DataFrame(columns=METADATA_COLUMNS)
+        self._known: set[str] = set()
+        self._metadata_lock = threading.Lock()
+        self._metadata_engine: TaxReportEngine | None = None
+
+    def rates(self, year: int) -> RateTable:
+        """Fixings of `year`, loaded on first use."""
+        with self._rates_lock:
+            loaded = self._rates.get(year)
+            stale = (
+                loaded is not None
+                and year >= date.today().year
+                and time.monotonic() - loaded[0] > self.fx_ttl
+            )
+            if loaded is None or stale:
+                table = self.fx_service.get_rate_table(
+                    date(year, 1, 1), date(year, 12, 31), refresh=self.refresh_fx
+                )
+                loaded = self._rates[year] = (time.monotonic(), table)
+                # Solo la primera carga revalida el FX
+                self.refresh_fx = False
+            return loaded[1]
+
+    def metadata(self, tickers: set[str]) -> pd.DataFrame:
+        """Metadata of `tickers`, enriching only those never seen before."""
+        with self._metadata_lock:
+            missing = sorted(set(tickers) - self._known)
+            if missing:
+                if self._metadata_engine is None:
+                    self._metadata_engine = TaxReportEngine(
+                        year=date.today().year,
+                        out_dir=Path(tempfile.gettempdir()),
+                        metadata_provider=self.metadata_provider,
+                    )
+                fetched = self._metadata_engine.ticker_metadata(missing)
+                if self._metadata.empty:
+                    self._metadata = fetched
+                elif not fetched.empty:
+                    self._metadata = pd.concat([self._metadata, fetched], ignore_index=True)
+                self._known.update(missing)
+            return self._metadata[self._metadata["Ticker"].isin(tickers)].reset_index(
+                drop=True
+            )
+
+    def summary(self) -> dict:
+        with self._rates_lock, self._metadata_lock:
+            return {"fx_years": sorted(self._rates), "metadata_tickers": len(self._known)}
+
+
+class ReportService:
+    """Generates the forms of uploaded Schwab exports on the warm state.
+
+    Each request gets its own engine (uploads are never mixed between
+    clients) built on the shared FX fixings and ticker metadata, so only
+    the uploaded CSVs are parsed per request.
+    """
+
+    def __init__(
+        self,
+        state: WarmState | None = None,
+        metrics: ServiceMetrics | None = None,
+        csv_backend: str | None = None,
+    ):
+        self.state = state or WarmState()
+        self.metrics = metrics or ServiceMetrics()
+        self.csv_backend = csv_backend
+
+    def generate(
+        self,
+        files: dict[str, bytes],
+        year: int | None = None,
+        fifo: bool = False,
+        forms: tuple[str, ...] = FORMS,
+    ) -> dict:
+        """Outputs (name -> CSV text) of the `forms` of the uploaded `files`."""
+        if not files:
+            raise RequestError("No se ha subido ningún CSV")
+        unknown = [form for form in forms if form not in FORMS]
+        if unknown:
+            raise RequestError(
+                f"Modelo desconocido: {', '.join(unknown)} (válidos: {', '.join(FORMS)})"
+            )
+
+        start = time.perf_counter()
+        with tempfile.TemporaryDirectory(prefix="dec_renta_") as tmp:
+            data_dir = Path(tmp) / "data"
+            data_dir.mkdir()
+            for name, content in files.items():
+                (data_dir / name).write_bytes(content)
+
+            try:
+                inputs = resolve_all_inputs(str(data_dir), year=year)
+            except (FileNotFoundError, ValueError) as e:
+                raise RequestError(str(e).replace(str(data_dir), "upload")) from e
+
+            profiler = Profiler()
+            engine = TaxReportEngine(
+                year=inputs.year,
+                out_dir=Path(tmp) / "out",
+                rates=self.state.rates(inputs.year),
+                metadata_provider=self.state.metadata_provider,
+                profiler=profiler,
+                csv_backend=self.csv_backend,
+            )
+            # Cada CSV se parsea aquí (y queda en el engine): un CSV ilegible es un 400
+            uploaded = _uploaded(inputs, forms)
+            for kind, paths in uploaded:
+                _parsed(paths, lambda: engine.load_input(kind, paths))
+            # Metadata de la caché caliente en todos los modelos (también el país de los
+            # dividendos): el engine no abre el store local por petición
+            engine.metadata = self.state.metadata(_tickers(engine, uploaded))
+            outputs = form_outputs(engine, inputs, fifo=fifo, forms=forms)
+            self.metrics.add_stages(profiler)
+
+        return {
+            "year": inputs.year,
+            "forms": [form for form in forms if form not in inputs.skipped],
+            "outputs": {path.name: df.to_csv(index=False) for path, df in outputs.items()},
+            "skipped": dict(inputs.skipped),
+            "seconds": round(time.perf_counter() - start, 6),
+        }
+
+
+
+def _tickers(engine: TaxReportEngine, uploaded: list[tuple[str, tuple[Path, ...]]]) -> set[str]:
+    """Tickers of the positions and dividend symbols of the inputs already parsed by `engine`."""
+    tickers = set()
+    for kind, paths in uploaded:
+        df = engine.load_input(kind, paths)
+        if kind == "positions":
+            tickers.update(security_positions(df)["Ticker"].astype(str))
+        elif kind == "transactions":
+            symbols = df.loc[df["Action"].isin(list(ACTION_CATEGORIES)), "Symbol"]
+            tickers.update(s for s in symbols.unique() if isinstance(s, str) and s)
+    return tickers
+
+
+def _uploaded(inputs: AllFormsInputs, forms: tuple[str, ...]) -> list[tuple[str, tuple[Path, ...]]]:
+    """(kind, paths) of the inputs the requested `forms` read."""
+    uploaded = []
+    if inputs.inputs_100 is not None and "modelo-100" in forms:
+        uploaded += [
+            ("transactions", inputs.inputs_100.transactions_csvs),
+            ("realized", inputs.inputs_100.realized_csvs),
+        ]
+    if inputs.inputs_720 is not None and "modelo-720" in forms:
+        uploaded.append(("positions", inputs.inputs_720.positions_csvs))
+    return uploaded
+
+
+def _parsed(paths: tuple[Path, ...], parse: Callable[[], T]) -> T:
+    """`parse()`, with the errors of an unreadable CSV as a `RequestError`."""
+    try:
+        return parse()
+    except PARSE_ERRORS as e:
+        detail = f"falta la columna {e}" if isinstance(e, KeyError) else str(e)
+        names = ", ".join(p.name for p in paths)
+        raise RequestError(f"CSV no válido ({names}): {detail}") from e
+
+
+def parse_upload(content_type: str, body: bytes) -> dict[str, bytes]:
+    """Files of a `multipart/form-data` or JSON (`{"files": {name: text}}`) body."""
+    if content_type.startswith("multipart/form-data"):
+        message = BytesParser(policy=HTTP).parsebytes(
+            b"Content-Type: " + content_type.encode("latin-1") + b"\r\n\r\n" + body
+        )
+        parts = [
+            (part.get_filename(), part.get_payload(decode=True) or b"")
+            for part in message.iter_parts()
+            if part.get_filename()
+        ]
+    elif content_type.startswith("application/json"):
+        try:
+            files = json.loads(body)["files"]
+            parts = [(name, text.encode("utf-8")) for name, text in files.items()]
+        except (ValueError, KeyError, TypeError, AttributeError) as e:
+            raise RequestError('JSON inválido: se espera {"files": {nombre: csv}}') from e
+    else:
+        raise RequestError(
+            f"Content-Type no soportado: {content_type or '-'} "
+            "(usa multipart/form-data o application/json)",
+            status=415,
+        )
+
+    files = {}
+    for name, content in parts:
+        # Solo el nombre: el filename del cliente no puede salir de la carpeta temporal
+        name = Path(name.replace("\\", "/")).name
+        if not name or name.startswith("."):
+            raise RequestError(f"Nombre de fichero inválido: {name!r}")
+        if name in files:
+            raise RequestError(f"Fichero duplicado: {name}")
+        files[name] = content
+    return files
+
+
+def _query_flag(value: str) -> bool:
+    return value.lower() in ("1", "true", "yes", "si", "sí")
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: PooledHTTPServer
+    server_version = "dec-renta"
+
+    def _send_json(self, status: int, payload: dict) -> None:
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _timed(self, endpoint: str, handle) -> None:
+        metrics = self.server.service.metrics
+        metrics.begin()
+        start = time.perf_counter()
+        status = 500
+        try:
+            status, payload = handle()
+        except RequestError as e:
+            status, payload = e.status, {"error": str(e)}
+        except Exception as e:
+            status, payload = 500, {"error": f"{type(e).__name__}: {e}"}
+        finally:
+            metrics.end(endpoint, status, time.perf_counter() - start)
+        self._send_json(status, payload)
+
+    def do_GET(self) -> None:
+        path = urlsplit(self.path).path
+        if path == "/health":
+            self._timed("health", lambda: (200, {"status": "ok"}))
+        elif path == "/metrics":
+            self._timed("metrics", self._metrics)
+        else:
+            self._send_json(404, {"error": f"Ruta desconocida: {path}"})
+
+    def do_POST(self) -> None:
+        path = urlsplit(self.path).path
+        if path == "/reports":
+            self._timed("reports", self._reports)
+        else:
+            self._send_json(404, {"error": f"Ruta desconocida: {path}"})
+
+    def _metrics(self) -> tuple[int, dict]:
+        server = self.server
+        return 200, {
+            **server.service.metrics.snapshot(),
+            "workers": server.workers,
+            "cache": server.service.state.summary(),
+        }
+
+    def _reports(self) -> tuple[int, dict]:
+        length = int(self.headers.get("Content-Length") or 0)
+        if length > self.server.max_upload_bytes:
+            raise RequestError(
+                f"Subida demasiado grande ({length} bytes, máximo "
+                f"{self.server.max_upload_bytes})",
+                status=413,
+            )
+        files = parse_upload(self.headers.get("Content-Type", ""), self.rfile.read(length))
+
+        query = {k: v[-1] for k, v in parse_qs(urlsplit(self.path).query).items()}
+        try:
+            year = int(query["year"]) if query.get("year") else None
+        except ValueError as e:
+            raise RequestError(f"Año inválido: {query['year']}") from e
+        forms = tuple(f for f in query.get("forms", ",".join(FORMS)).split(",") if f)
+        return 200, self.server.service.generate(
+            files, year=year, fifo=_query_flag(query.get("fifo", "")), forms=forms
+        )
+
+    def log_message(self, format: str, *args) -> None:
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+class PooledHTTPServer(HTTPServer):
+    """HTTP server that handles connections on a bounded pool of `workers` threads.
+
+    Connections waiting for a worker queue up to `max_queue`; beyond that
+    they are answered with 503 straight away instead of piling up. Health
+    and metrics requests share the pool with the reports.
+    """
+
+    daemon_threads = True
+
+    def __init__(
+        self,
+        address: tuple[str, int],
+        service: ReportService,
+        workers: int = 4,
+        max_queue: int = 64,
+        max_upload_bytes: int = MAX_UPLOAD_BYTES,
+        verbose: bool = False,
+    ):
+        super().__init__(address, _Handler)
+        self.service = service
+        self.workers = workers
+        self.max_queue = max_queue
+        self.max_upload_bytes = max_upload_bytes
+        self.verbose = verbose
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="dec-renta")
+        self._pending = 0
+        self._pending_lock = threading.Lock()
+
+    def process_request(self, request, client_address) -> None:
+        metrics = self.service.metrics
+        with self._pending_lock:
+            if self._pending >= self.workers + self.max_queue:
+                metrics.rejected += 1
+                reject = True
+            else:
+                self._pending += 1
+                metrics.queued = max(0, self._pending - self.workers)
+                reject = False
+        if reject:
+            try:
+                request.sendall(
+                    b"HTTP/1.0 503 Service Unavailable\r\n"
+                    b"Content-Length: 0\r\nRetry-After: 1\r\n\r\n"
+                )
+            finally:
+                self.shutdown_request(request)
+            return
+        self._pool.submit(self._process, request, client_address)
+
+    def _process(self, request, client_address) -> None:
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+            with self._pending_lock:
+                self._pending -= 1
+                self.service.metrics.queued = max(0, self._pending - self.workers)
+
+    def server_close(self) -> None:
+        super().server_close()
+        self._pool.shutdown(wait=True)
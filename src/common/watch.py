@@ -0,0 +1,190 @@
+from __future__ import annotations
+from dataclasses import dataclass, field
+from fnmatch import fnmatchcase
+from pathlib import Path
+from typing import Callable
+import os
+import threading
+import time
+
+from common.enrichment import MetadataProvider
+from common.pipeline import FORMS, form_outputs, resolve_all_inputs
+from common.processor import TaxReportEngine
+
+# Estado de un fichero para detectar cambios: (tamaño, mtime)
+Snapshot = dict[str, tuple[int, int]]
+
+
+def snapshot(data_dir: str | Path, extra: tuple[Path, ...] = ()) -> Snapshot:
+    """(size, mtime_ns) of the files directly in `data_dir` and of `extra`, by path."""
+    files = {}
+    with os.scandir(data_dir) as it:
+        for entry in it:
+            if entry.is_file():
+                st = entry.stat()
+                files[str(Path(data_dir) / entry.name)] = (st.st_size, st.st_mtime_ns)
+    for path in extra:
+        try:
+            st = path.stat()
+        except FileNotFoundError:
+            continue
+        files[str(path)] = (st.st_size, st.st_mtime_ns)
+    return files
+
+
+def changed_files(before: Snapshot, after: Snapshot) -> set[str]:
+    """Paths added, removed or modified between two snapshots."""
+    return {p for p in before.keys() | after.keys() if before.get(p) != after.get(p)}
+
+
+@dataclass(frozen=True)
+class WatchEvent:
+    """One regeneration: the files that triggered it and what it wrote."""
+
+    changed: tuple[str, ...]
+    forms: tuple[str, ...]
+    outputs: tuple[str, ...] = ()
+    seconds: float = 0.0
+    error: str = ""
+    skipped: dict[str, str] = field(default_factory=dict)
+
+
+class ReportWatcher:
+    """Regenerates the reports of a data directory whenever its files change.
+
+    One engine is kept between regenerations, so the FX fixings, the ticker
+    metadata and the parsed frames of unchanged files stay in memory; a
+    change only re-parses the files that changed and recomputes the forms
+    they feed (transactions/realized: Modelo 100, positions and
+    `ticker_metadata.csv`: Modelo 720). The directory is polled every
+    `interval` seconds and a burst of changes is handled once no file has
+    changed for `debounce` seconds. A failing regeneration (e.g. a CSV
+    still being written) is reported in its event and the watch goes on.
+    """
+
+    def __init__(
+        self,
+        data_dir: str | Path,
+        out_dir: str | Path,
+        year: int | None = None,
+        pattern_transactions: str = "Individual_*_Transactions_*.csv",
+        pattern_realized: str = "*_GainLoss_Realized_Details_*.csv",
+        pattern_positions: str = "Individual-Positions*.csv",
+        fifo: bool = False,
+        refresh_fx: bool = False,
+        interval: float = 0.2,
+        debounce: float = 0.3,
+        metadata_provider: MetadataProvider | None = None,
+        csv_backend: str | None = None,
+    ):
+        self.data_dir = Path(data_dir)
+        self.out_dir = Path(out_dir)
+        self.year = year
+        self.patterns = {
+            "modelo-100": (pattern_transactions, pattern_realized),
+            "modelo-720": (pattern_positions,),
+        }
+        self.fifo = fifo
+        self.refresh_fx = refresh_fx
+        self.interval = interval
+        self.debounce = debounce
+        self.metadata_provider = metadata_provider
+        self.csv_backend = csv_backend
+        self.engine: TaxReportEngine | None = None
+
+    def _engine(self, year: int) -> TaxReportEngine:
+        """The kept engine, or a new one if the tax year changed."""
+        if self.engine is None or self.engine.year != year:
+            self.engine = TaxReportEngine(
+                year=year,
+                out_dir=self.out_dir,
+                refresh_fx=self.refresh_fx,
+                metadata_provider=self.metadata_provider,
+                csv_backend=self.csv_backend,
+            )
+            # Solo la primera carga revalida el FX
+            self.refresh_fx = False
+        return self.engine
+
+    def _watched_extra(self) -> tuple[Path, ...]:
+        engine = self.engine
+        return (engine.metadata_path,) if engine is not None else ()
+
+    def affected_forms(self, changed: set[str]) -> tuple[str, ...]:
+        """Forms fed by any of the `changed` files."""
+        names = {Path(p).name for p in changed}
+        forms = {
+            form
+            for form, patterns in self.patterns.items()
+            for name in names
+            if any(fnmatchcase(name, pattern) for pattern in patterns)
+        }
+        if self.engine is not None and str(self.engine.metadata_path) in changed:
+            forms.add("modelo-720")
+        if "ticker_metadata.csv" in names:
+            forms.add("modelo-720")
+        return tuple(form for form in FORMS if form in forms)
+
+    def regenerate(self, changed: set[str] | None = None) -> WatchEvent:
+        """Regenerates the forms affected by `changed` (every form if None)."""
+        forms = FORMS if changed is None else self.affected_forms(changed)
+        changed_paths = tuple(sorted(changed or ()))
+        if not forms:
+            return WatchEvent(changed_paths, ())
+
+        start = time.perf_counter()
+        try:
+            inputs = resolve_all_inputs(
+                str(self.data_dir),
+                *self.patterns["modelo-100"],
+                *self.patterns["modelo-720"],
+                year=self.year,
+            )
+            engine = self._engine(inputs.year)
+            engine.forget_inputs(changed_paths)
+            if str(engine.metadata_path) in changed_paths:
+                engine.metadata_store.import_csv(engine.metadata_path)
+            outputs = engine.write_outputs(
+                form_outputs(engine, inputs, fifo=self.fifo, forms=forms)
+            )
+            return WatchEvent(
+                changed_paths,
+                forms,
+                outputs,
+                time.perf_counter() - start,
+                skipped=dict(inputs.skipped),
+            )
+        except Exception as e:
+            return WatchEvent(
+                changed_paths,
+                forms,
+                seconds=time.perf_counter() - start,
+                error=f"{type(e).__name__}: {e}",
+            )
+
+    def run(
+        self,
+        on_event: Callable[[WatchEvent], None] = lambda event: None,
+        stop: threading.Event | None = None,
+    ) -> None:
+        """Generates every form, then watches until `stop` is set (or forever)."""
+        stop = stop or threading.Event()
+        on_event(self.regenerate())
+        seen = snapshot(self.data_dir, self._watched_extra())
+        pending: set[str] = set()
+        last_change = 0.0
+
+        while not stop.wait(self.interval):
+            current = snapshot(self.data_dir, self._watched_extra())
+            changed = changed_files(seen, current)
+            seen = current
+            if changed:
+                pending |= changed
+                last_change = time.monotonic()
+                continue
+            # Ráfaga terminada: nada ha cambiado durante `debounce` segundos
+            if pending and time.monotonic() - last_change >= self.debounce:
+                event = self.regenerate(pending)
+                pending = set()
+                if event.forms:
+                    on_event(event)
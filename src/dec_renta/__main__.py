@@ -2,13 +2,30 @@ import typer
 
 from model_100.cli import app as renta_app
 from model_720.cli import app as modelo720_app
+from dec_renta.batch import app as batch_app
+from dec_renta.all_forms import app as all_app
+from dec_renta.fx import app as fx_app
+from dec_renta.catalog import app as catalog_app
+from dec_renta.watch import app as watch_app
+from dec_renta.serve import app as serve_app
+from dec_renta.isin import app as isin_app
+from dec_renta.harvest import app as harvest_app
 
 app = typer.Typer(
     add_completion=False,
+    rich_markup_mode=None,
     help="Herramientas fiscales (España): Declaracion Renta (Modelo 100) + modelo 720.",
 )
 app.add_typer(renta_app, name="modelo-100")
 app.add_typer(modelo720_app, name="modelo-720")
+app.add_typer(batch_app, name="batch")
+app.add_typer(all_app, name="all")
+app.add_typer(fx_app, name="fx")
+app.add_typer(catalog_app, name="catalog")
+app.add_typer(watch_app, name="watch")
+app.add_typer(serve_app, name="serve")
+app.add_typer(isin_app, name="isin")
+app.add_typer(harvest_app, name="harvest")
 
 if __name__ == "__main__":
     app()
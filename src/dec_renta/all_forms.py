@@ -0,0 +1,121 @@
+from __future__ import annotations
+
+from pathlib import Path
+import typer
+
+app = typer.Typer(
+    add_completion=False,
+    rich_markup_mode=None,
+    help="Genera el Modelo 100 y el 720 en una sola pasada sobre los mismos datos.",
+)
+
+
+@app.command("run")
+def run(
+    data_dir: Path = typer.Option(
+        Path("data"),
+        exists=True,
+        file_okay=False,
+        dir_okay=True,
+        help="Carpeta con los CSV de Schwab.",
+    ),
+    out_dir: Path = typer.Option(Path("out"), help="Carpeta de salida."),
+    year: int | None = typer.Option(
+        None, help="Año fiscal (si no se indica, se infiere del filename)."
+    ),
+    refresh_fx: bool = typer.Option(
+        False, "--refresh-fx", help="Forzar re-descarga del FX del BCE."
+    ),
+    currency: list[str] = typer.Option(
+        [],
+        "--currency",
+        help="Divisa del BCE que se carga además de las de los CSV (repetible).",
+    ),
+    metadata_max_age: float | None = typer.Option(
+        None,
+        "--metadata-max-age",
+        help="Vuelve a consultar los metadatos de tickers guardados hace más de N días.",
+    ),
+    parse_cache: bool = typer.Option(
+        False,
+        "--parse-cache/--no-parse-cache",
+        envvar="DEC_RENTA_PARSE_CACHE",
+        help="Reutiliza los CSV ya parseados (caché por hash del contenido).",
+    ),
+    catalog: bool = typer.Option(
+        False,
+        "--catalog/--no-catalog",
+        envvar="DEC_RENTA_CATALOG",
+        help="Busca los CSV en el índice persistente de ficheros (solo se relista la carpeta si ha cambiado).",
+    ),
+    fifo: bool = typer.Option(
+        False,
+        "--fifo",
+        help="Calcula también las plusvalías por lotes FIFO desde las transacciones y las concilia con el realized.",
+    ),
+    profile: bool = typer.Option(
+        False,
+        "--profile",
+        help="Guarda una traza JSON por etapa (tiempo, filas, caché, red, memoria) en out-dir.",
+    ),
+    chrome_trace: bool = typer.Option(
+        False,
+        "--chrome-trace",
+        help="Con --profile, guarda también la traza en formato Chrome (chrome://tracing).",
+    ),
+    pattern_transactions: str = typer.Option(
+        "Individual_*_Transactions_*.csv",
+        help="Patrón del CSV de transacciones/dividendos.",
+    ),
+    pattern_realized: str = typer.Option(
+        "*_GainLoss_Realized_Details_*.csv",
+        help="Patrón del CSV de plusvalías realizadas.",
+    ),
+    pattern_positions: str = typer.Option(
+        "Individual-Positions*.csv",
+        help="Patrón del CSV de posiciones a 31/12.",
+    ),
+):
+    """
+    Genera todos los modelos con datos en data-dir: cada CSV se parsea y el FX se carga una vez.
+    """
+    # pandas/requests se cargan solo al ejecutar (arranque rápido de --help)
+    from common.catalog import FileCatalog
+    from common.parse_cache import ParseCache
+    from common.pipeline import resolve_all_inputs, run_all_forms
+    from common.profiling import Profiler
+
+    profiler = Profiler() if profile else None
+    inputs = resolve_all_inputs(
+        data_dir=str(data_dir),
+        pattern_transactions=pattern_transactions,
+        pattern_realized=pattern_realized,
+        pattern_positions=pattern_positions,
+        year=year,
+        catalog=FileCatalog() if catalog else None,
+    )
+
+    result = run_all_forms(
+        inputs,
+        out_dir=out_dir,
+        refresh_fx=refresh_fx,
+        parse_cache=ParseCache() if parse_cache else None,
+        fifo=fifo,
+        profiler=profiler,
+        currencies=tuple(currency),
+        metadata_max_age=None if metadata_max_age is None else metadata_max_age * 86400,
+    )
+
+    for form, error in result.skipped.items():
+        typer.echo(f"{form} omitido: {error}", err=True)
+    for path in result.outputs:
+        typer.echo(path)
+    if profiler is not None:
+        for path in profiler.write(
+            out_dir,
+            f"profile_all_{inputs.year}",
+            chrome_trace=chrome_trace,
+            form="all",
+            year=inputs.year,
+        ):
+            typer.echo(path)
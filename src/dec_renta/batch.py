@@ -0,0 +1,95 @@
+from __future__ import annotations
+
+from pathlib import Path
+import typer
+
+app = typer.Typer(
+    add_completion=False,
+    rich_markup_mode=None,
+    help="Procesa en lote las carpetas de varios clientes (Modelo 100 + 720).",
+)
+
+
+@app.command("run")
+def run(
+    root: Path | None = typer.Option(
+        None,
+        exists=True,
+        file_okay=False,
+        dir_okay=True,
+        help="Carpeta con una subcarpeta de datos por cliente.",
+    ),
+    manifest: Path | None = typer.Option(
+        None,
+        exists=True,
+        file_okay=True,
+        dir_okay=False,
+        help="Fichero con una carpeta de cliente por línea (alternativa a --root).",
+    ),
+    out_dir: Path = typer.Option(
+        Path("out"), help="Carpeta de salida (una subcarpeta por cliente)."
+    ),
+    year: int | None = typer.Option(
+        None, help="Año fiscal (si no se indica, se infiere del filename)."
+    ),
+    refresh_fx: bool = typer.Option(
+        False, "--refresh-fx", help="Forzar re-descarga del FX del BCE."
+    ),
+    workers: int | None = typer.Option(
+        None, help="Número de procesos (por defecto, uno por CPU)."
+    ),
+    catalog: bool = typer.Option(
+        False,
+        "--catalog/--no-catalog",
+        envvar="DEC_RENTA_CATALOG",
+        help="Busca los CSV en el índice persistente de ficheros (solo se relista la carpeta si ha cambiado).",
+    ),
+    pattern_transactions: str = typer.Option(
+        "Individual_*_Transactions_*.csv",
+        help="Patrón del CSV de transacciones/dividendos.",
+    ),
+    pattern_realized: str = typer.Option(
+        "*_GainLoss_Realized_Details_*.csv",
+        help="Patrón del CSV de plusvalías realizadas.",
+    ),
+    pattern_positions: str = typer.Option(
+        "Individual-Positions*.csv",
+        help="Patrón del CSV de posiciones a 31/12.",
+    ),
+):
+    """
+    Genera los informes de cada cliente en paralelo y un resumen de estado por cliente.
+    """
+    if (root is None) == (manifest is None):
+        raise typer.BadParameter("Indica --root o --manifest (uno de los dos).")
+
+    # pandas/requests se cargan solo al ejecutar (arranque rápido de --help)
+    from common.batch import discover_clients, plan_client, read_manifest, run_batch
+    from common.catalog import FileCatalog
+
+    file_catalog = FileCatalog() if catalog else None
+    jobs = discover_clients(root, out_dir) if root else read_manifest(manifest, out_dir)
+    plans = [
+        plan_client(
+            job,
+            year=year,
+            pattern_transactions=pattern_transactions,
+            pattern_realized=pattern_realized,
+            pattern_positions=pattern_positions,
+            catalog=file_catalog,
+        )
+        for job in jobs
+    ]
+
+    status_path, status = run_batch(
+        plans, out_dir=out_dir, max_workers=workers, refresh_fx=refresh_fx
+    )
+
+    counts = status["status"].value_counts()
+    typer.echo(status_path)
+    typer.echo(
+        f"clientes={len(jobs)} ok={counts.get('ok', 0)} "
+        f"error={counts.get('error', 0)} omitido={counts.get('omitido', 0)}"
+    )
+    if counts.get("error", 0):
+        raise typer.Exit(code=1)
@@ -0,0 +1,40 @@
+from __future__ import annotations
+
+from pathlib import Path
+import typer
+
+app = typer.Typer(
+    add_completion=False,
+    rich_markup_mode=None,
+    help="Índice persistente de los CSV de las carpetas de datos.",
+)
+
+
+@app.command("latest")
+def latest(
+    kind: str = typer.Argument(..., help="Tipo de export: transactions, realized o positions."),
+    data_dir: Path = typer.Option(
+        Path("data"),
+        exists=True,
+        file_okay=False,
+        dir_okay=True,
+        help="Carpeta con los CSV de Schwab.",
+    ),
+    year: int | None = typer.Option(None, help="Año del export (en el filename)."),
+    account: str | None = typer.Option(
+        None, help="Últimos dígitos de la cuenta (p.ej. 147)."
+    ),
+):
+    """
+    Muestra el export más reciente de un tipo, año y cuenta según el índice.
+    """
+    # pandas se carga solo al ejecutar (arranque rápido de --help)
+    from common.catalog import EXPORT_KINDS, FileCatalog
+
+    if kind not in EXPORT_KINDS:
+        raise typer.BadParameter(f"Tipo desconocido: {kind} ({', '.join(EXPORT_KINDS)}).")
+    entry = FileCatalog().latest(data_dir, kind, year=year, account=account)
+    if entry is None:
+        typer.echo(f"No hay exports de {kind} en {data_dir}.", err=True)
+        raise typer.Exit(1)
+    typer.echo(f"{data_dir / entry.name}\t{entry.year}\t{entry.account}\t{entry.sha256}")
@@ -0,0 +1,50 @@
+from __future__ import annotations
+
+from datetime import date
+import typer
+
+app = typer.Typer(
+    add_completion=False,
+    rich_markup_mode=None,
+    help="Gestión de la caché local de tipos de cambio del BCE.",
+)
+
+
+@app.command("warm")
+def warm(
+    from_year: int = typer.Option(..., help="Primer año a descargar."),
+    to_year: int | None = typer.Option(
+        None, help="Último año a descargar (por defecto, el actual)."
+    ),
+    currency: list[str] | None = typer.Option(
+        None,
+        "--currency",
+        help="Divisa a descargar (repetible; por defecto USD).",
+    ),
+    refresh: bool = typer.Option(
+        False,
+        "--refresh",
+        help="Revalida los años ya descargados (solo se bajan si el BCE los ha cambiado).",
+    ),
+):
+    """
+    Descarga en paralelo los fixings que faltan en la caché para un rango de años.
+    """
+    # pandas/requests se cargan solo al ejecutar (arranque rápido de --help)
+    from common.fx import ECBExchangeService, FX_CURRENCIES
+
+    to_year = to_year or date.today().year
+    if to_year < from_year:
+        raise typer.BadParameter("--to-year no puede ser anterior a --from-year.")
+
+    service = ECBExchangeService(currencies=tuple(currency or FX_CURRENCIES))
+    start, end = date(from_year, 1, 1), min(date(to_year, 12, 31), date.today())
+    service.ensure_ranges(
+        [(date(year, 1, 1), date(year, 12, 31)) for year in range(from_year, to_year + 1)],
+        refresh=refresh,
+    )
+
+    table = service.store.table(start, end, service.currencies)
+    typer.echo(
+        f"{', '.join(table.currencies)}: {len(table.dates)} días con fixing ({start} a {end})"
+    )
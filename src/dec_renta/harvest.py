@@ -0,0 +1,121 @@
+from __future__ import annotations
+
+from datetime import datetime
+from pathlib import Path
+import typer
+
+app = typer.Typer(
+    add_completion=False,
+    rich_markup_mode=None,
+    help="Simula ventas de las posiciones abiertas para compensar las plusvalías del año.",
+)
+
+
+def _pairs(values: list[str], option: str) -> dict[str, float]:
+    """`KEY=VALUE` options as {KEY: float(VALUE)}."""
+    out = {}
+    for value in values:
+        key, sep, number = value.partition("=")
+        try:
+            if not sep or not key.strip():
+                raise ValueError
+            out[key.strip().upper()] = float(number)
+        except ValueError:
+            raise typer.BadParameter(f"{option} espera CLAVE=NÚMERO, no {value!r}") from None
+    return out
+
+
+@app.command("run")
+def run(
+    data_dir: Path = typer.Option(
+        Path("data"),
+        exists=True,
+        file_okay=False,
+        dir_okay=True,
+        help="Carpeta con los CSV de Schwab.",
+    ),
+    out_dir: Path = typer.Option(Path("out"), help="Carpeta de salida."),
+    year: int | None = typer.Option(
+        None, help="Año fiscal (si no se indica, se infiere del filename)."
+    ),
+    price: list[str] = typer.Option(
+        [], "--price", help="Precio de venta supuesto, SYMBOL=PRECIO (repetible)."
+    ),
+    fx: list[str] = typer.Option(
+        [], "--fx", help="Tipo de cambio supuesto, DIVISA=UNIDADES_POR_EUR (repetible)."
+    ),
+    sale_date: str | None = typer.Option(
+        None, help="Fecha de venta YYYY-MM-DD (por defecto hoy, o el 31/12 de años pasados)."
+    ),
+    target: float = typer.Option(
+        0.0, help="Ganancia neta del año buscada en EUR (0: compensar todo)."
+    ),
+    top: int = typer.Option(20, min=1, help="Escenarios que se guardan."),
+    max_scenarios: int = typer.Option(
+        200_000, min=1, help="Escenarios evaluados como máximo (si hay más combinaciones)."
+    ),
+    refresh_fx: bool = typer.Option(
+        False, "--refresh-fx", help="Forzar re-descarga del FX del BCE."
+    ),
+    currency: list[str] = typer.Option(
+        [],
+        "--currency",
+        help="Divisa del BCE que se carga además de las de los CSV (repetible).",
+    ),
+    pattern_transactions: str = typer.Option(
+        "Individual_*_Transactions_*.csv",
+        help="Patrón del CSV de transacciones (lotes FIFO).",
+    ),
+    pattern_realized: str = typer.Option(
+        "*_GainLoss_Realized_Details_*.csv",
+        help="Patrón del CSV de plusvalías realizadas.",
+    ),
+    pattern_positions: str = typer.Option(
+        "Individual-Positions*.csv",
+        help="Patrón del CSV de posiciones.",
+    ),
+):
+    """
+    Ordena combinaciones de ventas por la ganancia neta del año en EUR.
+    """
+    prices, rates = _pairs(price, "--price"), _pairs(fx, "--fx")
+    try:
+        when = datetime.strptime(sale_date, "%Y-%m-%d").date() if sale_date else None
+    except ValueError:
+        raise typer.BadParameter(f"--sale-date espera YYYY-MM-DD, no {sale_date!r}") from None
+
+    # pandas/requests se cargan solo al ejecutar (arranque rápido de --help)
+    from common.pipeline import resolve_all_inputs
+    from common.processor import TaxReportEngine
+
+    inputs = resolve_all_inputs(
+        data_dir=str(data_dir),
+        pattern_transactions=pattern_transactions,
+        pattern_realized=pattern_realized,
+        pattern_positions=pattern_positions,
+        year=year,
+    )
+    if inputs.inputs_720 is None:
+        typer.echo(f"Sin posiciones: {inputs.skipped['modelo-720']}", err=True)
+        raise typer.Exit(code=1)
+    inputs_100 = inputs.inputs_100
+
+    engine = TaxReportEngine(
+        year=inputs.year,
+        out_dir=out_dir,
+        refresh_fx=refresh_fx,
+        currencies=tuple(currency),
+    )
+    paths = engine.generate_harvest_report(
+        inputs.inputs_720.positions_csvs,
+        realized_csv=inputs_100.realized_csvs if inputs_100 else None,
+        transactions_csv=inputs_100.transactions_csvs if inputs_100 else None,
+        prices=prices,
+        fx=rates,
+        sale_date=when,
+        target_eur=target,
+        top=top,
+        max_scenarios=max_scenarios,
+    )
+    for path in paths:
+        typer.echo(path)
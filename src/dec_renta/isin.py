@@ -0,0 +1,69 @@
+from __future__ import annotations
+
+from pathlib import Path
+import typer
+
+app = typer.Typer(
+    add_completion=False,
+    rich_markup_mode=None,
+    help="Índice local (sin conexión) de ISIN y domicilio fiscal por ticker, CUSIP e ISIN.",
+)
+
+
+def _index_path(index: Path | None) -> Path:
+    from common.fx import FxConfig
+    from common.processor import default_isin_index_path
+
+    return index or default_isin_index_path(FxConfig().cache_dir)
+
+
+@app.command("build")
+def build(
+    dump: Path = typer.Argument(
+        ...,
+        exists=True,
+        dir_okay=False,
+        help="Volcado de referencia (CSV o JSON) con tickers, ISIN, direcciones y países.",
+    ),
+    index: Path | None = typer.Option(
+        None, help="Fichero del índice (por defecto, .cache/dec_renta/isin_index.bin)."
+    ),
+):
+    """
+    Compila el volcado en el índice que usa el Modelo 720 antes de recurrir a yfinance.
+    """
+    # pandas/requests se cargan solo al ejecutar (arranque rápido de --help)
+    from common.isin_index import compile_index
+
+    path = _index_path(index)
+    built = compile_index(dump, path)
+    typer.echo(f"{len(built)} valores indexados en {path} ({path.stat().st_size} bytes)")
+
+
+@app.command("lookup")
+def lookup(
+    values: list[str] = typer.Argument(..., help="Tickers, CUSIP o ISIN a buscar."),
+    by: str = typer.Option("ticker", help="Clave de búsqueda: ticker, cusip o isin."),
+    index: Path | None = typer.Option(
+        None, help="Fichero del índice (por defecto, .cache/dec_renta/isin_index.bin)."
+    ),
+):
+    """
+    Muestra los datos del índice de cada valor (sin conexión).
+    """
+    # pandas/requests se cargan solo al ejecutar (arranque rápido de --help)
+    from common.isin_index import IsinIndex
+
+    path = _index_path(index)
+    found = IsinIndex.open(path)
+    if found is None:
+        typer.echo(f"No hay índice en {path}: compílalo con `dec-renta isin build`", err=True)
+        raise typer.Exit(code=1)
+    try:
+        df = found.lookup(values, by=by)
+    except ValueError as e:
+        raise typer.BadParameter(str(e)) from e
+    if df.empty:
+        typer.echo("Ningún valor encontrado", err=True)
+        raise typer.Exit(code=1)
+    typer.echo(df.to_csv(index=False), nl=False)
@@ -0,0 +1,54 @@
+from __future__ import annotations
+
+import typer
+
+app = typer.Typer(
+    add_completion=False,
+    rich_markup_mode=None,
+    help="Servicio HTTP local que genera los modelos de CSV subidos, con FX y metadata en memoria.",
+)
+
+
+@app.command("run")
+def run(
+    host: str = typer.Option("127.0.0.1", help="Dirección en la que escuchar."),
+    port: int = typer.Option(8765, help="Puerto en el que escuchar."),
+    workers: int = typer.Option(
+        4, min=1, help="Peticiones atendidas a la vez (pool de hilos acotado)."
+    ),
+    max_queue: int = typer.Option(
+        64, min=0, help="Conexiones en espera de un worker antes de responder 503."
+    ),
+    max_upload_mb: int = typer.Option(
+        200, min=1, help="Tamaño máximo de una subida, en MiB."
+    ),
+    refresh_fx: bool = typer.Option(
+        False, "--refresh-fx", help="Forzar re-descarga del FX del BCE en la primera carga."
+    ),
+    fx_ttl: float = typer.Option(
+        3600.0, help="Segundos tras los que se recargan los fixings del año en curso."
+    ),
+    verbose: bool = typer.Option(False, "--verbose", help="Registra cada petición."),
+):
+    """
+    Sirve POST /reports (CSV de Schwab -> modelos 100 y 720), GET /metrics y GET /health (Ctrl+C para salir).
+    """
+    # pandas/requests se cargan solo al ejecutar (arranque rápido de --help)
+    from common.server import PooledHTTPServer, ReportService, WarmState
+
+    service = ReportService(WarmState(refresh_fx=refresh_fx, fx_ttl=fx_ttl))
+    server = PooledHTTPServer(
+        (host, port),
+        service,
+        workers=workers,
+        max_queue=max_queue,
+        max_upload_bytes=max_upload_mb * 2**20,
+        verbose=verbose,
+    )
+    typer.echo(f"Sirviendo en http://{host}:{server.server_port} ({workers} workers, Ctrl+C para salir)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
@@ -0,0 +1,88 @@
+from __future__ import annotations
+
+from pathlib import Path
+import time
+import typer
+
+app = typer.Typer(
+    add_completion=False,
+    rich_markup_mode=None,
+    help="Regenera los informes al cambiar los CSV, con FX, metadata y datos en memoria.",
+)
+
+
+@app.command("run")
+def run(
+    data_dir: Path = typer.Option(
+        Path("data"),
+        exists=True,
+        file_okay=False,
+        dir_okay=True,
+        help="Carpeta con los CSV de Schwab.",
+    ),
+    out_dir: Path = typer.Option(Path("out"), help="Carpeta de salida."),
+    year: int | None = typer.Option(
+        None, help="Año fiscal (si no se indica, se infiere del filename)."
+    ),
+    refresh_fx: bool = typer.Option(
+        False, "--refresh-fx", help="Forzar re-descarga del FX del BCE al arrancar."
+    ),
+    fifo: bool = typer.Option(
+        False,
+        "--fifo",
+        help="Calcula también las plusvalías por lotes FIFO desde las transacciones y las concilia con el realized.",
+    ),
+    interval: float = typer.Option(
+        0.2, help="Segundos entre comprobaciones de la carpeta."
+    ),
+    debounce: float = typer.Option(
+        0.3, help="Segundos sin cambios antes de regenerar (agrupa ráfagas de cambios)."
+    ),
+    pattern_transactions: str = typer.Option(
+        "Individual_*_Transactions_*.csv",
+        help="Patrón del CSV de transacciones/dividendos.",
+    ),
+    pattern_realized: str = typer.Option(
+        "*_GainLoss_Realized_Details_*.csv",
+        help="Patrón del CSV de plusvalías realizadas.",
+    ),
+    pattern_positions: str = typer.Option(
+        "Individual-Positions*.csv",
+        help="Patrón del CSV de posiciones a 31/12.",
+    ),
+):
+    """
+    Genera los modelos y los regenera cada vez que cambia un fichero de data-dir (Ctrl+C para salir).
+    """
+    # pandas/requests se cargan solo al ejecutar (arranque rápido de --help)
+    from common.watch import ReportWatcher, WatchEvent
+
+    def echo(event: WatchEvent) -> None:
+        stamp = time.strftime("%H:%M:%S")
+        forms = ", ".join(event.forms) or "-"
+        if event.error:
+            typer.echo(f"[{stamp}] {forms}: error: {event.error}", err=True)
+            return
+        typer.echo(f"[{stamp}] {forms} regenerado en {event.seconds * 1000:.0f} ms")
+        for form, error in event.skipped.items():
+            typer.echo(f"  {form} omitido: {error}", err=True)
+        for path in event.outputs:
+            typer.echo(f"  {path}")
+
+    watcher = ReportWatcher(
+        data_dir,
+        out_dir,
+        year=year,
+        pattern_transactions=pattern_transactions,
+        pattern_realized=pattern_realized,
+        pattern_positions=pattern_positions,
+        fifo=fifo,
+        refresh_fx=refresh_fx,
+        interval=interval,
+        debounce=debounce,
+    )
+    typer.echo(f"Vigilando {data_dir} (Ctrl+C para salir)")
+    try:
+        watcher.run(echo)
+    except KeyboardInterrupt:
+        pass
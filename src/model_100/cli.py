@@ -4,10 +4,10 @@ from pathlib import Path
 import typer
 
 from common.io import resolve_inputs
-from common.report import build_reports
 
 app = typer.Typer(
     add_completion=False,
+    rich_markup_mode=None,
     help="Generador de informes de renta para bolsa extranjera (Schwab)."
 )
 
@@ -28,6 +28,47 @@ def run(
     refresh_fx: bool = typer.Option(
         False, "--refresh-fx", help="Forzar re-descarga del FX del BCE."
     ),
+    currency: list[str] = typer.Option(
+        [],
+        "--currency",
+        help="Divisa del BCE que se carga además de las de los CSV (repetible).",
+    ),
+    parse_cache: bool = typer.Option(
+        False,
+        "--parse-cache/--no-parse-cache",
+        envvar="DEC_RENTA_PARSE_CACHE",
+        help="Reutiliza los CSV ya parseados (caché por hash del contenido).",
+    ),
+    incremental: bool = typer.Option(
+        False,
+        "--incremental",
+        help="Convierte y agrega solo las filas nuevas desde la última ejecución (checkpoint en out-dir; el CSV se lee entero).",
+    ),
+    chunksize: int | None = typer.Option(
+        None,
+        help="Procesa el CSV de transacciones en bloques de N filas (memoria acotada).",
+    ),
+    fifo: bool = typer.Option(
+        False,
+        "--fifo",
+        help="Calcula también las plusvalías por lotes FIFO desde las transacciones y las concilia con el realized.",
+    ),
+    catalog: bool = typer.Option(
+        False,
+        "--catalog/--no-catalog",
+        envvar="DEC_RENTA_CATALOG",
+        help="Busca los CSV en el índice persistente de ficheros (solo se relista la carpeta si ha cambiado).",
+    ),
+    profile: bool = typer.Option(
+        False,
+        "--profile",
+        help="Guarda una traza JSON por etapa (tiempo, filas, caché, red, memoria) en out-dir.",
+    ),
+    chrome_trace: bool = typer.Option(
+        False,
+        "--chrome-trace",
+        help="Con --profile, guarda también la traza en formato Chrome (chrome://tracing).",
+    ),
     pattern_transactions: str = typer.Option(
         "Individual_*_Transactions_*.csv",
         help="Patrón del CSV de transacciones/dividendos.",
@@ -37,20 +78,45 @@ def run(
         help="Patrón del CSV de plusvalías realizadas.",
     ),
 ):
+    """
+    Genera el resumen anual y los desgloses por símbolo, mes, país de origen y cuenta.
+    """
+    # pandas/requests se cargan solo al ejecutar (arranque rápido de --help)
+    from common.catalog import FileCatalog
+    from common.profiling import Profiler
+    from common.report import build_reports
+
+    profiler = Profiler() if profile else None
     inputs = resolve_inputs(
         data_dir=str(data_dir),
         pattern_transactions=pattern_transactions,
         pattern_realized=pattern_realized,
         year=year,
+        catalog=FileCatalog() if catalog else None,
     )
 
-    resumen_path, desglose_path = build_reports(
-        transactions_csv=str(inputs.transactions_csv),
-        realized_csv=str(inputs.realized_csv),
+    paths = build_reports(
+        transactions_csv=inputs.transactions_csvs,
+        realized_csv=inputs.realized_csvs,
         year=inputs.year,
         out_dir=str(out_dir),
         refresh_fx=refresh_fx,
+        parse_cache=parse_cache,
+        chunksize=chunksize,
+        incremental=incremental,
+        profiler=profiler,
+        fifo=fifo,
+        currencies=tuple(currency),
     )
 
-    typer.echo(resumen_path)
-    typer.echo(desglose_path)
+    for path in paths:
+        typer.echo(path)
+    if profiler is not None:
+        for path in profiler.write(
+            out_dir,
+            f"profile_modelo_100_{inputs.year}",
+            chrome_trace=chrome_trace,
+            form="modelo-100",
+            year=inputs.year,
+        ):
+            typer.echo(path)
@@ -26,4 +26,16 @@ NUMERIC_COLUMNS = [
     "Unadjusted Cost Basis", "Disallowed Loss", "Transaction Cost Basis",
     "Total Transaction Gain/Loss ($)", "LT Transaction Gain/Loss ($)",
     "ST Transaction Gain/Loss ($)"
-]
\ No newline at end of file
+]
+# Acciones del export de transacciones que abren, cierran o ajustan lotes (FIFO)
+BUY_ACTIONS = {
+    "Buy",
+    "Reinvest Shares"
+}
+SELL_ACTIONS = {
+    "Sell"
+}
+SPLIT_ACTIONS = {
+    "Stock Split",
+    "Reverse Split"
+}
@@ -4,10 +4,10 @@ from pathlib import Path
 import typer
 
 from common.io import resolve_positions_inputs
-from common.report import generate_report_720
 
 app = typer.Typer(
     add_completion=False,
+    rich_markup_mode=None,
     help="Asistente para preparar el Modelo 720 (bienes/valores en el extranjero).",
 )
 
@@ -23,6 +23,38 @@ def run(
     out_dir: Path = typer.Option(Path("out"), help="Carpeta de salida."),
     year: int | None = typer.Option(None, help="Año fiscal (si no se indica, se infiere del filename)."),
     refresh_fx: bool = typer.Option(False, "--refresh-fx", help="Forzar re-descarga del FX del BCE."),
+    currency: list[str] = typer.Option(
+        [],
+        "--currency",
+        help="Divisa del BCE que se carga además de las de los CSV (repetible).",
+    ),
+    metadata_max_age: float | None = typer.Option(
+        None,
+        "--metadata-max-age",
+        help="Vuelve a consultar los metadatos de tickers guardados hace más de N días.",
+    ),
+    parse_cache: bool = typer.Option(
+        False,
+        "--parse-cache/--no-parse-cache",
+        envvar="DEC_RENTA_PARSE_CACHE",
+        help="Reutiliza los CSV ya parseados (caché por hash del contenido).",
+    ),
+    catalog: bool = typer.Option(
+        False,
+        "--catalog/--no-catalog",
+        envvar="DEC_RENTA_CATALOG",
+        help="Busca los CSV en el índice persistente de ficheros (solo se relista la carpeta si ha cambiado).",
+    ),
+    profile: bool = typer.Option(
+        False,
+        "--profile",
+        help="Guarda una traza JSON por etapa (tiempo, filas, caché, red, memoria) en out-dir.",
+    ),
+    chrome_trace: bool = typer.Option(
+        False,
+        "--chrome-trace",
+        help="Con --profile, guarda también la traza en formato Chrome (chrome://tracing).",
+    ),
     pattern_positions: str = typer.Option(
         "Individual-Positions*.csv",
         help="Patrón del CSV de posiciones a 31/12 (ej: Schwab Positions export).",
@@ -31,17 +63,38 @@ def run(
     """
     Genera un borrador (CSV) para valores/acciones del Modelo 720, valorando a 31/12.
     """
+    # pandas/requests se cargan solo al ejecutar (arranque rápido de --help)
+    from common.catalog import FileCatalog
+    from common.profiling import Profiler
+    from common.report import generate_report_720
+
+    profiler = Profiler() if profile else None
     inputs = resolve_positions_inputs(
         data_dir=str(data_dir),
         pattern_positions=pattern_positions,
         year=year,
+        catalog=FileCatalog() if catalog else None,
     )
 
-    positions_path = generate_report_720(
-        positions_csv=str(inputs.positions_csv),
+    paths = generate_report_720(
+        positions_csv=inputs.positions_csvs,
         year=inputs.year,
         out_dir=str(out_dir),
         refresh_fx=refresh_fx,
+        parse_cache=parse_cache,
+        profiler=profiler,
+        currencies=tuple(currency),
+        metadata_max_age=None if metadata_max_age is None else metadata_max_age * 86400,
     )
 
-    typer.echo(positions_path)
+    for path in paths:
+        typer.echo(path)
+    if profiler is not None:
+        for path in profiler.write(
+            out_dir,
+            f"profile_modelo_720_{inputs.year}",
+            chrome_trace=chrome_trace,
+            form="modelo-720",
+            year=inputs.year,
+        ):
+            typer.echo(path)
@@ -0,0 +1,33 @@
+METADATA_COLUMNS = [
+    "Ticker",
+    "ISIN",
+    "Domicilio Fiscal",
+    "Poblacion",
+    "Pais Dom Fiscal"
+]
+REQUIRED_METADATA_COLUMNS = [
+    "ISIN",
+    "Domicilio Fiscal",
+    "Poblacion",
+    "Pais Dom Fiscal"
+]
+COUNTRY_CODES = {
+    "United States": "US",
+    "United States of America": "US",
+    "USA": "US",
+    "Ireland": "IE",
+    "Netherlands": "NL",
+    "Luxembourg": "LU",
+    "United Kingdom": "GB",
+    "Canada": "CA",
+    "Switzerland": "CH",
+    "Germany": "DE",
+    "France": "FR",
+    "Spain": "ES",
+    "Denmark": "DK",
+    "Bermuda": "BM",
+    "Cayman Islands": "KY",
+    "Israel": "IL",
+    "Japan": "JP",
+    "Taiwan": "TW",
+}
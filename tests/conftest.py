@@ -0,0 +1,45 @@
+from __future__ import annotations
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+from common.fx import RateTable
+from model_720.utils.dictionary import METADATA_COLUMNS
+
+
+def write_positions(path: Path, account: str, as_of: str, rows: list[tuple[str, int, float]]) -> Path:
+    """Schwab positions export of `account` with (ticker, qty, price) rows."""
+    lines = [
+        f'"Positions for account Individual ...{account} as of {as_of}"',
+        "",
+        '"Symbol","Description","Qty (Quantity)","Price","Mkt Val (Market Value)","Cost Basis"',
+    ]
+    for ticker, qty, price in rows:
+        lines.append(
+            f'"{ticker}","{ticker} INC","{qty}","${price:.2f}","${qty * price:,.2f}","${qty * price * 0.8:,.2f}"'
+        )
+    lines.append('"Account Total","--","--","--","$1.00","--"')
+    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+    return path
+
+
+@pytest.fixture
+def rates() -> RateTable:
+    """Flat USD fixings (1.10 per EUR) over the years the tests use."""
+    days = pd.date_range("2022-01-01", "2025-12-31", freq="D").date
+    return RateTable.from_series(pd.Series(1.10, index=days))
+
+
+@pytest.fixture
+def metadata() -> pd.DataFrame:
+    return pd.DataFrame(columns=METADATA_COLUMNS)
+
+
+def write_transactions(path: Path, rows: list[tuple[str, str, str, str]]) -> Path:
+    """Schwab transactions export with (date, action, symbol, amount) rows."""
+    lines = ['"Date","Action","Symbol","Description","Quantity","Price","Fees & Comm","Amount"']
+    for day, action, symbol, amount in rows:
+        lines.append(f'"{day}","{action}","{symbol}","{symbol} INC","","","","{amount}"')
+    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+    return path
@@ -0,0 +1,49 @@
+from __future__ import annotations
+
+import pandas as pd
+
+from common.cube import build_cube, dividend_sums
+from common.processor import TaxReportEngine
+from conftest import write_transactions
+
+
+def test_blank_amounts_are_skipped(tmp_path, rates):
+    tx = write_transactions(
+        tmp_path / "Individual_XXX147_Transactions_20241231-000000.csv",
+        [
+            ("03/15/2024", "Qualified Dividend", "AAPL", "$110.00"),
+            ("03/15/2024", "Foreign Tax Paid", "AAPL", ""),
+            ("04/15/2024", "Cash Dividend", "KO", ""),
+            ("06/15/2024", "Foreign Tax Paid", "KO", "-$11.00"),
+        ],
+    )
+    engine = TaxReportEngine(2024, tmp_path / "out", rates=rates)
+
+    dividends = engine.process_dividends(tx)
+    assert dividends.loc["AAPL", "dividend_gross_eur"] == 100.0
+    assert dividends.loc["AAPL", "foreign_tax_eur"] == 0.0
+    assert dividends.loc["KO", "dividend_gross_eur"] == 0.0
+    assert dividends.loc["KO", "foreign_tax_eur"] == -10.0
+
+
+def test_slices_match_a_groupby():
+    tx = pd.DataFrame(
+        {
+            "date": pd.to_datetime(["2024-01-10", "2024-01-20", "2024-02-10", "2024-02-10", "2024-03-01"]),
+            "Action": ["Qualified Dividend", "Foreign Tax Paid", "Cash Dividend", "Buy", "Qualified Dividend"],
+            "Symbol": ["AAPL", "AAPL", "KO", "KO", "AAPL"],
+            "currency": "USD",
+            "amount_cents": pd.array([1000, -150, 500, -9000, 2000], dtype="Int64"),
+            "amount_eur_cents": pd.array([900, -135, 450, -8100, 1800], dtype="Int64"),
+        }
+    )
+    cube = build_cube(tx)
+    assert len(cube) == 4  # la compra no entra
+
+    by_symbol = dividend_sums(cube)
+    assert by_symbol.loc["AAPL"].tolist() == [2700, -135, 2565]
+    assert by_symbol.loc["KO"].tolist() == [450, 0, 450]
+    by_month = dividend_sums(cube, "month")
+    assert by_month["dividend_gross_cents"].to_dict() == {1: 900, 2: 450, 3: 1800}
+    by_country = dividend_sums(cube, pd.Series({"AAPL": "US", "KO": "US"}, name="country"))
+    assert by_country.loc["US", "dividend_net_cents"] == 3015
@@ -0,0 +1,71 @@
+from __future__ import annotations
+import time
+
+from common.enrichment import MetadataEnricher, StaticProvider, TokenBucket
+
+DATA = {
+    "AAPL": {"ISIN": "US0378331005", "Pais Dom Fiscal": "US"},
+    "ASML": {"ISIN": "USN070592100", "Pais Dom Fiscal": "NL"},
+}
+
+
+def outcomes(report, ticker: str) -> list[str]:
+    return [c.outcome for c in sorted(report.calls, key=lambda c: c.attempt) if c.ticker == ticker]
+
+
+def test_failed_call_is_retried():
+    provider = StaticProvider(DATA, failures=1)
+    enricher = MetadataEnricher(provider, retries=2, backoff=0.0)
+
+    df, report = enricher.enrich(["AAPL", "ASML"])
+
+    assert df.set_index("Ticker").loc["AAPL", "ISIN"] == "US0378331005"
+    assert outcomes(report, "AAPL") == ["error", "ok"]
+    assert provider.calls == {"AAPL": 2, "ASML": 2}
+
+
+def test_failing_provider_is_given_up_after_the_retries():
+    provider = StaticProvider(DATA, failures=10)
+    enricher = MetadataEnricher(provider, retries=2, backoff=0.0)
+
+    df, report = enricher.enrich(["AAPL"])
+
+    # Sin datos tras 1 + 2 intentos: fila en blanco, sin excepción
+    assert df.loc[0, "Ticker"] == "AAPL" and df.loc[0, "ISIN"] == ""
+    assert outcomes(report, "AAPL") == ["error"] * 3
+    assert "ConnectionError" in report.calls[0].error
+    assert provider.calls["AAPL"] == 3
+
+
+def test_slow_calls_time_out():
+    provider = StaticProvider(DATA, latency=0.5)
+    enricher = MetadataEnricher(provider, retries=1, backoff=0.0, timeout=0.05)
+
+    start = time.perf_counter()
+    df, report = enricher.enrich(["AAPL"])
+
+    assert time.perf_counter() - start < 0.4
+    assert df.loc[0, "ISIN"] == ""
+    assert outcomes(report, "AAPL") == ["timeout", "timeout"]
+    assert report.summary().loc["static", "timeouts"] == 2
+
+
+def test_token_bucket_paces_calls():
+    bucket = TokenBucket(rate=50.0, capacity=1)
+    start = time.perf_counter()
+    for _ in range(11):
+        bucket.acquire()
+    # 1 token de ráfaga y 10 más a 50/s: al menos 0.2 s
+    assert time.perf_counter() - start >= 0.18
+
+
+def test_enricher_respects_the_rate_limit():
+    provider = StaticProvider({})
+    # 8 hilos, pero 5 llamadas/s: ráfaga de 5 y las 3 restantes cada 0.2 s
+    enricher = MetadataEnricher(provider, max_workers=8, rate_per_second=5.0)
+
+    start = time.perf_counter()
+    _, report = enricher.enrich([f"T{i}" for i in range(8)])
+
+    assert time.perf_counter() - start >= 0.55
+    assert len(report.calls) == 8 and sum(provider.calls.values()) == 8
@@ -0,0 +1,207 @@
+from __future__ import annotations
+from datetime import date, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from common.fx import RATE_EPOCH, ECBExchangeService, FxConfig
+from common.processor import TaxReportEngine
+from conftest import write_transactions
+
+ETAG = '"exr-v1"'
+
+
+class StubECB(BaseHTTPRequestHandler):
+    """csvdata answers of the ECB API, with an ETag and optional 503s and latency."""
+
+    failures = 0
+    latency = 0.0
+    requests: list[dict] = []
+    lock = threading.Lock()
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = {k: v[0] for k, v in parse_qs(url.query).items()}
+        with self.lock:
+            self.requests.append(
+                {
+                    "path": url.path,
+                    "etag": self.headers.get("If-None-Match"),
+                    "range": (query.get("startPeriod"), query.get("endPeriod")),
+                }
+            )
+            failing = len(self.requests) <= self.failures
+        time.sleep(self.latency)
+        if failing:
+            self.send_response(503)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        if self.headers.get("If-None-Match") == ETAG:
+            self.send_response(304)
+            self.end_headers()
+            return
+        # /EXR/D.USD+GBP.EUR.SP00.A
+        currencies = url.path.split("/")[-1].split(".")[1].split("+")
+        body = self._csv(currencies, query["startPeriod"], query["endPeriod"]).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/csv")
+        self.send_header("ETag", ETAG)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    @staticmethod
+    def _csv(currencies: list[str], start: str, end: str) -> str:
+        day, last = date.fromisoformat(start), date.fromisoformat(end)
+        lines = ["KEY,CURRENCY,TIME_PERIOD,OBS_VALUE"]
+        while day <= last:
+            if day.weekday() < 5:
+                lines += [f"EXR.D.{c}.EUR.SP00.A,{c},{day.isoformat()},1.10" for c in currencies]
+            day += timedelta(days=1)
+        return "\n".join(lines) + "\n"
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def ecb(monkeypatch):
+    StubECB.failures, StubECB.latency, StubECB.requests = 0, 0.0, []
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubECB)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    monkeypatch.setenv("DEC_RENTA_ECB_URL", f"http://127.0.0.1:{server.server_port}")
+    yield StubECB
+    server.shutdown()
+    server.server_close()
+
+
+def service(cache_dir) -> ECBExchangeService:
+    return ECBExchangeService(FxConfig(cache_dir=cache_dir), currencies=("USD",))
+
+
+def test_unchanged_series_is_revalidated_without_rewriting_the_store(ecb, tmp_path):
+    fx = service(tmp_path)
+    assert fx.get_rate(date(2023, 3, 10)) == 1.10
+    store = tmp_path / "fx_per_eur.npy"
+    written = store.stat().st_mtime_ns
+
+    # --refresh-fx: petición condicional con el ETag guardado, el BCE responde 304
+    assert service(tmp_path).get_rate(date(2023, 3, 10), refresh=True) == 1.10
+
+    assert [r["etag"] for r in ecb.requests] == [None, ETAG]
+    assert ecb.requests[0]["path"] == "/EXR/D.USD.EUR.SP00.A"
+    assert store.stat().st_mtime_ns == written
+
+
+def test_server_errors_are_retried(ecb, tmp_path):
+    ecb.failures = 2
+
+    assert service(tmp_path).get_rate(date(2023, 3, 10)) == 1.10
+    assert len(ecb.requests) == 3
+
+
+def test_concurrent_callers_share_one_download(ecb, tmp_path):
+    ecb.latency = 0.2
+    results = []
+
+    def fetch():
+        results.append(service(tmp_path).get_rate(date(2023, 3, 10)))
+
+    threads = [threading.Thread(target=fetch) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results == [1.10] * 4
+    assert len(ecb.requests) == 1
+
+
+def test_url_override_is_read_when_the_service_is_created(ecb, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+
+    assert ECBExchangeService(currencies=("USD",)).get_rate(date(2023, 3, 10)) == 1.10
+    assert len(ecb.requests) == 1
+
+
+def test_engine_fetches_only_the_currencies_of_its_inputs(ecb, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    tx = write_transactions(
+        tmp_path / "tx.csv", [("03/10/2023", "Qualified Dividend", "AAPL", "$11.00")]
+    )
+
+    dividends = TaxReportEngine(year=2023, out_dir=tmp_path / "out").process_dividends(str(tx))
+
+    assert dividends.loc["AAPL", "dividend_gross_eur"] == 10.0
+    assert {r["path"] for r in ecb.requests} == {"/EXR/D.USD.EUR.SP00.A"}
+
+
+def test_currencies_of_later_inputs_and_extra_ones_are_fetched(ecb, tmp_path, monkeypatch, rates):
+    monkeypatch.chdir(tmp_path)
+    tx = tmp_path / "tx.csv"
+    tx.write_text(
+        '"Date","Action","Symbol","Description","Quantity","Price","Fees & Comm","Amount","Currency"\n'
+        '"03/10/2023","Qualified Dividend","SHEL","SHEL PLC","","","","11.00","GBP"\n',
+        encoding="utf-8",
+    )
+    # Tabla USD compartida (como en batch/serve): la de GBP se carga al leer el CSV
+    engine = TaxReportEngine(year=2023, out_dir=tmp_path / "out", rates=rates, currencies=("CHF",))
+
+    dividends = engine.process_dividends(str(tx))
+
+    assert dividends.loc["SHEL", "dividend_gross_eur"] == 10.0
+    assert {r["path"] for r in ecb.requests} == {"/EXR/D.CHF+GBP.EUR.SP00.A"}
+    assert engine.fx_currencies == ("CHF", "GBP")
+
+
+def test_only_the_missing_days_are_fetched(ecb, tmp_path):
+    fx = service(tmp_path)
+    fx.get_rates(date(2023, 3, 1), date(2023, 3, 31))
+    fx.get_rates(date(2023, 3, 15), date(2023, 4, 30))
+    fx.get_rates(date(2023, 3, 20), date(2023, 4, 10))
+
+    # 10 días antes del rango para el forward-fill; luego solo abril
+    assert [r["range"] for r in ecb.requests] == [
+        ("2023-02-19", "2023-03-31"),
+        ("2023-04-01", "2023-04-30"),
+    ]
+
+
+def test_ranges_are_split_at_year_ends_and_cover_days_without_fixing(ecb, tmp_path):
+    fx = service(tmp_path)
+    rates = fx.get_rates(date(2022, 12, 20), date(2023, 1, 10))
+
+    assert sorted(r["range"] for r in ecb.requests) == [
+        ("2022-12-10", "2022-12-31"),
+        ("2023-01-01", "2023-01-10"),
+    ]
+    # Fin de semana y festivo: sin fixing, pero descargados (no se vuelven a pedir)
+    assert fx.store.missing_ranges(date(2022, 12, 10), date(2023, 1, 10)) == []
+    assert rates[date(2023, 1, 1)] == 1.10
+    assert service(tmp_path).get_rate(date(2022, 12, 31)) == 1.10
+    assert len(ecb.requests) == 2
+
+
+def test_usd_only_store_of_older_versions_is_reused(ecb, tmp_path):
+    legacy = np.zeros(
+        date(2024, 1, 1).toordinal() - RATE_EPOCH.toordinal(),
+        dtype=[("usd_per_eur", "<f8"), ("covered", "?")],
+    )
+    legacy["usd_per_eur"] = np.nan
+    days = slice(date(2023, 1, 1).toordinal() - RATE_EPOCH.toordinal(), len(legacy))
+    legacy["usd_per_eur"][days] = 1.2
+    legacy["covered"][days] = True
+    np.save(tmp_path / "fx_usd_per_eur.npy", legacy)
+
+    fx = service(tmp_path)
+    assert fx.get_rate(date(2023, 6, 30)) == 1.2
+    assert ecb.requests == []
+    # Lo que falta se descarga y se guarda en el store nuevo, con lo antiguo
+    assert fx.get_rate(date(2024, 1, 15)) == 1.10
+    assert [r["range"] for r in ecb.requests] == [("2024-01-05", "2024-01-15")]
+    assert service(tmp_path).get_rate(date(2023, 6, 30)) == 1.2
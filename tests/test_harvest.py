@@ -0,0 +1,25 @@
+from __future__ import annotations
+from datetime import date
+
+import pandas as pd
+
+from common.harvest import sale_options
+
+
+def test_loss_is_partially_deferred_while_a_recent_lot_is_kept():
+    lots = pd.DataFrame(
+        {
+            "Symbol": ["XYZ", "XYZ", "XYZ"],
+            "open_date": pd.to_datetime(["2025-01-10", "2025-03-03", "2025-12-01"]),
+            "quantity": [10.0, 10.0, 5.0],
+            "cost_eur_cents": [100_000, 100_000, 25_000],
+        }
+    )
+
+    options = sale_options(lots, pd.Series({"XYZ": 5_000.0}), date(2025, 12, 20))
+
+    # k lotes más antiguos vendidos; el de diciembre es una recompra de los dos meses anteriores
+    assert options.gain_cents[0].tolist() == [0, -50_000, -100_000, -100_000]
+    # Quedan 5 acciones recientes: difieren la pérdida de 5 de las 10 / 20 vendidas
+    assert options.deferred_cents[0].tolist() == [0, 25_000, 25_000, 0]
+    assert options.deductible_cents[0].tolist() == [0, -25_000, -75_000, -100_000]
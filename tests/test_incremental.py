@@ -0,0 +1,46 @@
+from __future__ import annotations
+
+from common.processor import TaxReportEngine
+from conftest import write_transactions
+
+# Schwab lista primero lo más reciente
+FIRST = [
+    ("03/15/2024", "Qualified Dividend", "AAPL", "$110.00"),
+    ("02/15/2024", "Qualified Dividend", "KO", "$55.00"),
+    ("01/15/2024", "Qualified Dividend", "AAPL", "$110.00"),
+]
+NEWER = [("04/15/2024", "Qualified Dividend", "KO", "$220.00")]
+
+
+def run(tmp_path, rows, rates, metadata):
+    """Dividends in EUR of an incremental run over `rows`, and how it was computed."""
+    tx = write_transactions(tmp_path / "Individual_XXX147_Transactions_2024.csv", rows)
+    engine = TaxReportEngine(
+        2024, tmp_path / "out", rates=rates, metadata=metadata, incremental=True
+    )
+    dividends = engine.process_dividends(str(tx))["dividend_gross_eur"].to_dict()
+    return dividends, engine.incremental_status["dividend_cube"]
+
+
+def test_unchanged_export_reuses_the_checkpoint(tmp_path, rates, metadata):
+    first, status = run(tmp_path, FIRST, rates, metadata)
+    assert (first, status) == ({"AAPL": 200.0, "KO": 50.0}, "completo")
+
+    assert run(tmp_path, FIRST, rates, metadata) == (first, "incremental")
+
+
+def test_appended_rows_are_added_to_the_checkpoint(tmp_path, rates, metadata):
+    run(tmp_path, FIRST, rates, metadata)
+
+    dividends, status = run(tmp_path, NEWER + FIRST, rates, metadata)
+    assert status == "incremental"
+    assert dividends == {"AAPL": 200.0, "KO": 250.0}
+
+
+def test_rewritten_history_is_recomputed(tmp_path, rates, metadata):
+    run(tmp_path, FIRST, rates, metadata)
+    rewritten = FIRST[:2] + [("01/15/2024", "Qualified Dividend", "AAPL", "$220.00")]
+
+    dividends, status = run(tmp_path, NEWER + rewritten, rates, metadata)
+    assert status == "completo"
+    assert dividends == {"AAPL": 300.0, "KO": 250.0}
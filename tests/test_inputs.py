@@ -0,0 +1,66 @@
+from __future__ import annotations
+
+from common.io import resolve_inputs, resolve_positions_inputs
+from common.processor import TaxReportEngine
+from conftest import write_positions, write_transactions
+
+HOLDINGS = [("AAPL", 10, 100.0), ("MSFT", 5, 200.0), ("KO", 20, 50.0)]
+
+
+def test_positions_of_other_years_are_left_out(tmp_path, rates, metadata):
+    write_positions(tmp_path / "Individual-Positions-2023-12-31-120000.csv", "147", "12/31/2023", HOLDINGS)
+    current = write_positions(
+        tmp_path / "Individual-Positions-2024-12-31-120000.csv", "147", "12/31/2024", HOLDINGS
+    )
+
+    inputs = resolve_positions_inputs(str(tmp_path), year=2024)
+    assert inputs.positions_csvs == (current,)
+    # Sin --year: el año del export más reciente, no un error por años distintos
+    assert resolve_positions_inputs(str(tmp_path)) == inputs
+
+    engine = TaxReportEngine(2024, tmp_path / "out", rates=rates, metadata=metadata)
+    (modelo_720,) = engine.report_720_outputs(inputs.positions_csvs).values()
+    assert len(modelo_720) == len(HOLDINGS)
+
+
+def test_year_is_the_latest_of_any_account(tmp_path):
+    row = [("03/10/2025", "Qualified Dividend", "AAPL", "$1.00")]
+    tx_147 = write_transactions(tmp_path / "Individual_XXX147_Transactions_20251227-143642.csv", row)
+    write_transactions(tmp_path / "Individual_XXX999_Transactions_20241230-101010.csv", row)
+    rg_147 = write_transactions(tmp_path / "XXXX147_GainLoss_Realized_Details_20251227-093447.csv", row)
+
+    # El último por nombre es la cuenta 999 (2024), pero el export más reciente es de 2025
+    inputs = resolve_inputs(str(tmp_path))
+    assert inputs.year == 2025
+    assert inputs.transactions_csvs == (tx_147,)
+    assert inputs.realized_csvs == (rg_147,)
+
+
+def test_newest_snapshot_per_account(tmp_path):
+    write_positions(tmp_path / "Individual-Positions-2024-12-30-120000.csv", "147", "12/30/2024", HOLDINGS)
+    newest = write_positions(
+        tmp_path / "Individual-Positions-2024-12-31-120000.csv", "147", "12/31/2024", HOLDINGS
+    )
+    other = write_positions(
+        tmp_path / "Individual-Positions-2024-12-31-130000.csv", "555", "12/31/2024", HOLDINGS
+    )
+
+    assert resolve_positions_inputs(str(tmp_path)).positions_csvs == (newest, other)
+
+
+def test_cuenta_column_only_with_several_accounts(tmp_path, rates, metadata):
+    same = [
+        write_positions(tmp_path / f"Individual-Positions-2024-12-31-12000{i}.csv", "147", "12/31/2024", HOLDINGS)
+        for i in range(2)
+    ]
+    engine = TaxReportEngine(2024, tmp_path / "out", rates=rates, metadata=metadata)
+    (modelo_720,) = engine.report_720_outputs(same).values()
+    assert "Cuenta" not in modelo_720.columns
+    assert len(modelo_720) == len(HOLDINGS)
+
+    other = write_positions(
+        tmp_path / "Individual-Positions-2024-12-31-130000.csv", "555", "12/31/2024", HOLDINGS
+    )
+    outputs = engine.report_720_outputs([same[0], other])
+    by_account = outputs[tmp_path / "out" / "modelo_720_cuenta_2024.csv"]
+    assert "Cuenta" in by_account.columns
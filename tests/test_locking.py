@@ -0,0 +1,48 @@
+from __future__ import annotations
+import threading
+
+from common.locking import FileLock
+
+
+def test_nested_locks_of_the_same_file_in_one_thread(tmp_path):
+    path = tmp_path / "store.lock"
+    done = threading.Event()
+
+    def nested():
+        # Dos instancias del mismo fichero: el segundo flock no debe esperar al primero
+        with FileLock(path), FileLock(path):
+            pass
+        done.set()
+
+    thread = threading.Thread(target=nested, daemon=True)
+    thread.start()
+    thread.join(timeout=5)
+
+    assert done.is_set()
+    # Liberado del todo: otro hilo lo toma sin esperar
+    taken = threading.Event()
+
+    def other():
+        with FileLock(path):
+            taken.set()
+
+    threading.Thread(target=other, daemon=True).start()
+    assert taken.wait(timeout=5)
+
+
+def test_other_threads_wait_for_the_holder(tmp_path):
+    path = tmp_path / "store.lock"
+    order = []
+
+    def contender():
+        with FileLock(path):
+            order.append("contender")
+
+    with FileLock(path):
+        thread = threading.Thread(target=contender)
+        thread.start()
+        thread.join(timeout=0.2)
+        order.append("holder")
+    thread.join(timeout=5)
+
+    assert order == ["holder", "contender"]
@@ -0,0 +1,89 @@
+from __future__ import annotations
+
+import pandas as pd
+
+from common.lots import TRADE_COLUMNS, match_fifo, reconcile
+
+
+def trades(*rows: tuple[str, str, str, float, int]) -> pd.DataFrame:
+    """Trades (symbol, date, kind, quantity, cents), already in date order."""
+    df = pd.DataFrame(rows, columns=["Symbol", "date", "kind", "quantity", "amount_cents"])
+    df["date"] = pd.to_datetime(df["date"])
+    df["currency"] = "USD"
+    df["seq"] = range(len(df))
+    return df[TRADE_COLUMNS]
+
+
+def test_partial_sale_across_lots():
+    match = match_fifo(
+        trades(
+            ("AAA", "2024-01-02", "buy", 10, 1_000),
+            ("AAA", "2024-02-01", "buy", 10, 2_000),
+            ("AAA", "2024-03-01", "sell", 15, 3_000),
+        )
+    )
+
+    closed = match.closed
+    assert closed["open_date"].dt.strftime("%Y-%m-%d").tolist() == ["2024-01-02", "2024-02-01"]
+    assert closed["quantity"].tolist() == [10, 5]
+    assert closed["cost_usd_cents"].tolist() == [1_000, 1_000]
+    assert closed["proceeds_usd_cents"].tolist() == [2_000, 1_000]
+    # Del segundo lote quedan 5 acciones con la mitad de su coste
+    assert match.open[["quantity", "cost_usd_cents"]].values.tolist() == [[5, 1_000]]
+    assert match.unmatched.empty
+
+
+def test_sell_before_any_buy_comes_from_an_opening_lot():
+    match = match_fifo(
+        trades(
+            ("AAA", "2024-01-10", "sell", 5, 500),
+            ("AAA", "2024-02-01", "buy", 10, 1_000),
+        )
+    )
+
+    assert match.closed.empty
+    assert match.unmatched[["quantity", "proceeds_usd_cents"]].values.tolist() == [[5, 500]]
+    assert match.open["open_date"].dt.strftime("%Y-%m-%d").tolist() == ["2024-02-01"]
+    assert match.open[["quantity", "cost_usd_cents"]].values.tolist() == [[10, 1_000]]
+
+
+def test_split_between_buy_and_sell():
+    match = match_fifo(
+        trades(
+            ("AAA", "2024-01-02", "buy", 10, 1_000),
+            # 2 por 1: el split llega como delta de acciones
+            ("AAA", "2024-02-01", "split", 10, 0),
+            ("AAA", "2024-03-01", "sell", 20, 3_000),
+        )
+    )
+
+    assert match.closed[["quantity", "cost_usd_cents", "proceeds_usd_cents"]].values.tolist() == [
+        [20, 1_000, 3_000]
+    ]
+    assert match.open.empty and match.unmatched.empty
+
+
+def test_reconcile_flags_symbols_that_differ_from_the_realized_export():
+    closed = match_fifo(
+        trades(
+            ("AAA", "2024-01-02", "buy", 10, 1_000),
+            ("AAA", "2024-03-01", "sell", 10, 3_000),
+            ("BBB", "2024-01-02", "buy", 4, 400),
+            ("BBB", "2024-03-01", "sell", 4, 800),
+        )
+    ).closed
+    realized = pd.DataFrame(
+        {
+            "Symbol": ["AAA", "BBB", "CCC"],
+            "Quantity": ["10", "4", "1"],
+            "proceeds_cents": [3_000, 800, 100],
+            "cost_basis_cents": [1_000, 450, 90],
+        }
+    )
+
+    report = reconcile(closed, realized)
+
+    assert report["status"].to_dict() == {"AAA": "ok", "BBB": "diferencia", "CCC": "diferencia"}
+    assert report.loc["BBB", "cost_usd_cents_diff"] == -50
+    # Sin lotes FIFO: todo lo del export es diferencia
+    assert report.loc["CCC", "quantity_diff"] == -1
@@ -0,0 +1,82 @@
+from __future__ import annotations
+import threading
+
+import pandas as pd
+
+from common.enrichment import StaticProvider
+from common.metadata_store import TickerMetadataStore
+from common.processor import TaxReportEngine
+
+AAPL = {
+    "ISIN": "US0378331005",
+    "Domicilio Fiscal": "ONE APPLE PARK WAY",
+    "Poblacion": "CUPERTINO",
+    "Pais Dom Fiscal": "US",
+}
+
+
+def age(store: TickerMetadataStore, ticker: str, seconds: float) -> None:
+    """Moves the update stamp of the ISIN of `ticker` `seconds` into the past."""
+    with store.conn:
+        store.conn.execute(
+            "UPDATE ticker_metadata SET isin_updated_at = isin_updated_at - ? WHERE ticker = ?",
+            (seconds, ticker),
+        )
+
+
+def test_stale_fields_are_missing_only_with_a_max_age(tmp_path):
+    store = TickerMetadataStore(tmp_path / "ticker_metadata.sqlite")
+    store.upsert(pd.DataFrame([{"Ticker": "AAPL", **AAPL}]), source="test")
+    age(store, "AAPL", 7200)
+
+    assert store.missing(["AAPL"]) == []
+    assert store.missing(["AAPL"], max_age=3600) == ["AAPL"]
+    assert store.missing(["AAPL"], max_age=10_000) == []
+
+
+def test_engine_fetches_again_the_stale_tickers(tmp_path, monkeypatch, rates):
+    monkeypatch.chdir(tmp_path)
+    provider = StaticProvider({"AAPL": AAPL})
+
+    def engine(max_age=None):
+        engine = TaxReportEngine(
+            2024,
+            tmp_path / "out",
+            rates=rates,
+            metadata_provider=provider,
+            metadata_max_age=max_age,
+        )
+        engine.metadata_path = tmp_path / "ticker_metadata.csv"
+        return engine
+
+    engine().ticker_metadata(["AAPL"])
+    age(engine().metadata_store, "AAPL", 7200)
+    engine().ticker_metadata(["AAPL"])
+    assert provider.calls == {"AAPL": 1}
+
+    metadata = engine(max_age=3600).ticker_metadata(["AAPL"])
+    assert provider.calls == {"AAPL": 2}
+    assert metadata.set_index("Ticker").loc["AAPL", "ISIN"] == AAPL["ISIN"]
+
+
+def test_connection_is_shared_by_threads(tmp_path):
+    store = TickerMetadataStore(tmp_path / "ticker_metadata.sqlite")
+    errors = []
+
+    def work(i: int):
+        try:
+            for j in range(20):
+                ticker = f"T{i}_{j}"
+                store.upsert(pd.DataFrame([{"Ticker": ticker, **AAPL}]), source="test")
+                assert store.missing([ticker]) == []
+        except Exception as e:  # noqa: BLE001 - se comprueba en el hilo principal
+            errors.append(e)
+
+    threads = [threading.Thread(target=work, args=(i,)) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert store.missing([f"T{i}_19" for i in range(8)]) == []
@@ -0,0 +1,94 @@
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from common.money import Rounding, add_sums, convert, div_round, parse_cents, scale_rate
+
+# Mitades y restos pasados el céntimo: "1.005" es 100,5 céntimos
+HALVES = ["1.005", "-1.005", "1.015", "0.0051"]
+
+
+@pytest.mark.parametrize(
+    "rounding, expected",
+    [
+        (Rounding.HALF_UP, [101, -101, 102, 1]),
+        (Rounding.HALF_EVEN, [100, -100, 102, 1]),
+        (Rounding.DOWN, [100, -100, 101, 0]),
+        (Rounding.UP, [101, -101, 102, 1]),
+        (Rounding.FLOOR, [100, -101, 101, 0]),
+        (Rounding.CEILING, [101, -100, 102, 1]),
+    ],
+)
+def test_digits_past_the_cent_are_rounded(rounding, expected):
+    assert parse_cents(pd.Series(HALVES), rounding).tolist() == expected
+
+
+def test_schwab_amounts():
+    amounts = pd.Series(
+        [
+            "$1,234.56",
+            "-$1,234.56",
+            "($1.00)",
+            "$1,234,567.89",
+            "1,234.5",
+            "$0.07",
+            "12345678901234.567",
+        ]
+    )
+    assert parse_cents(amounts, Rounding.HALF_UP).tolist() == [
+        123456,
+        -123456,
+        -100,
+        123456789,
+        123450,
+        7,
+        # Fuera del rango exacto en float: se lee dígito a dígito
+        1234567890123457,
+    ]
+
+
+def test_blank_and_unreadable_amounts_are_na():
+    cents = parse_cents(pd.Series(["", None, "  ", "abc", "$--", "$5.00"]), Rounding.HALF_UP)
+    assert str(cents.dtype) == "Int64"
+    assert cents.isna().tolist() == [True] * 5 + [False]
+    assert cents.iloc[-1] == 500
+
+
+def test_div_round_rounds_halves_by_mode():
+    num, den = np.array([5, -5, 7, -7]), np.array([2, 2, 2, 2])
+    assert div_round(num, den, Rounding.HALF_UP).tolist() == [3, -3, 4, -4]
+    assert div_round(num, den, Rounding.HALF_EVEN).tolist() == [2, -2, 4, -4]
+    assert div_round(num, den, Rounding.FLOOR).tolist() == [2, -3, 3, -4]
+    assert div_round(np.array([5]), np.array([-2]), Rounding.HALF_UP).tolist() == [-3]
+    with pytest.raises(ValueError):
+        div_round(np.array([1]), np.array([0]), Rounding.HALF_UP)
+
+
+def test_rates_are_scaled_exactly():
+    assert scale_rate(1.0834).tolist() == [1_083_400]
+    assert scale_rate(pd.Series([0.85912, 161.45])).tolist() == [859_120, 161_450_000]
+    with pytest.raises(ValueError):
+        scale_rate(np.array([1.1, np.nan]))
+
+
+def test_convert_rounds_each_amount_once():
+    cents = pd.Series([110, -110, None, 1, 2, 5], dtype="Int64")
+    per_eur = scale_rate(np.array([1.10, 1.10, 1.10, 3.0, 3.0, 2.0]))
+
+    eur = convert(cents, per_eur, Rounding.HALF_UP)
+    assert eur.isna().tolist() == [False, False, True, False, False, False]
+    assert eur.dropna().tolist() == [100, -100, 0, 1, 3]
+    assert convert(cents, per_eur, Rounding.HALF_EVEN).iloc[-1] == 2
+    # Un único tipo para todos los importes
+    assert convert(pd.Series([220]), scale_rate(1.10), Rounding.HALF_UP).tolist() == [200]
+
+
+def test_add_sums_keeps_int64_cents():
+    left = pd.DataFrame({"cents": [100, 200]}, index=["AAPL", "KO"])
+    right = pd.DataFrame({"cents": [5]}, index=["KO"]).astype("int64")
+
+    total = add_sums(left, right)
+    assert total["cents"].to_dict() == {"AAPL": 100, "KO": 205}
+    assert total["cents"].dtype == np.int64
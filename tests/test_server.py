@@ -0,0 +1,88 @@
+from __future__ import annotations
+import json
+import threading
+import time
+import urllib.error
+import urllib.request
+
+import pytest
+
+from common.enrichment import StaticProvider
+from common.server import PooledHTTPServer, ReportService, WarmState
+from conftest import write_transactions
+
+TX = "Individual_XXX147_Transactions_20241231-000000.csv"
+RG = "XXXX3147_GainLoss_Realized_Details_20241231-000000.csv"
+PROVIDER = StaticProvider({"AAPL": {"ISIN": "US0378331005", "Pais Dom Fiscal": "US"}})
+
+
+@pytest.fixture
+def server(rates, tmp_path, monkeypatch):
+    # Cachés (.cache/dec_renta) y semilla de metadata del test, no las del repo
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(
+        "common.processor.default_metadata_path", lambda: tmp_path / "ticker_metadata.csv"
+    )
+    state = WarmState(metadata_provider=PROVIDER)
+    # Fixings ya cargados: el servicio no consulta al BCE
+    state._rates[2024] = (time.monotonic(), rates)
+    server = PooledHTTPServer(("127.0.0.1", 0), ReportService(state), workers=2)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def post(server, files: dict[str, str]) -> tuple[int, dict]:
+    host, port = server.server_address
+    request = urllib.request.Request(
+        f"http://{host}:{port}/reports?year=2024&forms=modelo-100",
+        data=json.dumps({"files": files}).encode("utf-8"),
+        headers={"Content-Type": "application/json"},
+    )
+    try:
+        with urllib.request.urlopen(request, timeout=10) as response:
+            return response.status, json.loads(response.read())
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read())
+
+
+def realized_csv() -> str:
+    return (
+        '"Realized Gain/Loss for ...147"\n'
+        '"Symbol","Name","Closed Date","Quantity","Proceeds","Cost Basis (CB)","Gain/Loss ($)"\n'
+        '"AAPL","APPLE","03/01/2024","1","$110.00","$55.00","$55.00"\n'
+    )
+
+
+def test_report_of_valid_uploads(server, tmp_path):
+    tx = write_transactions(tmp_path / TX, [("03/15/2024", "Qualified Dividend", "AAPL", "$110.00")])
+    status, payload = post(server, {TX: tx.read_text(), RG: realized_csv()})
+    assert status == 200, payload
+    assert "resumen_anual_2024.csv" in payload["outputs"]
+
+
+@pytest.mark.parametrize(
+    "transactions",
+    ["", '"Date","Action","Symbol"\n"03/15/2024","Cash Dividend","KO"\n'],
+    ids=["empty", "missing-column"],
+)
+def test_unreadable_upload_is_a_400(server, transactions):
+    status, payload = post(server, {TX: transactions, RG: realized_csv()})
+    assert status == 400
+    assert TX in payload["error"]
+    metrics = server.service.metrics.snapshot()
+    assert metrics["statuses"].get("500") is None
+
+
+def test_dividend_countries_come_from_the_warm_metadata(server, tmp_path):
+    PROVIDER.calls.clear()
+    tx = write_transactions(tmp_path / TX, [("03/15/2024", "Qualified Dividend", "AAPL", "$110.00")])
+
+    for _ in range(2):
+        status, payload = post(server, {TX: tx.read_text(), RG: realized_csv()})
+        assert status == 200, payload
+        assert "US," in payload["outputs"]["doble_imposicion_pais_2024.csv"]
+    # Un solo enriquecimiento: la segunda petición usa la metadata ya cargada
+    assert PROVIDER.calls == {"AAPL": 1}
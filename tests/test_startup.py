@@ -0,0 +1,12 @@
+from __future__ import annotations
+from pathlib import Path
+import runpy
+
+BENCH = Path(__file__).resolve().parents[1] / "benchmarks" / "bench_startup.py"
+
+
+def test_cli_startup_does_not_import_heavy_modules():
+    # Solo los imports: los umbrales de tiempo dependen de la máquina
+    measure = runpy.run_path(str(BENCH))["measure"]
+
+    assert measure(runs=1)["heavy_modules"] == []